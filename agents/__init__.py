@@ -1,10 +1,23 @@
-from .base_agent import BaseAgent
-from .manager_agent import ProjectManager
-from .strategic_lead import StrategicLead
-from .growth_strategist import GrowthStrategist
-from .ux_designer import UXDesigner
-from .tech_architect import TechnicalArchitect
-from .devops_specialist import DevOpsSpecialist
+import importlib
+
+# Agent classes are imported on first access, so loading one agent module
+# (or the project manager) does not import every specialist
+_EXPORTS = {
+    'BaseAgent': 'base_agent',
+    'ProjectManager': 'manager_agent',
+    'StrategicLead': 'strategic_lead',
+    'GrowthStrategist': 'growth_strategist',
+    'UXDesigner': 'ux_designer',
+    'TechnicalArchitect': 'tech_architect',
+    'DevOpsSpecialist': 'devops_specialist'
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'BaseAgent',
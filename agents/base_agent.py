@@ -1,9 +1,35 @@
+import time
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 from langchain_core.language_models.base import BaseLanguageModel
 from langchain_core.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.outputs import Generation
+from utils.async_utils import run_sync
+from utils.concurrency import AdaptiveLimiter, slot_acquired
+from utils.instrumentation import trace_call
+from utils.resilience import RetryPolicy, is_transient
+from utils.memory import ConversationMemory
+from utils.model_router import ollama_options
+from utils.llm_cache import bypass_cache, chain_cache_entry
+from utils.chain_registry import CHAIN_REGISTRY, ChainRegistry, shared_template
+
+# Every agent prompt starts with the project brief, byte-identical across agents, so the model
+# server can reuse the evaluated prefix instead of re-reading the brief for each specialist
+SHARED_CONTEXT_TEMPLATE = """
+            Project Brief:
+            {brief}
+            """
+
+AGENT_TASK_TEMPLATE = """
+            Additional Context:
+            {context}
+
+            Your Task: {task}
+            """
+
 
 class BaseAgent:
     def __init__(self, name: str, role: str, tools: Optional[List] = None, llm: Optional[BaseLanguageModel] = None):
@@ -19,63 +45,256 @@ class BaseAgent:
         self.role = role
         self.tools = tools or []
         self.llm = llm
-        self.messages = []
-        self.prompt_template = PromptTemplate(input_variables=["task", "context"], template="{task} {context}")
+        # Models for specific operations (plan, synthesis, ...) that differ from the agent's own
+        self.operation_llms: Dict[str, BaseLanguageModel] = {}
+        # Used when the caller does not supply a per-session memory in the task context
+        self.memory = ConversationMemory()
+        # Shared cap on concurrent LLM calls, set by the crew; None means unlimited
+        self.limiter: Optional[AdaptiveLimiter] = None
+        # Retry/hedging policy for LLM calls, set by the crew; None means a single attempt
+        self.retry_policy: Optional[RetryPolicy] = None
+        self.prompt_template = shared_template(input_variables=["task", "context"], template="{task} {context}")
         self.output_parser = StrOutputParser()
+        # Built chains are cached here instead of being recomposed on every call
+        self.chains: ChainRegistry = CHAIN_REGISTRY
+
+    @staticmethod
+    def build_prompt_template(persona: str) -> PromptTemplate:
+        """
+        Build an agent prompt as shared brief, then persona, then agent-specific context and task.
+
+        :param persona: The agent's instructions; must not contain template variables
+        :return: Template with brief, context and task inputs
+        """
+        # Shared per persona, so the template is parsed once however many crews are built
+        return shared_template(
+            input_variables=["brief", "context", "task"],
+            template=SHARED_CONTEXT_TEMPLATE + persona + AGENT_TASK_TEMPLATE
+        )
+
+    async def awarm_up(self, brief: str) -> None:
+        """
+        Have the task model evaluate the shared brief prefix once, generating a single token.
+
+        Useful when the first real call on this model would otherwise pay for the whole brief.
+
+        :param brief: Enriched brief exactly as it will be passed to the agents
+        """
+        prefix_template = shared_template(input_variables=["brief"], template=SHARED_CONTEXT_TEMPLATE)
+        options = ollama_options(self.llm_for("task"), num_predict=1)
+        chain = self._chain(prefix_template, "task", parse=False, options=options)
+        # A cached answer would skip the server and warm nothing
+        with bypass_cache():
+            await self._ainvoke_chain(chain, {"brief": brief}, operation="warmup")
+
+    def llm_for(self, operation: str) -> BaseLanguageModel:
+        """Return the language model to use for an operation (task, plan, synthesis, ...)."""
+        return self.operation_llms.get(operation, self.llm)
+
+    def _chain(self, template: PromptTemplate, operation: str, parse: bool = True, **bind_kwargs: Any):
+        """
+        Return the cached template | model | parser chain for an operation.
+
+        :param template: Prompt template
+        :param operation: Operation whose model to use (see llm_for)
+        :param parse: Whether to end the chain with the string output parser
+        :param bind_kwargs: Per-call model arguments, e.g. format="json"
+        :return: Runnable chain
+        """
+        return self.chains.get(template, self.llm_for(operation), self.output_parser if parse else None, **bind_kwargs)
+
+    @property
+    def messages(self) -> List:
+        """Recent messages kept verbatim in the agent's own memory."""
+        return list(self.memory.messages)
 
     def process_task(self, task) -> str:
         """
         Process a given task using the agent's role and memory.
         
+        :param task: Task to be processed
+        :return: Result of the task processing
+        """
+        return run_sync(self.aprocess_task(task))
+
+    async def aprocess_task(self, task) -> str:
+        """
+        Asynchronously process a given task using the agent's role and memory.
+        
         :param task: Task to be processed
         :return: Result of the task processing
         """
         if isinstance(task, dict):
             context = task
-            context['role'] = self.role
-            context['memory'] = self.memory.load_memory_variables({})
         else:
-            context = {
-                'task': task,
-                'role': self.role,
-                'memory': self.memory.load_memory_variables({})
-            }
-        return self._execute_task(context)
+            context = {'task': task}
+        conversation = context.get('conversation')
+        if conversation is None:
+            conversation = self.memory
+        context['role'] = self.role
+        context['memory'] = conversation.render(empty='')
+        return await self._aexecute_task(context)
 
     def _execute_task(self, context: Dict) -> str:
         """
         Execute the task using the context provided.
         
+        :param context: Context for task execution
+        :return: Result of the task execution
+        """
+        return run_sync(self._aexecute_task(context))
+
+    async def _aexecute_task(self, context: Dict) -> str:
+        """
+        Asynchronously execute the task using the context provided.
+        
+        Errors are raised rather than returned as text so callers can tell a
+        failed analysis from a real one and decide whether to retry or skip it.
+        
         :param context: Context for task execution
         :return: Result of the task execution
         """
         if not self.llm or not self.prompt_template:
             raise ValueError(f"LLM or prompt template not initialized for {self.name}")
 
-        try:
-            # Modern LangChain chain composition
-            chain = self.prompt_template | self.llm | self.output_parser
-            
-            task_input = str(context.get('task', context))
-            context_input = str(context.get('context', ''))
-            
-            response = chain.invoke({
-                "task": task_input,
-                "context": context_input
-            })
-            
-            # Store interaction
-            self.messages.extend([
-                HumanMessage(content=task_input),
-                AIMessage(content=response)
-            ])
-            
-            return response
-            
-        except Exception as e:
-            error_msg = f"Error in {self.name}: {str(e)}"
-            logging.error(error_msg)
-            return error_msg
+        chain = self._chain(self.prompt_template, "task")
+        
+        task_input = str(context.get('task', context))
+        context_input = str(context.get('context', ''))
+        if context.get('memory'):
+            # Bounded history and rolling summary of this agent's earlier exchanges in the session
+            context_input = f"{context_input}\n\nYour earlier work on this project:\n{context['memory']}"
+        
+        response = await self._ainvoke_chain(chain, {
+            "brief": str(context.get('brief', '')),
+            "task": task_input,
+            "context": context_input
+        }, queued_at=context.get('queued_at'))
+        
+        # Store interaction in the caller's memory when one is supplied
+        conversation = context.get('conversation')
+        if conversation is None:
+            conversation = self.memory
+        conversation.add_exchange(task_input, response)
+        
+        return response
+
+    async def _ainvoke_chain(self, chain, inputs: Dict, operation: str = "task",
+                             queued_at: Optional[float] = None) -> Any:
+        """
+        Invoke a chain, recording its latency and token usage on the current run trace.
+        
+        :param chain: Runnable to invoke
+        :param inputs: Chain inputs
+        :param operation: Label for the call in the trace (task, plan, synthesis, ...)
+        :param queued_at: perf_counter() timestamp when the call was scheduled
+        :return: Chain output
+        """
+        # Answer cache hits before queueing for a limiter slot, so they never wait behind model calls
+        cache_entry = chain_cache_entry(chain, inputs)
+        cached = await self._alookup_cached(cache_entry, operation, queued_at)
+        if cached is not None:
+            return cached
+
+        async def attempt():
+            async with self._llm_call(operation, queued_at) as callbacks:
+                # Already looked up above; the answer is stored below
+                with bypass_cache():
+                    return await chain.ainvoke(inputs, config={"callbacks": callbacks})
+
+        if self.retry_policy is None:
+            response = await attempt()
+        else:
+            response = await self.retry_policy.call(attempt, operation, label=f"{self.name} {operation}")
+        if cache_entry is not None:
+            cache, prompt, llm_string = cache_entry
+            await cache.aupdate(prompt, llm_string, [Generation(text=str(response))])
+        return response
+
+    async def _astream_chain(self, chain, inputs: Dict, operation: str = "task",
+                             queued_at: Optional[float] = None) -> AsyncIterator[Any]:
+        """
+        Stream a chain, recording its latency and token usage on the current run trace.
+        
+        :param chain: Runnable to stream
+        :param inputs: Chain inputs
+        :param operation: Label for the call in the trace
+        :param queued_at: perf_counter() timestamp when the call was scheduled
+        :return: Iterator over output chunks
+        """
+        # astream skips the LLM cache, so streamed calls read and fill it here
+        cache_entry = chain_cache_entry(chain, inputs)
+        cached = await self._alookup_cached(cache_entry, operation, queued_at)
+        if cached is not None:
+            yield cached
+            return
+        retries = self.retry_policy.max_retries if self.retry_policy else 0
+        for attempt in range(retries + 1):
+            started = False
+            chunks = []
+            try:
+                async with self._llm_call(operation, queued_at) as callbacks:
+                    async for chunk in chain.astream(inputs, config={"callbacks": callbacks}):
+                        started = True
+                        chunks.append(chunk)
+                        yield chunk
+                if cache_entry is not None:
+                    cache, prompt, llm_string = cache_entry
+                    await cache.aupdate(prompt, llm_string, [Generation(text="".join(map(str, chunks)))])
+                return
+            except Exception as e:
+                # Once output has been handed to the caller a retry would duplicate it
+                if started or attempt == retries or not is_transient(e):
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                logging.warning(f"{self.name} {operation} stream failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _alookup_cached(self, cache_entry: Optional[Tuple], operation: str,
+                              queued_at: Optional[float] = None) -> Optional[str]:
+        """
+        Return a chain call's cached answer, or None on a miss, without taking a limiter slot.
+        
+        :param cache_entry: (cache, prompt, llm string) from chain_cache_entry, or None
+        :param operation: Label for the call in the trace
+        :param queued_at: perf_counter() timestamp when the call was scheduled
+        :return: Cached answer text, or None
+        """
+        if cache_entry is None:
+            return None
+        cache, prompt, llm_string = cache_entry
+        cached = await cache.alookup(prompt, llm_string)
+        if not cached:
+            return None
+        # Recorded as a cached call: the model is never contacted
+        with trace_call(self.name, operation, queued_at):
+            return "".join(generation.text for generation in cached)
+
+    @asynccontextmanager
+    async def _llm_call(self, operation: str, queued_at: Optional[float] = None):
+        """Wait for a slot from the shared limiter, then trace the call and report its latency back."""
+        if queued_at is None:
+            # Time spent waiting for a slot counts as queue wait in the trace
+            queued_at = time.perf_counter()
+        notify = slot_acquired.get()
+        if self.limiter is None:
+            if notify is not None:
+                notify()
+            with trace_call(self.name, operation, queued_at) as callbacks:
+                yield callbacks
+            return
+        async with self.limiter.slot(operation):
+            if notify is not None:
+                notify()
+            with trace_call(self.name, operation, queued_at) as callbacks:
+                record = callbacks[0].record
+                try:
+                    yield callbacks
+                except Exception:
+                    self.limiter.observe(record.time_to_first_token, failed=True)
+                    raise
+            if not record.cached:
+                self.limiter.observe(record.time_to_first_token)
 
     def execute(self):
         raise NotImplementedError("Subclasses must implement execute method")
\ No newline at end of file
@@ -1,5 +1,4 @@
 from .base_agent import BaseAgent
-from langchain_core.prompts import PromptTemplate
 from typing import Optional, Any
 
 class DevOpsSpecialist(BaseAgent):
@@ -10,9 +9,8 @@ class DevOpsSpecialist(BaseAgent):
             tools=["security_analyzer", "infrastructure_planner", "monitoring_setup"],
             llm=llm
         )
-        self.prompt_template = PromptTemplate(
-            input_variables=["task", "context"],
-            template="""
+        self.prompt_template = self.build_prompt_template(
+            persona="""
             You are a DevOps Specialist with expertise in:
             - Infrastructure as Code (Terraform, CloudFormation)
             - CI/CD pipelines
@@ -22,7 +20,7 @@ class DevOpsSpecialist(BaseAgent):
             - Cost optimization
             - Incident response
 
-            For {task}, provide:
+            For the task below, provide:
             1. Infrastructure design
             2. Security requirements
             3. CI/CD pipeline architecture
@@ -30,8 +28,6 @@ class DevOpsSpecialist(BaseAgent):
             5. Disaster recovery plan
             6. Cost estimation
 
-            Context: {context}
-
             Deliverables:
             - Infrastructure specs
             - Security protocols
@@ -1,5 +1,4 @@
 from .base_agent import BaseAgent
-from langchain_core.prompts import PromptTemplate
 from typing import Optional, Any
 
 class GrowthStrategist(BaseAgent):
@@ -10,9 +9,8 @@ class GrowthStrategist(BaseAgent):
             tools=["seo_analyzer", "funnel_designer", "market_analyzer"],
             llm=llm
         )
-        self.prompt_template = PromptTemplate(
-            input_variables=["task", "context"],
-            template="""
+        self.prompt_template = self.build_prompt_template(
+            persona="""
             You are a Growth & GTM Strategist with expertise in:
             - Data-driven marketing strategies
             - SEO & SEM mastery
@@ -22,15 +20,13 @@ class GrowthStrategist(BaseAgent):
             - B2B/B2C funnel optimization
             - Content strategy
 
-            For {task}, analyze:
+            For the task below, analyze:
             1. Customer acquisition channels
             2. CAC and LTV projections
             3. Market positioning
             4. Growth metrics
             5. Marketing tech stack
 
-            Context: {context}
-
             Deliverables:
             1. Growth strategy
             2. Marketing funnel design
@@ -1,20 +1,129 @@
-from .base_agent import BaseAgent
-from typing import Dict, Optional, Any
-from langchain_core.prompts import PromptTemplate
+from .base_agent import SHARED_CONTEXT_TEMPLATE, BaseAgent
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
 from langchain_core.language_models.base import BaseLanguageModel
 from langchain_core.output_parsers import StrOutputParser
+from pydantic import BaseModel, Field, ValidationError
+from utils.async_utils import iter_sync, run_sync
+from utils.chain_registry import shared_template
+import re
+import asyncio
 import logging
 
+PLAN_ROLES = ['STRATEGIC_LEAD', 'GROWTH_STRATEGIST', 'UX_DESIGNER', 'TECH_ARCHITECT', 'DEVOPS_SPECIALIST']
+
+
+class PlanStreamParser:
+    """Incrementally parse the `---` delimited planning output.
+
+    Feed it text chunks as they stream in; every call returns the
+    (agent_name, task) pairs whose section closed in that chunk, keyed like
+    AICrew.agents (e.g. 'strategic_lead').
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.current_role = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self.buffer += chunk
+        completed = []
+        while '---' in self.buffer:
+            segment, self.buffer = self.buffer.split('---', 1)
+            completed.extend(self._consume(segment))
+        return completed
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush a trailing section that was not closed by a final `---`."""
+        sections = self._consume(self.buffer)
+        self.buffer = ""
+        return sections
+
+    def _consume(self, segment: str) -> List[Tuple[str, str]]:
+        # A segment is a section body, a role header, or both when the model left out the
+        # `---` closing a body before the next header
+        lines = segment.strip().splitlines()
+        role = self._header_role(lines[-1]) if lines else None
+        body = "\n".join(lines[:-1] if role else lines).strip()
+        sections = []
+        if self.current_role and body:
+            sections.append((self.current_role, body))
+            self.current_role = None
+        if role:
+            self.current_role = role
+        return sections
+
+    @staticmethod
+    def _header_role(line: str) -> Optional[str]:
+        # A header line names a role, e.g. "**TECH_ARCHITECT:**"
+        header = line.strip().strip('#*:[] ').upper().replace(' ', '_')
+        return header.lower() if header in PLAN_ROLES else None
+
+
+class ProjectPlan(BaseModel):
+    """Schema of the structured planning output: one specific task per specialist."""
+
+    strategic_lead: str = Field(min_length=1, description="Strategic analysis and planning tasks")
+    growth_strategist: str = Field(min_length=1, description="Growth and marketing tasks")
+    ux_designer: str = Field(min_length=1, description="UX/UI design tasks")
+    tech_architect: str = Field(min_length=1, description="Technical architecture tasks")
+    devops_specialist: str = Field(min_length=1, description="Infrastructure and deployment tasks")
+
+
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def parse_project_plan(text: str) -> Dict[str, str]:
+    """
+    Validate structured planning output against ProjectPlan.
+
+    Tolerates a Markdown code fence or text around the JSON object.
+
+    :param text: Raw model output
+    :return: Mapping of agent name to task
+    :raises ValidationError: If the output is not a JSON object matching the schema
+    """
+    text = _JSON_FENCE.sub("", text.strip())
+    try:
+        return ProjectPlan.model_validate_json(text).model_dump()
+    except ValidationError:
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            raise
+        return ProjectPlan.model_validate_json(text[start:end + 1]).model_dump()
+
+
+# Report sections used by hierarchical synthesis: title, word budget and the specialists it draws on
+DEFAULT_SYNTHESIS_SECTIONS = [
+    {'title': 'Executive Summary', 'max_words': 250, 'agents': []},
+    {'title': 'Project Scope & Objectives', 'max_words': 200, 'agents': ['strategic_lead']},
+    {'title': 'Technical Architecture', 'max_words': 300, 'agents': ['tech_architect']},
+    {'title': 'User Experience', 'max_words': 250, 'agents': ['ux_designer']},
+    {'title': 'Growth & Marketing', 'max_words': 250, 'agents': ['growth_strategist']},
+    {'title': 'Infrastructure & DevOps', 'max_words': 250, 'agents': ['devops_specialist']},
+    {'title': 'Risk Assessment & Mitigation', 'max_words': 200, 'agents': []},
+    {'title': 'Timeline & Milestones', 'max_words': 200, 'agents': []},
+    {'title': 'Resource Requirements & Budget Estimates', 'max_words': 150, 'agents': []},
+    {'title': 'Success Metrics & KPIs', 'max_words': 150, 'agents': ['strategic_lead', 'growth_strategist']},
+    {'title': 'Next Steps & Recommendations', 'max_words': 150, 'agents': []}
+]
+
+
 class ProjectManager(BaseAgent):
-    def __init__(self, llm: Optional[BaseLanguageModel] = None):
+    def __init__(self, llm: Optional[BaseLanguageModel] = None, synthesis_config: Optional[Dict] = None,
+                 planning_config: Optional[Dict] = None):
         """
         Initialize the ProjectManager with a specific role and optional LLM.
         
         :param llm: Language model chain for the agent
+        :param synthesis_config: The `synthesis` config section (mode, summary budget, sections)
+        :param planning_config: The `planning` config section (mode, repair retries, JSON format)
         """
         super().__init__(name="Project Manager", role="Manage the whole project", llm=llm)
+        self.synthesis_config = synthesis_config or {}
+        self.planning_config = planning_config or {}
+        self.synthesis_sections = self.synthesis_config.get('sections') or DEFAULT_SYNTHESIS_SECTIONS
         # Update template for better synthesis
-        self.prompt_template = PromptTemplate(
+        self.prompt_template = shared_template(
             input_variables=["task", "context"],
             template="""
             You are a seasoned Project Manager synthesizing insights from multiple experts.
@@ -39,26 +148,32 @@ class ProjectManager(BaseAgent):
             """
         )
         
-        self.followup_template = PromptTemplate(
-            input_variables=["question", "brief", "insights"],
+        self.followup_template = shared_template(
+            input_variables=["question", "brief", "insights", "history"],
             template="""
             Based on the project analysis:
             
             Original Brief: {brief}
-            Expert Insights: {insights}
+            
+            Relevant Excerpts from the Analysis:
+            {insights}
+            
+            Conversation So Far:
+            {history}
             
             Answer this follow-up question: {question}
             
-            Provide a clear, specific answer drawing from the available information.
+            Provide a clear, specific answer drawing from the excerpts above, and name the
+            [source] of each excerpt you rely on.
             """
         )
         
-        self.planning_template = PromptTemplate(
+        # Upstream agents come first (see depends_on in the agents config): their sections stream in,
+        # and they start, before the agents that wait for their findings
+        self.planning_template = shared_template(
             input_variables=["brief"],
-            template="""
-            As a Project Manager, create specific tasks for each specialist based on this brief:
-
-            Brief: {brief}
+            template=SHARED_CONTEXT_TEMPLATE + """
+            As a Project Manager, create specific tasks for each specialist based on the brief above.
 
             For each specialist, define their focus areas and specific tasks.
             Format your response in a way that's easy to parse, using --- as separators:
@@ -68,9 +183,9 @@ class ProjectManager(BaseAgent):
             [Write your strategic analysis and planning tasks here]
             ---
 
-            GROWTH_STRATEGIST
+            TECH_ARCHITECT
             ---
-            [Write your growth and marketing tasks here]
+            [Write your technical architecture tasks here]
             ---
 
             UX_DESIGNER
@@ -78,9 +193,9 @@ class ProjectManager(BaseAgent):
             [Write your UX/UI design tasks here]
             ---
 
-            TECH_ARCHITECT
+            GROWTH_STRATEGIST
             ---
-            [Write your technical architecture tasks here]
+            [Write your growth and marketing tasks here]
             ---
 
             DEVOPS_SPECIALIST
@@ -90,13 +205,45 @@ class ProjectManager(BaseAgent):
             """
         )
         
-        self.synthesis_template = PromptTemplate(
-            input_variables=["brief", "insights"],
+        self.structured_planning_template = shared_template(
+            input_variables=["brief"],
+            template=SHARED_CONTEXT_TEMPLATE + """
+            As a Project Manager, create specific tasks for each specialist based on the brief above.
+
+            For each specialist, define their focus areas and specific tasks for this project.
+            Respond with a single JSON object and nothing else, with exactly these string fields:
+
+            "strategic_lead": strategic analysis and planning tasks
+            "growth_strategist": growth and marketing tasks
+            "ux_designer": UX/UI design tasks
+            "tech_architect": technical architecture tasks
+            "devops_specialist": infrastructure and deployment tasks
+            """
+        )
+        
+        self.plan_repair_template = shared_template(
+            input_variables=["brief", "output", "error"],
             template="""
+            Your project plan for this brief could not be used.
+
+            Brief: {brief}
+
+            Your output:
+            {output}
+
+            Problem: {error}
+
+            Respond again with a single JSON object and nothing else, with exactly these non-empty
+            string fields: "strategic_lead", "growth_strategist", "ux_designer", "tech_architect",
+            "devops_specialist". Each holds the specific tasks for that specialist.
+            """
+        )
+        
+        self.synthesis_template = shared_template(
+            input_variables=["brief", "insights"],
+            template=SHARED_CONTEXT_TEMPLATE + """
             As a Project Manager, synthesize all specialist insights into a cohesive project plan.
             
-            Original Brief: {brief}
-            
             Specialist Insights: {insights}
             
             Provide a comprehensive project analysis covering:
@@ -113,9 +260,59 @@ class ProjectManager(BaseAgent):
             7. Success Metrics & KPIs
             8. Next Steps & Recommendations
             
+            If a specialist's insight is marked as missing, keep the related section but state
+            that this analysis is missing instead of filling it in.
+            
+            Focus on providing actionable insights and clear direction.
+            """
+        )
+        
+        self.condense_template = shared_template(
+            input_variables=["agent", "report", "max_words"],
+            template="""
+            Condense the following {agent} report into a structured summary of at most {max_words} words.
+            
+            Report: {report}
+            
+            Use exactly these headings, with short bullet points under each:
+            Key Recommendations
+            Decisions & Assumptions
+            Risks
+            Open Questions
+            
+            Keep concrete numbers, technologies and names. Do not add new information.
+            """
+        )
+        
+        self.hierarchical_synthesis_template = shared_template(
+            input_variables=["brief", "summaries", "sections"],
+            template=SHARED_CONTEXT_TEMPLATE + """
+            As a Project Manager, synthesize the specialist summaries below into a cohesive project plan.
+            
+            Specialist Summaries:
+            {summaries}
+            
+            Write the report with these sections, respecting each word budget:
+            {sections}
+            
+            If a specialist's insight is marked as missing, keep the related section but state
+            that this analysis is missing instead of filling it in.
+            
             Focus on providing actionable insights and clear direction.
             """
         )
+        
+        self.expansion_template = shared_template(
+            input_variables=["brief", "section", "reports"],
+            template=SHARED_CONTEXT_TEMPLATE + """
+            As a Project Manager, write a detailed version of the "{section}" section of the project plan.
+            
+            Relevant Specialist Reports:
+            {reports}
+            
+            Go into full depth: concrete steps, trade-offs, owners and estimates where the reports support them.
+            """
+        )
     
     def manage_project(self, brief: str, agent_insights: Dict[str, str]) -> str:
         """
@@ -146,7 +343,7 @@ class ProjectManager(BaseAgent):
             context = {
                 'user_input': user_input,
                 'role': self.role,
-                'memory': self.memory.load_memory_variables({})
+                'memory': self.memory.render(empty='')
             }
             return self._execute_task(context)
         except Exception as e:
@@ -158,47 +355,100 @@ class ProjectManager(BaseAgent):
     
     def answer_followup(self, context: Dict) -> str:
         """Handle follow-up questions about the project"""
+        return run_sync(self.aanswer_followup(context))
+
+    async def aanswer_followup(self, context: Dict) -> str:
+        """Asynchronously handle follow-up questions about the project"""
         try:
             # Updated: Use the new chain pattern
-            chain = self.followup_template | self.llm
-            response = chain.invoke({
+            chain = self._chain(self.followup_template, "followup", parse=False)
+            response = await self._ainvoke_chain(chain, {
                 "question": context['question'],
                 "brief": context['brief'],
-                "insights": str(context['insights'])
-            })
+                "insights": str(context['insights']),
+                "history": context.get('history') or "None"
+            }, operation="followup")
             return response.content if hasattr(response, 'content') else str(response)
         except Exception as e:
             logging.error(f"Follow-up handling failed: {e}")
             return f"Error answering follow-up: {str(e)}"
-    
+
     def create_project_plan(self, brief: str) -> Dict[str, str]:
         """Create specific tasks for each specialist based on the brief."""
+        return run_sync(self.acreate_project_plan(brief))
+
+    async def acreate_project_plan(self, brief: str) -> Dict[str, str]:
+        """Asynchronously create specific tasks for each specialist based on the brief."""
         try:
-            chain = self.planning_template | self.llm | self.output_parser
-            response = chain.invoke({"brief": brief})
-            
-            plan = self._parse_plan(response)
-            return plan if plan else self._get_default_tasks()
+            if self.planning_config.get('mode') == 'structured':
+                plan = await self.acreate_structured_plan(brief)
+            else:
+                chain = self._chain(self.planning_template, "plan")
+                response = await self._ainvoke_chain(chain, {"brief": brief}, operation="plan")
+                plan = self._parse_plan(response)
+            # Fall back per role so one malformed section doesn't leave a specialist without a task
+            return {**self._get_default_tasks(), **plan}
             
         except Exception as e:
             logging.error(f"Project planning failed: {e}")
             return self._get_default_tasks()
 
+    async def astream_plan(self, brief: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream the planning call and yield (agent_name, task) as soon as each section closes.
+        
+        :param brief: Project brief
+        :return: Iterator over completed plan sections
+        """
+        if self.planning_config.get('mode') == 'structured':
+            # A JSON plan is only usable once it validates, so sections arrive together
+            for section in (await self.acreate_structured_plan(brief)).items():
+                yield section
+            return
+        parser = PlanStreamParser()
+        chain = self._chain(self.planning_template, "plan")
+        async for chunk in self._astream_chain(chain, {"brief": brief}, operation="plan"):
+            for section in parser.feed(chunk):
+                yield section
+        for section in parser.finish():
+            yield section
+
+    async def acreate_structured_plan(self, brief: str) -> Dict[str, str]:
+        """
+        Ask for a JSON plan matching ProjectPlan, repairing invalid output a bounded number of times.
+
+        Decoding is constrained with Ollama's `format` option: the ProjectPlan JSON schema
+        (planning.json_format: schema, needs Ollama 0.5+) or plain JSON mode (json).
+        
+        :param brief: Project brief
+        :return: Mapping of agent name to task, or the default tasks if no valid plan was produced
+        """
+        json_format = ProjectPlan.model_json_schema() \
+            if self.planning_config.get('json_format', 'schema') == 'schema' else 'json'
+        chain = self._chain(self.structured_planning_template, "plan", format=json_format)
+        repair_chain = self._chain(self.plan_repair_template, "plan", format=json_format)
+        max_repairs = self.planning_config.get('max_repairs', 2)
+
+        response = await self._ainvoke_chain(chain, {"brief": brief}, operation="plan")
+        for attempt in range(max_repairs + 1):
+            try:
+                return parse_project_plan(response)
+            except ValidationError as e:
+                if attempt == max_repairs:
+                    logging.error(f"Structured plan still invalid after {max_repairs} repairs, using default tasks")
+                    return self._get_default_tasks()
+                logging.warning(f"Structured plan invalid, asking for a repair: {e.error_count()} errors")
+                response = await self._ainvoke_chain(repair_chain, {
+                    "brief": brief,
+                    "output": response[:4000],
+                    "error": _describe_errors(e)
+                }, operation="plan")
+
     def _parse_plan(self, content: str) -> Dict[str, str]:
         try:
-            plan = {}
-            sections = content.split('---')
-            current_role = None
-            
-            for section in sections:
-                section = section.strip()
-                if any(role in section.upper() for role in ['STRATEGIC_LEAD', 'GROWTH_STRATEGIST', 'UX_DESIGNER', 'TECH_ARCHITECT', 'DEVOPS_SPECIALIST']):
-                    current_role = section.lower().replace('_', '')
-                elif current_role and section:
-                    plan[current_role] = section.strip()
-            
-            return plan
-        except:
+            parser = PlanStreamParser()
+            return dict(parser.feed(content) + parser.finish())
+        except Exception:
             return {}
 
     def _get_default_tasks(self) -> Dict[str, str]:
@@ -210,15 +460,123 @@ class ProjectManager(BaseAgent):
             'devops_specialist': 'Plan infrastructure and deployment'
         }
     
-    def synthesize_insights(self, brief: str, agent_insights: Dict[str, str]) -> str:
+    def synthesize_insights(self, brief: str, agent_insights: Dict[str, str],
+                            summaries: Optional[Dict[str, str]] = None) -> str:
         """Create final synthesis of all agent insights."""
+        return run_sync(self.asynthesize_insights(brief, agent_insights, summaries))
+
+    async def asynthesize_insights(self, brief: str, agent_insights: Dict[str, str],
+                                   summaries: Optional[Dict[str, str]] = None) -> str:
+        """
+        Asynchronously create final synthesis of all agent insights.
+
+        :param summaries: Reports already condensed (e.g. while other specialists were still running),
+            reused by hierarchical synthesis instead of condensing them again
+        """
         try:
-            chain = self.synthesis_template | self.llm
-            response = chain.invoke({
-                "brief": brief,
-                "insights": str(agent_insights)
-            })
+            chain, inputs = await self._synthesis_chain(brief, agent_insights, summaries)
+            response = await self._ainvoke_chain(chain, inputs, operation="synthesis")
             return response.content if hasattr(response, 'content') else str(response)
         except Exception as e:
             logging.error(f"Synthesis failed: {e}")
-            return f"Error in synthesis: {str(e)}"
\ No newline at end of file
+            return f"Error in synthesis: {str(e)}"
+
+    async def _synthesis_chain(self, brief: str, agent_insights: Dict[str, str],
+                               summaries: Optional[Dict[str, str]] = None) -> Tuple[Any, Dict]:
+        """Pick the flat or hierarchical synthesis chain and build its inputs."""
+        if self.synthesis_config.get('mode', 'flat') != 'hierarchical':
+            return self._chain(self.synthesis_template, "synthesis"), {
+                "brief": brief,
+                "insights": str(agent_insights)
+            }
+        known = summaries or {}
+        condensed = await self.acondense_insights(
+            {name: report for name, report in agent_insights.items() if name not in known}
+        )
+        summaries = {name: known.get(name, condensed.get(name)) for name in agent_insights}
+        return self._chain(self.hierarchical_synthesis_template, "synthesis"), {
+            "brief": brief,
+            "summaries": self._format_reports(summaries),
+            "sections": "\n".join(
+                f"{i}. {section['title']} (max {section['max_words']} words)"
+                for i, section in enumerate(self.synthesis_sections, start=1)
+            )
+        }
+
+    async def acondense_insights(self, agent_insights: Dict[str, str]) -> Dict[str, str]:
+        """
+        Condense every specialist report into a structured summary, in parallel.
+        
+        :param agent_insights: Full reports keyed by agent name
+        :return: Summaries keyed by agent name
+        """
+        max_words = self.synthesis_config.get('summary_words', 250)
+        names = list(agent_insights)
+        summaries = await asyncio.gather(*(
+            self.acondense_insight(name, agent_insights[name], max_words) for name in names
+        ))
+        return dict(zip(names, summaries))
+
+    async def acondense_insight(self, agent_name: str, report: str, max_words: int) -> str:
+        """Condense one specialist report; short reports are passed through unchanged."""
+        if len(str(report).split()) <= max_words:
+            return str(report)
+        try:
+            chain = self._chain(self.condense_template, "condense")
+            return await self._ainvoke_chain(chain, {
+                "agent": agent_name.replace('_', ' '),
+                "report": report,
+                "max_words": max_words
+            }, operation="condense")
+        except Exception as e:
+            logging.error(f"Condensing {agent_name} failed: {e}")
+            # Fall back to a truncated report so synthesis still sees something
+            return " ".join(str(report).split()[:max_words])
+
+    def expand_section(self, section: str, brief: str, agent_insights: Dict[str, str]) -> str:
+        """Write a detailed version of one report section from the full specialist reports."""
+        return run_sync(self.aexpand_section(section, brief, agent_insights))
+
+    async def aexpand_section(self, section: str, brief: str, agent_insights: Dict[str, str]) -> str:
+        """Asynchronously write a detailed version of one report section from the full specialist reports."""
+        config = next((item for item in self.synthesis_sections if item['title'].lower() == section.lower()), None)
+        agents = (config or {}).get('agents') or list(agent_insights)
+        reports = {name: agent_insights[name] for name in agents if name in agent_insights}
+        try:
+            chain = self._chain(self.expansion_template, "expand")
+            return await self._ainvoke_chain(chain, {
+                "brief": brief,
+                "section": section,
+                "reports": self._format_reports(reports)
+            }, operation="expand")
+        except Exception as e:
+            logging.error(f"Section expansion failed: {e}")
+            return f"Error expanding section: {str(e)}"
+
+    @staticmethod
+    def _format_reports(reports: Dict[str, str]) -> str:
+        return "\n\n".join(f"[{name}]\n{text}" for name, text in reports.items())
+
+    def stream_synthesis(self, brief: str, agent_insights: Dict[str, str],
+                         summaries: Optional[Dict[str, str]] = None) -> Iterator[str]:
+        """Stream the final synthesis of all agent insights chunk by chunk."""
+        return iter_sync(self.astream_synthesis(brief, agent_insights, summaries))
+
+    async def astream_synthesis(self, brief: str, agent_insights: Dict[str, str],
+                                summaries: Optional[Dict[str, str]] = None) -> AsyncIterator[str]:
+        """Asynchronously stream the final synthesis of all agent insights chunk by chunk."""
+        try:
+            chain, inputs = await self._synthesis_chain(brief, agent_insights, summaries)
+            async for chunk in self._astream_chain(chain, inputs, operation="synthesis"):
+                yield chunk
+        except Exception as e:
+            logging.error(f"Synthesis streaming failed: {e}")
+            yield f"Error in synthesis: {str(e)}"
+
+
+def _describe_errors(error: ValidationError) -> str:
+    """Summarise pydantic errors in a form the model can act on."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'output'}: {item['msg']}"
+        for item in error.errors()[:10]
+    )
@@ -1,5 +1,4 @@
 from .base_agent import BaseAgent
-from langchain_core.prompts import PromptTemplate
 from typing import Optional, Any
 
 class StrategicLead(BaseAgent):
@@ -10,9 +9,8 @@ class StrategicLead(BaseAgent):
             tools=["market_research", "roadmap_generator", "requirement_analyzer"],
             llm=llm
         )
-        self.prompt_template = PromptTemplate(
-            input_variables=["task", "context"],
-            template="""
+        self.prompt_template = self.build_prompt_template(
+            persona="""
             You are a visionary Strategic Product Lead with 15+ years experience in successful product launches. Your expertise:
             - Product-market fit analysis
             - Strategic roadmapping
@@ -21,15 +19,13 @@ class StrategicLead(BaseAgent):
             - Resource allocation
             - Competitive analysis
 
-            When analyzing {task}, consider:
+            When analyzing the task below, consider:
             1. Market opportunity size
             2. Competitive landscape
             3. Resource requirements
             4. Success metrics
             5. Risk factors
 
-            Context: {context}
-
             Provide strategic direction focusing on viability and impact.
             """
         )
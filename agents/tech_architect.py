@@ -1,5 +1,4 @@
 from .base_agent import BaseAgent
-from langchain_core.prompts import PromptTemplate
 from typing import Optional, Any
 
 class TechnicalArchitect(BaseAgent):
@@ -10,9 +9,8 @@ class TechnicalArchitect(BaseAgent):
             tools=["api_designer", "db_schema_generator", "system_architect"],
             llm=llm
         )
-        self.prompt_template = PromptTemplate(
-            input_variables=["task", "context"],
-            template="""
+        self.prompt_template = self.build_prompt_template(
+            persona="""
             You are a Technical Architect specializing in:
             - Distributed systems design
             - API architecture (REST, GraphQL)
@@ -22,7 +20,7 @@ class TechnicalArchitect(BaseAgent):
             - Security architecture
             - Performance optimization
 
-            For {task}, analyze and provide:
+            For the task below, analyze and provide:
             1. System architecture with scalability focus
             2. API specifications and documentation
             3. Database schema and data flow
@@ -30,8 +28,6 @@ class TechnicalArchitect(BaseAgent):
             5. Security measures
             6. Performance optimization strategy
 
-            Context: {context}
-
             Include:
             - Architecture diagrams requirements
             - API endpoints specification
@@ -1,5 +1,4 @@
 from .base_agent import BaseAgent
-from langchain_core.prompts import PromptTemplate
 from typing import Optional, Any
 
 class UXDesigner(BaseAgent):
@@ -10,9 +9,8 @@ class UXDesigner(BaseAgent):
             tools=["wireframe_generator", "user_research", "prototype_builder"],
             llm=llm
         )
-        self.prompt_template = PromptTemplate(
-            input_variables=["task", "context"],
-            template="""
+        self.prompt_template = self.build_prompt_template(
+            persona="""
             You are a UX Designer with expertise in:
             - User research methodologies
             - Information architecture
@@ -22,7 +20,7 @@ class UXDesigner(BaseAgent):
             - Mobile/web design patterns
             - Accessibility standards
 
-            For {task}, provide:
+            For the task below, provide:
             1. User research plan
             2. Information architecture
             3. Core user flows
@@ -30,8 +28,6 @@ class UXDesigner(BaseAgent):
             5. Design system guidelines
             6. Usability testing approach
 
-            Context: {context}
-
             Focus on delivering:
             - User personas
             - Journey maps
@@ -1,11 +1,193 @@
 import streamlit as st
 from main import AICrew
+from utils.job_queue import CANCELLED, DONE, FAILED, FINISHED_STATES, JobQueue, QueueFullError
+from utils.instrumentation import render_openmetrics
 import os
+import time
+import uuid
+import shutil
 import tempfile
 import json
+from datetime import datetime
+from typing import Optional
 
 st.set_page_config(page_title="AI Crew MVP Builder", layout="wide")
 
+@st.cache_resource
+def get_crew() -> AICrew:
+    """Build the crew once per process; it is shared by every session."""
+    return AICrew()
+
+@st.cache_resource
+def get_job_queue() -> Optional[JobQueue]:
+    """Start the shared worker pool once per process; None if results can't be stored (storage disabled)."""
+    crew = get_crew()
+    if crew.project_store is None:
+        return None
+    return JobQueue.from_config(crew, crew.config.get('jobs')).start()
+
+def render_analysis(crew, events):
+    """Show specialist insights as each agent finishes, then stream the synthesis."""
+    st.subheader("Specialist Insights")
+    events = iter(events)
+    for event in events:
+        if event['type'] == 'agent':
+            agent = crew.agents.get(event['agent'])
+            with st.expander(agent.name if agent else event['agent']):
+                st.markdown(event['content'])
+        elif event['type'] == 'error':
+            st.error(event['content'])
+        elif event['type'] == 'synthesis':
+            st.header("Project Analysis")
+            # The event that ends the synthesis, e.g. an error partway through, is shown once streaming stops
+            ended_by = []
+            st.write_stream(synthesis_chunks(event['content'], events, ended_by))
+            for event in ended_by:
+                if event['type'] == 'error':
+                    st.error(event['content'])
+
+def synthesis_chunks(first_chunk, events, ended_by):
+    """Yield synthesis chunks until another kind of event arrives, which is appended to ended_by."""
+    yield first_chunk
+    for event in events:
+        if event['type'] != 'synthesis':
+            ended_by.append(event)
+            return
+        yield event['content']
+
+def render_stored_project(crew, project):
+    """Show a previously stored analysis without re-running it."""
+    st.subheader("Specialist Insights")
+    for agent_name, content in project['insights'].items():
+        agent = crew.agents.get(agent_name)
+        with st.expander(agent.name if agent else agent_name):
+            st.markdown(content)
+    st.header("Project Analysis")
+    st.markdown(project['synthesis'])
+    if project['timings'].get('calls'):
+        st.download_button(
+            "Download run metrics",
+            render_openmetrics([project['timings']]),
+            file_name=f"{project['project_id']}.metrics.txt",
+            mime="text/plain",
+            help="Latency and token usage of every model call in OpenMetrics text format"
+        )
+
+def render_project_sidebar(crew):
+    """List stored analyses and reopen one into the current session."""
+    projects = crew.list_projects()
+    st.sidebar.header("Previous Analyses")
+    if not projects:
+        st.sidebar.caption("Completed analyses will appear here.")
+        return
+    labels = {
+        project['project_id']: f"{datetime.fromtimestamp(project['created_at']):%Y-%m-%d %H:%M} - {project['title'][:40]}"
+        for project in projects
+    }
+    project_id = st.sidebar.selectbox("Project", list(labels), format_func=labels.get)
+    if st.sidebar.button("Open"):
+        session = crew.new_session()
+        if crew.load_project(project_id, session=session) is not None:
+            st.session_state.project_session = session
+            st.session_state.opened_project = project_id
+
+def save_uploads(uploaded_files):
+    """Copy uploads into a new temporary directory; returns the directory and the file paths."""
+    doc_paths = []
+    upload_dir = tempfile.mkdtemp(prefix="ai-crew-")
+    for file in uploaded_files or []:
+        path = os.path.join(upload_dir, file.name)
+        # Copy in blocks instead of materialising a second full copy via getvalue()
+        file.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(file, f, length=1024 * 1024)
+        doc_paths.append(path)
+    return upload_dir, doc_paths
+
+def submit_analysis(job_queue, project_brief, uploaded_files, use_cache, agents=None, previous_project_id=None):
+    """Copy uploads somewhere the worker can read them and queue the analysis."""
+    upload_dir, doc_paths = save_uploads(uploaded_files)
+    try:
+        # The queue deletes the uploads once the job has run
+        return job_queue.submit(
+            st.session_state.user_id,
+            project_brief,
+            doc_paths if doc_paths else None,
+            use_cache=use_cache,
+            owns_documents=True,
+            agents=agents,
+            previous_project_id=previous_project_id
+        )
+    except QueueFullError:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+def run_inline(crew, project_brief, uploaded_files, use_cache, agents=None):
+    """Analyse in this session, rendering results as they arrive; used when there is no job queue."""
+    upload_dir, doc_paths = save_uploads(uploaded_files)
+    try:
+        with st.spinner("AI Crew is analyzing your project..."):
+            events = crew.stream_project(
+                project_brief,
+                doc_paths if doc_paths else None,
+                use_cache=use_cache,
+                session=st.session_state.project_session,
+                agents=agents
+            )
+            render_analysis(crew, events)
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+def follow_job(job_queue, job_id, progress):
+    """Yield a running job's events as they arrive, updating its progress bar, until the job finishes."""
+    seen = 0
+    while True:
+        events = job_queue.events(job_id, seen)
+        seen += len(events)
+        yield from events
+        job = job_queue.status(job_id)
+        if job is None or job['status'] in FINISHED_STATES:
+            return
+        progress.progress(job['progress'], text=job_message(job))
+        if not events:
+            time.sleep(0.2)
+
+def job_message(job) -> str:
+    if 'position' in job:
+        return f"Your analysis is queued ({job['position']} ahead of it)."
+    return job['message']
+
+def render_job(crew, job_queue, job_id) -> bool:
+    """Show the state of the user's analysis job, following it while it runs; returns True while it is pending."""
+    job = job_queue.status(job_id)
+    if job is None:
+        st.session_state.pop('job_id', None)
+        return False
+    if job['status'] == DONE:
+        st.session_state.pop('job_id', None)
+        session = crew.new_session()
+        if crew.load_project(job['project_id'], session=session) is not None:
+            st.session_state.project_session = session
+            st.session_state.opened_project = job['project_id']
+        return False
+    if job['status'] == FAILED:
+        st.session_state.pop('job_id', None)
+        st.error(f"Analysis failed: {job['error']}")
+        return False
+    if job['status'] == CANCELLED:
+        st.session_state.pop('job_id', None)
+        st.info("Analysis cancelled.")
+        return False
+
+    if st.button("Cancel Analysis"):
+        job_queue.cancel(job_id)
+    progress = st.progress(job['progress'], text=job_message(job))
+    # Reports and synthesis tokens appear as the worker produces them
+    render_analysis(crew, follow_job(job_queue, job_id, progress))
+    # Pick up the finished job's stored project
+    st.rerun()
+    return True
+
 def main():
     st.title("AI Crew MVP Builder")
     
@@ -25,52 +207,72 @@ def main():
         type=['pdf', 'docx', 'pptx']
     )
     
-    if 'crew' not in st.session_state:
-        st.session_state.crew = None
+    use_cache = not st.checkbox(
+        "Bypass response cache",
+        help="Re-run every model call even if an identical prompt was answered before"
+    )
+    
+    crew = get_crew()
+    job_queue = get_job_queue()
+    if 'user_id' not in st.session_state:
+        st.session_state.user_id = uuid.uuid4().hex
+    if 'project_session' not in st.session_state:
+        st.session_state.project_session = crew.new_session()
+    render_project_sidebar(crew)
+    
+    # Narrow briefs can skip specialists, saving their model calls
+    available_agents = list(crew.agents)
+    selected_agents = st.multiselect(
+        "Specialists",
+        available_agents,
+        default=available_agents,
+        format_func=lambda name: crew.agents.specs[name].get('role') or name
+    )
+    
+    # Iterating on an open project only re-runs the specialists the edits are relevant to
+    previous_project_id = st.session_state.get('opened_project')
+    if previous_project_id and not st.checkbox(
+        "Only re-run what changed",
+        value=True,
+        help="Reuse the open project's reports for specialists the edited brief and documents don't affect"
+    ):
+        previous_project_id = None
+    
+    if st.button("Generate Analysis", disabled='job_id' in st.session_state):
+        if project_brief and selected_agents and job_queue is None:
+            # Without a project store there is no queue to hand the job to
+            st.session_state.project_session = crew.new_session()
+            st.session_state.pop('opened_project', None)
+            run_inline(crew, project_brief, uploaded_files, use_cache,
+                       None if selected_agents == available_agents else selected_agents)
+        elif project_brief and selected_agents:
+            # Start a fresh session state for each new analysis
+            st.session_state.project_session = crew.new_session()
+            st.session_state.pop('opened_project', None)
+            try:
+                st.session_state.job_id = submit_analysis(
+                    job_queue, project_brief, uploaded_files, use_cache,
+                    None if selected_agents == available_agents else selected_agents,
+                    previous_project_id
+                )
+            except QueueFullError as e:
+                st.error(str(e))
     
-    if st.button("Generate Analysis"):
-        if project_brief:
-            with st.spinner("AI Crew is analyzing your project..."):
-                crew = AICrew()
-                st.session_state.crew = crew
-                
-                # Handle file uploads
-                doc_paths = []
-                temp_dir = tempfile.mkdtemp()
-                try:
-                    if uploaded_files:
-                        for file in uploaded_files:
-                            temp_path = os.path.join(temp_dir, file.name)
-                            with open(temp_path, "wb") as f:
-                                f.write(file.getvalue())
-                            doc_paths.append(temp_path)
-                
-                    # Process project
-                    results = crew.process_project(project_brief, doc_paths if doc_paths else None)
-                
-                    # Display Results
-                    st.header("Project Analysis")
-                    if "synthesis" in results:
-                        st.markdown(results["synthesis"])
-                    elif "error" in results:
-                        st.error(results["error"])
-                finally:
-                    # Cleanup temp files
-                    if uploaded_files:
-                        for path in doc_paths:
-                            if os.path.exists(path):
-                                os.remove(path)
-                        os.rmdir(temp_dir)
+    pending = 'job_id' in st.session_state and render_job(crew, job_queue, st.session_state.job_id)
+    if not pending and st.session_state.get('opened_project') and crew.project_store is not None:
+        project = crew.project_store.load_project(st.session_state.opened_project)
+        if project:
+            render_stored_project(crew, project)
     
     # Follow-up questions section
-    if st.session_state.crew is not None:
+    if not pending and st.session_state.project_session.has_project():
         st.divider()
         with st.container():
             st.subheader("Ask Follow-up Questions")
             question = st.text_input("What would you like to know more about?")
             if question and st.button("Ask Question"):
                 with st.spinner("Processing your question..."):
-                    answer = st.session_state.crew.ask_followup(question)
+                    answer = crew.ask_followup(question, session=st.session_state.project_session)
                     st.markdown(answer)
 
 if __name__ == "__main__":
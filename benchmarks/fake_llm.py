@@ -0,0 +1,154 @@
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, Iterator, List, Optional
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk, LLMResult
+from pydantic import PrivateAttr
+
+_WORDS = (
+    "market users platform growth architecture api database deployment pipeline security "
+    "roadmap metrics funnel design onboarding retention latency scaling budget risk"
+).split()
+
+_PLAN_ROLES = ['STRATEGIC_LEAD', 'GROWTH_STRATEGIST', 'UX_DESIGNER', 'TECH_ARCHITECT', 'DEVOPS_SPECIALIST']
+
+
+class FakeOllamaLLM(LLM):
+    """Deterministic stand-in for OllamaLLM with simulated latency and failures.
+
+    Output depends only on the prompt and seed. Timing follows a simple model
+    of a local server: prompt evaluation at prompt_tokens_per_second, then
+    generation at tokens_per_second, streamed token by token so time to
+    first token can be measured.
+    """
+
+    completion_tokens: int = 200
+    tokens_per_second: float = 200.0
+    prompt_tokens_per_second: float = 2000.0
+    base_latency: float = 0.01
+    failure_rate: float = 0.0
+    seed: int = 0
+    server_slots: int = 0
+    """Generations the simulated server runs at once (0 = unlimited); extra calls queue."""
+
+    _slots: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _failures: Optional[random.Random] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-ollama"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"seed": self.seed, "completion_tokens": self.completion_tokens}
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _tokens(self, prompt: str, json_mode: bool = False) -> List[str]:
+        rng = self._rng(prompt)
+        if json_mode:
+            # Structured planning: a JSON object with one task per specialist
+            plan = {
+                role.lower(): " ".join(rng.choice(_WORDS) for _ in range(self.completion_tokens // len(_PLAN_ROLES)))
+                for role in _PLAN_ROLES
+            }
+            return [token + " " for token in json.dumps(plan).split(" ")]
+        if "STRATEGIC_LEAD" in prompt and "---" in prompt:
+            # Planning prompt: answer in the delimited format the PM parser expects
+            sections = []
+            # In the order the prompt lists them, as a model following the template would
+            for role in sorted(_PLAN_ROLES, key=prompt.index):
+                body = " ".join(rng.choice(_WORDS) for _ in range(self.completion_tokens // len(_PLAN_ROLES)))
+                sections.append(f"{role}\n---\n{body}\n---\n")
+            return [token + " " for token in "\n".join(sections).split(" ")]
+        return [rng.choice(_WORDS) + " " for _ in range(self.completion_tokens)]
+
+    def _prompt_delay(self, prompt: str) -> float:
+        return self.base_latency + (len(prompt) / 4) / self.prompt_tokens_per_second
+
+    def _maybe_fail(self, prompt: str) -> None:
+        # Failures are drawn per call, not per prompt, so they behave like transient errors a retry can fix
+        if self._failures is None:
+            self._failures = random.Random(self.seed)
+        if self.failure_rate and self._failures.random() < self.failure_rate:
+            raise ConnectionError("Injected failure from FakeOllamaLLM")
+
+    def _generation_info(self, prompt: str, tokens: List[str]) -> dict:
+        return {
+            "done": True,
+            "prompt_eval_count": len(prompt) // 4,
+            "eval_count": len(tokens),
+            "eval_duration": int(len(tokens) / self.tokens_per_second * 1e9)
+        }
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> LLMResult:
+        # Aggregate the stream like OllamaLLM does so generation_info carries token counts
+        generations = []
+        for prompt in prompts:
+            final_chunk = None
+            for chunk in self._stream(prompt, stop, run_manager, **kwargs):
+                final_chunk = chunk if final_chunk is None else final_chunk + chunk
+            generations.append([final_chunk])
+        return LLMResult(generations=generations)
+
+    async def _agenerate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            final_chunk = None
+            async for chunk in self._astream(prompt, stop, run_manager, **kwargs):
+                final_chunk = chunk if final_chunk is None else final_chunk + chunk
+            generations.append([final_chunk])
+        return LLMResult(generations=generations)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        self._maybe_fail(prompt)
+        time.sleep(self._prompt_delay(prompt))
+        tokens = self._tokens(prompt, bool(kwargs.get("format")))
+        for i, token in enumerate(tokens):
+            time.sleep(1 / self.tokens_per_second)
+            chunk = GenerationChunk(
+                text=token,
+                generation_info=self._generation_info(prompt, tokens) if i == len(tokens) - 1 else None
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        if self.server_slots:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.server_slots)
+            async with self._slots:
+                async for chunk in self._astream_unlimited(prompt, run_manager, bool(kwargs.get("format"))):
+                    yield chunk
+        else:
+            async for chunk in self._astream_unlimited(prompt, run_manager, bool(kwargs.get("format"))):
+                yield chunk
+
+    async def _astream_unlimited(self, prompt: str, run_manager=None, json_mode: bool = False):
+        self._maybe_fail(prompt)
+        await asyncio.sleep(self._prompt_delay(prompt))
+        tokens = self._tokens(prompt, json_mode)
+        # Sleep in batches: per-token sleeps would measure the event loop, not the pipeline
+        batch = max(1, int(self.tokens_per_second // 50))
+        for i, token in enumerate(tokens):
+            if i % batch == 0:
+                await asyncio.sleep(batch / self.tokens_per_second)
+            chunk = GenerationChunk(
+                text=token,
+                generation_info=self._generation_info(prompt, tokens) if i == len(tokens) - 1 else None
+            )
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,181 @@
+"""Offline benchmark of the AICrew pipeline against a deterministic fake LLM.
+
+Runs plan -> specialist fan-out -> synthesis for a batch of briefs at each
+requested concurrency level and document size, and reports latency
+percentiles, throughput and peak memory. No Ollama server is needed.
+
+    python -m benchmarks.run_benchmark --concurrency 1,4,16 --doc-pages 0,50
+    python -m benchmarks.run_benchmark --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmark --compare benchmarks/baseline.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import FakeOllamaLLM
+from main import AICrew
+from utils.async_utils import run_sync
+from utils.instrumentation import percentile
+
+
+def make_deck(path: str, pages: int) -> str:
+    """Write a synthetic PPTX with the given number of text slides."""
+    from pptx import Presentation
+    prs = Presentation()
+    for i in range(pages):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Section {i + 1}"
+        slide.placeholders[1].text = (
+            f"Slide {i + 1} covers market sizing, onboarding funnel, API latency targets, "
+            f"database sharding and deployment pipeline for release {i % 7}. " * 6
+        )
+    prs.save(path)
+    return path
+
+
+class BenchmarkCrew(AICrew):
+    """AICrew that keeps nothing on disk, so runs neither read nor pollute the user's .cache/."""
+
+    def load_config(self):
+        super().load_config()
+        # Measure parsing, model calls and orchestration every time, not cache reads
+        self.config['cache'] = {**(self.config.get('cache') or {}), 'enabled': False}
+        self.config['storage'] = {**(self.config.get('storage') or {}), 'enabled': False}
+        self.config['documents'] = {**(self.config.get('documents') or {}), 'cache_dir': None}
+
+
+def build_crew(args) -> AICrew:
+    llm = FakeOllamaLLM(
+        completion_tokens=args.completion_tokens,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        base_latency=args.base_latency,
+        failure_rate=args.failure_rate,
+        server_slots=args.server_slots
+    )
+    return BenchmarkCrew(llm=llm)
+
+
+async def run_scenario(crew: AICrew, concurrency: int, briefs: int, documents: Optional[List[str]]) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            # A session per brief, as the app, job queue and batch CLI use, so agent memory stays per project
+            result = await crew.aprocess_project(f"Benchmark brief {i}: a marketplace MVP", documents,
+                                                 session=crew.new_session())
+            latencies.append(time.perf_counter() - start)
+            if "error" in result:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(briefs)))
+    wall = time.perf_counter() - start
+    return {
+        'briefs': briefs,
+        'errors': errors,
+        'wall_seconds': wall,
+        'throughput_per_min': briefs / wall * 60 if wall else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99)
+    }
+
+
+def run(args) -> Dict:
+    crew = build_crew(args)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.doc_pages:
+            documents = [make_deck(os.path.join(tmp, f"deck_{pages}.pptx"), pages)] if pages else None
+            for concurrency in args.concurrency:
+                briefs = max(args.briefs, concurrency)
+                tracemalloc.start()
+                scenario = run_sync(run_scenario(crew, concurrency, briefs, documents))
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                scenario.update({
+                    'name': f"c{concurrency}-p{pages}",
+                    'concurrency': concurrency,
+                    'doc_pages': pages,
+                    'peak_python_mb': peak / 2 ** 20
+                })
+                results.append(scenario)
+                print(
+                    f"{scenario['name']:>10}  p50 {scenario['p50']:.3f}s  p95 {scenario['p95']:.3f}s  "
+                    f"p99 {scenario['p99']:.3f}s  {scenario['throughput_per_min']:.1f} briefs/min  "
+                    f"peak {scenario['peak_python_mb']:.1f} MB  errors {scenario['errors']}"
+                )
+    return {
+        'python': platform.python_version(),
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'settings': {key: value for key, value in vars(args).items()
+                     if key not in ('save_baseline', 'compare', 'tolerance')},
+        'scenarios': results
+    }
+
+
+def compare(report: Dict, baseline_path: str, tolerance: float) -> bool:
+    """Return False if any scenario's p95 latency regressed beyond the tolerance."""
+    with open(baseline_path, 'r') as file:
+        baseline = {s['name']: s for s in json.load(file)['scenarios']}
+    ok = True
+    for scenario in report['scenarios']:
+        base = baseline.get(scenario['name'])
+        if not base or not base['p95']:
+            continue
+        change = scenario['p95'] / base['p95'] - 1
+        status = "REGRESSION" if change > tolerance else "ok"
+        print(f"{scenario['name']:>10}  p95 {base['p95']:.3f}s -> {scenario['p95']:.3f}s ({change:+.1%})  {status}")
+        if change > tolerance:
+            ok = False
+    return ok
+
+
+def parse_args(argv=None):
+    int_list = lambda value: [int(item) for item in value.split(',') if item]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int_list, default=[1, 4, 16], help='Comma-separated in-flight brief counts')
+    parser.add_argument('--doc-pages', type=int_list, default=[0, 50], help='Comma-separated synthetic deck sizes (0 = no document)')
+    parser.add_argument('--briefs', type=int, default=16, help='Briefs per scenario (at least the concurrency)')
+    parser.add_argument('--completion-tokens', type=int, default=200)
+    parser.add_argument('--tokens-per-second', type=float, default=400.0)
+    parser.add_argument('--prompt-tokens-per-second', type=float, default=4000.0)
+    parser.add_argument('--base-latency', type=float, default=0.01)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--server-slots', type=int, default=4, help='Simulated parallel generations on the model server')
+    parser.add_argument('--save-baseline', help='Write the report as JSON to this path')
+    parser.add_argument('--compare', help='Baseline JSON to compare p95 latencies against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative p95 regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    logging.disable(logging.CRITICAL)
+    args = parse_args(argv)
+    report = run(args)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare and not compare(report, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,68 @@
+import os
+import sys
+import time
 import yaml
+import httpx
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from langchain_ollama import OllamaLLM
+import argparse
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from langchain_core.language_models.base import BaseLanguageModel
 from utils.document_processor import DocumentProcessor
-from agents.strategic_lead import StrategicLead
-from agents.growth_strategist import GrowthStrategist 
-from agents.ux_designer import UXDesigner
-from agents.tech_architect import TechnicalArchitect
-from agents.devops_specialist import DevOpsSpecialist
 from agents.manager_agent import ProjectManager
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.async_utils import iter_sync, run_sync
+from utils.llm_cache import LLMResponseCache
+from utils.concurrency import AdaptiveLimiter, call_rank
+from utils.model_router import ModelRouter
+from utils.resilience import RetryPolicy, run_with_deadline
+from utils.session import ProjectSession
+from utils.retrieval import BM25Index, DocumentRetriever
+from utils.instrumentation import RunTrace, render_openmetrics, start_trace
+from utils.project_store import ProjectStore
+from utils.agent_registry import AgentRegistry
+from utils.incremental import ChangeAnalyzer
+from utils.batch import BatchRunner, format_summary, load_briefs
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# Starts the note standing in for a specialist report that could not be produced
+MISSING_MARKER = "[Missing:"
+
 class AICrew:
-    def __init__(self):
-        # Updated: Configure LLM with specific parameters
-        self.llm = OllamaLLM(
-            model="llama3.2",
-            temperature=0.7,
-            streaming=True,
-            model_kwargs={"top_k": 50}
-        )
-        self.doc_processor = DocumentProcessor()
+    def __init__(self, llm: Optional[BaseLanguageModel] = None):
         self.load_config()
+        self.llm_cache = self.create_llm_cache()
+        # An explicitly supplied LLM serves every agent; otherwise models come from the `model` config section
+        self.router = None if llm else ModelRouter.from_config(
+            self.config.get('model'), cache=self.llm_cache, connection_settings=self.connection_settings()
+        )
+        self.llm = llm or self.router.llm()
+        doc_config = self.config.get('documents') or {}
+        self.doc_processor = DocumentProcessor(
+            cache_dir=doc_config.get('cache_dir', '.cache/documents'),
+            max_workers=doc_config.get('max_workers'),
+            max_pages=doc_config.get('max_pages'),
+            token_budget=doc_config.get('token_budget')
+        )
+        self.retriever = DocumentRetriever.from_config(self.config.get('retrieval'))
+        self.project_store = self.create_project_store()
+        # One limiter for every agent so concurrent runs share the model server's capacity
+        self.llm_limiter = AdaptiveLimiter.from_config(self.config.get('concurrency'))
+        self.retry_policy = RetryPolicy.from_config(self.config.get('resilience'))
+        self.change_analyzer = ChangeAnalyzer.from_config(self.config.get('incremental'))
         self.initialize_agents()
-        # Add memory to store complete project context
-        self.project_memory = {}
+        # Session used when callers don't manage their own (CLI, single-user scripts)
+        self.default_session = self.new_session()
+
+    def new_session(self) -> ProjectSession:
+        """Create an empty per-user session sized from the `memory` config section."""
+        return ProjectSession(self.config.get('memory'))
+
+    @property
+    def project_memory(self) -> Dict:
+        """Project context of the default session."""
+        return self.default_session.project_memory
        
     def load_config(self):
         """Load configuration from a YAML file."""
@@ -45,96 +79,721 @@ class AICrew:
             logging.error(f"Config load failed: {e}")
             raise
            
-    def initialize_agents(self):
-        """Initialize all agents."""
-        self.manager = ProjectManager(llm=self.llm)
-        self.agents = {
-            'strategic_lead': StrategicLead(llm=self.llm),
-            'growth_strategist': GrowthStrategist(llm=self.llm),
-            'ux_designer': UXDesigner(llm=self.llm),
-            'tech_architect': TechnicalArchitect(llm=self.llm),
-            'devops_specialist': DevOpsSpecialist(llm=self.llm)
+    def connection_settings(self) -> Dict:
+        """Build OllamaLLM keep-alive and HTTP connection pool settings from the `connection` config section."""
+        conn_config = self.config.get('connection') or {}
+        return {
+            'keep_alive': conn_config.get('model_keep_alive', '30m'),
+            'client_kwargs': {
+                'limits': httpx.Limits(
+                    max_connections=conn_config.get('max_connections', 20),
+                    max_keepalive_connections=conn_config.get('max_keepalive_connections', 10),
+                    keepalive_expiry=conn_config.get('keepalive_expiry', 300)
+                )
+            }
         }
 
-    def process_project(self, project_brief: str, documents: Optional[List[str]] = None) -> Dict:
-        """Process a project brief with optional documents."""
-        try:
-            doc_context = {}
-            if documents:
-                for doc_path in documents:
-                    doc_content = self.doc_processor.process_file(doc_path)
-                    doc_context[doc_path] = doc_content
-           
-            enriched_brief = self.enrich_brief(project_brief, doc_context)
-            return self._process_with_agents(enriched_brief)
-           
-        except Exception as e:
-            logging.error(f"Project processing failed: {e}")
-            return {"error": str(e)}  # Return error in results format
+    def create_llm_cache(self) -> Optional[LLMResponseCache]:
+        """Create the shared LLM response cache from the `cache` config section."""
+        cache_config = self.config.get('cache') or {}
+        if not cache_config.get('enabled', True):
+            return None
+        return LLMResponseCache(
+            path=cache_config.get('path', '.cache/llm_cache.sqlite'),
+            max_entries=cache_config.get('max_entries', 5000),
+            ttl_seconds=cache_config.get('ttl_seconds', 7 * 24 * 3600)
+        )
+
+    def create_project_store(self) -> Optional[ProjectStore]:
+        """Create the store of completed analyses from the `storage` config section."""
+        storage_config = self.config.get('storage') or {}
+        if not storage_config.get('enabled', True):
+            return None
+        return ProjectStore(path=storage_config.get('path', '.cache/projects.sqlite'))
+
+    def initialize_agents(self):
+        """Create the project manager and the registry of specialists declared in the `agents` config section."""
+        self.manager = self._wire_agent('manager', ProjectManager(
+            llm=self.llm,
+            synthesis_config=self.config.get('synthesis'),
+            planning_config=self.config.get('planning')
+        ))
+        # Specialists are imported and built the first time a run needs them
+        self.agents = AgentRegistry.from_config(
+            self.config.get('agents'),
+            lambda agent_name, agent_class: self._wire_agent(agent_name, agent_class(llm=self.llm))
+        )
+
+    def _wire_agent(self, agent_name: str, agent):
+        """Give an agent the crew's shared limiter, retry policy and routed models."""
+        agent.limiter = self.llm_limiter
+        agent.retry_policy = self.retry_policy
+        if self.router:
+            agent.llm = self.router.llm_for(agent_name)
+            agent.operation_llms = self.router.operation_llms()
+        return agent
+
+    def process_project(self, project_brief: str, documents: Optional[List[str]] = None,
+                        use_cache: bool = True, session: Optional[ProjectSession] = None,
+                        agents: Optional[List[str]] = None, previous_project_id: Optional[str] = None) -> Dict:
+        """
+        Process a project brief with optional documents.
+
+        :param agents: Specialists to run (e.g. ['tech_architect', 'devops_specialist']), None for all enabled ones
+        :param previous_project_id: Stored run of an earlier version of this project; only the specialists
+            affected by the changes are re-run, the others' reports are reused (listed under 'reused')
+        """
+        return run_sync(self.aprocess_project(project_brief, documents, use_cache, session, agents,
+                                              previous_project_id))
+
+    async def aprocess_project(self, project_brief: str, documents: Optional[List[str]] = None,
+                               use_cache: bool = True, session: Optional[ProjectSession] = None,
+                               agents: Optional[List[str]] = None, previous_project_id: Optional[str] = None) -> Dict:
+        """Asynchronously process a project brief with optional documents."""
+        if not use_cache and self.llm_cache:
+            # The bypass flag is context-local, so it only affects this run
+            with self.llm_cache.bypass():
+                return await self.aprocess_project(project_brief, documents, session=session, agents=agents,
+                                                   previous_project_id=previous_project_id)
+        session = session or self.default_session
+        fingerprints = []
+        with start_trace() as trace:
+            try:
+                enriched_brief, doc_index, fingerprints = await self._aprepare_brief(project_brief, documents)
+                reuse = await self._areusable_work(previous_project_id, enriched_brief, doc_index, fingerprints,
+                                                   agents) if previous_project_id else None
+                results = await self._aprocess_with_agents(enriched_brief, session, doc_index, agents, reuse)
+
+            except Exception as e:
+                logging.error(f"Project processing failed: {e}")
+                results = {"error": str(e)}  # Return error in results format
+        results["trace"] = trace
+        if "error" not in results:
+            results["project_id"] = await self._asave_project(session, project_brief, fingerprints, trace)
+        return results
+
+    def stream_project(self, project_brief: str, documents: Optional[List[str]] = None,
+                       use_cache: bool = True, session: Optional[ProjectSession] = None,
+                       agents: Optional[List[str]] = None, previous_project_id: Optional[str] = None
+                       ) -> Iterator[Dict]:
+        """
+        Process a project brief and yield progress events as they happen.
 
-    def _process_with_agents(self, brief: str) -> Dict:
+        Events are dicts with a 'type' of 'agent' (one specialist finished,
+        with 'agent', 'content' and 'error', which is set when the specialist
+        failed or missed its deadline and 'content' only marks it missing), 'synthesis' (one chunk of the final
+        report in 'content'), 'error', and finally 'trace' (the RunTrace of
+        the run in 'content', plus 'project_id' if the run was stored).
+        Only the specialists named in agents run, if given. With a
+        previous_project_id, agent events of reports reused from that run
+        come first and have 'reused' set.
+        """
+        return iter_sync(self.astream_project(project_brief, documents, use_cache, session, agents,
+                                              previous_project_id))
+
+    async def astream_project(self, project_brief: str, documents: Optional[List[str]] = None,
+                              use_cache: bool = True, session: Optional[ProjectSession] = None,
+                              agents: Optional[List[str]] = None, previous_project_id: Optional[str] = None
+                              ) -> AsyncIterator[Dict]:
+        """Asynchronously process a project brief and yield progress events as they happen."""
+        if not use_cache and self.llm_cache:
+            with self.llm_cache.bypass():
+                async for event in self.astream_project(project_brief, documents, session=session, agents=agents,
+                                                        previous_project_id=previous_project_id):
+                    yield event
+            return
+        session = session or self.default_session
+        completed = False
+        fingerprints = []
+        with start_trace() as trace:
+            try:
+                brief, doc_index, fingerprints = await self._aprepare_brief(project_brief, documents)
+                reuse = await self._areusable_work(previous_project_id, brief, doc_index, fingerprints,
+                                                   agents) if previous_project_id else None
+                reused = (reuse or {}).get('insights', {})
+                agent_insights = {}
+                plan = {}
+                summaries = {}
+                async for agent_name, result, error in self._arun_specialists(brief, session, doc_index, plan,
+                                                                              agents, summaries, reuse):
+                    agent_insights[agent_name] = result
+                    yield {'type': 'agent', 'agent': agent_name, 'content': result, 'error': error,
+                           'reused': agent_name in reused}
+                agent_insights = self._in_run_order(agent_insights, agents)
+
+                synthesis_chunks = []
+                async for chunk in self.manager.astream_synthesis(brief, agent_insights, summaries):
+                    synthesis_chunks.append(chunk)
+                    yield {'type': 'synthesis', 'content': chunk}
+
+                await self._aremember(session, brief, agent_insights, "".join(synthesis_chunks), plan, summaries)
+                completed = True
+
+            except Exception as e:
+                logging.error(f"Project streaming failed: {e}")
+                yield {'type': 'error', 'content': f"Analysis failed: {str(e)}"}
+        project_id = await self._asave_project(session, project_brief, fingerprints, trace) if completed else None
+        yield {'type': 'trace', 'content': trace, 'project_id': project_id}
+
+    async def _aprepare_brief(self, project_brief: str, documents: Optional[List[str]] = None
+                              ) -> Tuple[str, Optional[BM25Index], List[Dict[str, str]]]:
+        """Load any documents, index them for retrieval and build the enriched brief.
+
+        Also returns a {'name', 'sha256'} fingerprint per document for the project store.
+        """
+        doc_context = {}
+        if documents:
+            # Document parsing is blocking, keep it off the event loop
+            doc_context = await asyncio.to_thread(self.doc_processor.process_files, documents)
+
+        doc_index = None
+        if doc_context:
+            doc_index = await asyncio.to_thread(self.retriever.build_index, doc_context)
+            logging.info(f"Indexed {len(doc_index)} document chunks")
+        fingerprints = [
+            {'name': os.path.basename(path), 'sha256': document['sha256']}
+            for path, document in doc_context.items()
+        ]
+        return self.enrich_brief(project_brief, doc_context), doc_index, fingerprints
+
+    def _process_with_agents(self, brief: str, session: Optional[ProjectSession] = None,
+                             doc_index: Optional[BM25Index] = None, agents: Optional[List[str]] = None,
+                             reuse: Optional[Dict] = None) -> Dict:
         """Process the brief with project manager coordination."""
+        return run_sync(self._aprocess_with_agents(brief, session, doc_index, agents, reuse))
+
+    async def _aprocess_with_agents(self, brief: str, session: Optional[ProjectSession] = None,
+                                    doc_index: Optional[BM25Index] = None, agents: Optional[List[str]] = None,
+                                    reuse: Optional[Dict] = None) -> Dict:
+        """Asynchronously process the brief with project manager coordination."""
+        session = session or self.default_session
         try:
-            # Get initial plan from PM
-            initial_plan = self.manager.create_project_plan(brief)
-            logging.info(f"Project plan created successfully")
-            
-            # Process agents based on PM's direction
             agent_insights = {}
-            with ThreadPoolExecutor(max_workers=len(self.agents)) as executor:
-                futures = {
-                    executor.submit(
-                        agent.process_task, 
-                        {
-                            'task': initial_plan.get(agent_name, ''),
-                            'context': brief
-                        }
-                    ): agent_name 
-                    for agent_name, agent in self.agents.items()
-                }
-                
-                for future in as_completed(futures, timeout=120):
-                    agent_name = futures[future]
-                    try:
-                        result = future.result()
-                        agent_insights[agent_name] = result
-                        logging.info(f"Agent {agent_name} completed task")
-                    except Exception as e:
-                        logging.error(f"Agent {agent_name} failed: {e}")
-                        agent_insights[agent_name] = str(e)
+            plan = {}
+            summaries = {}
+            missing = []
+            async for agent_name, result, error in self._arun_specialists(brief, session, doc_index, plan,
+                                                                          agents, summaries, reuse):
+                agent_insights[agent_name] = result
+                if error:
+                    missing.append(agent_name)
+            agent_insights = self._in_run_order(agent_insights, agents)
             
-            # Store context for follow-up questions
-            self.project_memory.update({
-                'brief': brief,
-                'insights': agent_insights
-            })
+            # Get final synthesis from PM, over whatever arrived
+            synthesis = await self.manager.asynthesize_insights(brief, agent_insights, summaries)
             
-            # Get final synthesis from PM
-            synthesis = self.manager.synthesize_insights(brief, agent_insights)
-            return {"synthesis": synthesis}
+            await self._aremember(session, brief, agent_insights, synthesis, plan, summaries)
+            return {"synthesis": synthesis, "missing": missing, "reused": sorted((reuse or {}).get('insights', {}))}
             
         except Exception as e:
             logging.error(f"Project processing failed: {e}")
             return {"error": f"Analysis failed: {str(e)}"}
 
+    async def _arun_specialists(self, brief: str, session: ProjectSession, doc_index: Optional[BM25Index] = None,
+                                plan: Optional[Dict[str, str]] = None, agents: Optional[List[str]] = None,
+                                summaries: Optional[Dict[str, str]] = None, reuse: Optional[Dict] = None
+                                ) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+        """
+        Plan the work, run the specialists and yield (agent_name, result, error) as each finishes.
+
+        Specialists run as a DAG over the `depends_on` edges in the agents
+        config: an agent starts once its upstream agents have finished and
+        gets their condensed findings as context, while independent branches
+        run concurrently. Calls of agents heading longer dependency chains
+        are served first when the limiter is saturated.
+
+        Each specialist has its own deadline (resilience.agent_timeouts),
+        which starts once its upstream agents are done and its first model
+        call gets a limiter slot; the wait for that slot is bounded separately
+        by resilience.slot_wait_timeout. A specialist that
+        fails or runs out of time yields a short note marking its insight as
+        missing as the result, with the reason in error, so synthesis and
+        downstream agents can go ahead with the others. If a plan dict is
+        given, the task dispatched to each agent is recorded in it. agents
+        limits the run to those specialists; by default every enabled one
+        runs. Reports are condensed as soon as they arrive when a downstream
+        agent or hierarchical synthesis needs them, under the same deadline
+        as the agent that wrote them (a late summary falls back to the
+        truncated report); if a summaries dict is given, it receives them
+        for synthesis.
+
+        reuse ({'plan', 'insights', 'summaries'}, see _areusable_work)
+        carries work from a previous run: agents with a reused insight yield
+        it without running (and without condensing it again if its summary
+        was stored), and agents with a previous task skip planning.
+        """
+        selected = self.agents.select(agents)
+        reuse = reuse or {}
+        reused = reuse.get('insights', {})
+        reused_summaries = reuse.get('summaries', {})
+        known_tasks = reuse.get('plan', {})
+        # Only agents without a previous task need the planner
+        unplanned = [agent_name for agent_name in selected if agent_name not in known_tasks]
+        plan = {} if plan is None else plan
+        summaries = {} if summaries is None else summaries
+        retrieval_config = self.config.get('retrieval') or {}
+        planning_config = self.config.get('planning') or {}
+        synthesis_config = self.config.get('synthesis') or {}
+        resilience_config = self.config.get('resilience') or {}
+        plan_brief = self._with_excerpts(brief, doc_index, brief, retrieval_config.get('planning_token_budget'))
+        finished = asyncio.Queue()
+        tasks = []
+        ranks = self.agents.critical_path(selected)
+        hierarchical = synthesis_config.get('mode', 'flat') == 'hierarchical'
+        loop = asyncio.get_running_loop()
+        condensed = {
+            agent_name: loop.create_future() for agent_name in selected
+            if hierarchical or self.agents.dependents(agent_name, selected)
+        }
+
+        async def condense(agent_name: str, result: str, error: Optional[str]) -> None:
+            summary = result
+            if not error:
+                summary_words = synthesis_config.get('summary_words', 250)
+                try:
+                    # Bounded like the agent itself, so a stalled call cannot hold up its dependents or the run
+                    summary = await run_with_deadline(
+                        self.manager.acondense_insight(agent_name, result, summary_words),
+                        self._agent_timeout(agent_name), resilience_config.get('slot_wait_timeout')
+                    )
+                except Exception as e:
+                    logging.error(f"Condensing {agent_name} failed: {str(e) or type(e).__name__}")
+                    summary = " ".join(str(result).split()[:summary_words])
+            condensed[agent_name].set_result(summary)
+
+        async def upstream_findings(agent_name: str) -> str:
+            sections = []
+            for upstream in self.agents.dependencies(agent_name, selected):
+                summary = await condensed[upstream]
+                sections.append(f"Findings from the {self.agents[upstream].name}:\n{summary}")
+            return "\n\n".join(sections)
+
+        async def run_agent(agent_name: str, agent, task: str) -> Tuple[str, str, Optional[str]]:
+            if agent_name in reused:
+                logging.info(f"Reusing the previous {agent_name} report")
+                result, error = reused[agent_name], None
+            else:
+                result, error = await execute(agent_name, agent, task)
+            if agent_name in condensed and agent_name in reused_summaries:
+                condensed[agent_name].set_result(reused_summaries[agent_name])
+            elif agent_name in condensed:
+                tasks.append(asyncio.ensure_future(condense(agent_name, result, error)))
+            return agent_name, result, error
+
+        async def execute(agent_name: str, agent, task: str) -> Tuple[str, Optional[str]]:
+            # Inherited by this agent's LLM calls only
+            call_rank.set(ranks[agent_name])
+            findings = await upstream_findings(agent_name)
+            timeout = self._agent_timeout(agent_name)
+            try:
+                # Each specialist only sees the document chunks relevant to its own task; they
+                # follow the shared brief so every specialist prompt starts with the same prefix
+                excerpts = self._excerpts(
+                    doc_index, f"{agent.role} {task}",
+                    (retrieval_config.get('agent_token_budgets') or {}).get(agent_name)
+                )
+                result = await run_with_deadline(agent.aprocess_task({
+                    'brief': brief,
+                    'task': task,
+                    'context': "\n\n".join(part for part in (findings, excerpts) if part) or "None",
+                    'conversation': session.memory_for(agent_name),
+                    'queued_at': time.perf_counter()
+                }), timeout, resilience_config.get('slot_wait_timeout'))
+                logging.info(f"Agent {agent_name} completed task")
+                return result, None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            logging.error(f"Agent {agent_name} failed: {error}")
+            return f"{MISSING_MARKER} the {agent.name} analysis is unavailable ({error}).]", error
+
+        def launch(agent_name: str, task: str) -> None:
+            plan[agent_name] = task
+            agent_task = asyncio.ensure_future(run_agent(agent_name, self.agents[agent_name], task))
+            agent_task.add_done_callback(lambda done: finished.put_nowait(('agent', done)))
+            tasks.append(agent_task)
+
+        async def dispatch() -> None:
+            running = [agent_name for agent_name in selected if agent_name not in reused]
+            if running and (self.config.get('connection') or {}).get('warm_up', True):
+                tasks.append(asyncio.ensure_future(self._awarm_up(brief, running)))
+            try:
+                for agent_name in selected:
+                    if agent_name not in unplanned:
+                        launch(agent_name, known_tasks.get(agent_name, ''))
+                if unplanned and planning_config.get('speculative', True):
+                    await self._adispatch_speculative(plan_brief, unplanned, launch, planning_config.get('timeout', 60))
+                elif unplanned:
+                    # Get initial plan from PM
+                    initial_plan = await self.manager.acreate_project_plan(plan_brief)
+                    logging.info("Project plan created successfully")
+                    for agent_name in unplanned:
+                        launch(agent_name, initial_plan.get(agent_name, ''))
+            finally:
+                finished.put_nowait(('dispatched', None))
+
+        dispatcher = asyncio.ensure_future(dispatch())
+        received = 0
+        try:
+            # Every specialist is bounded by its own deadline, so this always drains
+            while received < len(selected):
+                kind, done = await finished.get()
+                if kind == 'dispatched':
+                    # Surface planning errors that escaped the dispatcher
+                    dispatcher.result()
+                    continue
+                received += 1
+                yield done.result()
+            # Condensing overlaps with the remaining specialists; collect whatever is still running
+            for agent_name, summary in condensed.items():
+                summaries[agent_name] = await summary
+        finally:
+            dispatcher.cancel()
+            for task in tasks:
+                task.cancel()
+
+    def _in_run_order(self, agent_insights: Dict[str, str], agents: Optional[List[str]] = None) -> Dict[str, str]:
+        """Order reports as the agents are configured rather than as they finished.
+
+        The synthesis prompt is built from the reports in order, so a stable order lets a
+        resubmitted run hit the response cache.
+        """
+        return {agent_name: agent_insights[agent_name] for agent_name in self.agents.select(agents)
+                if agent_name in agent_insights}
+
+    def _agent_timeout(self, agent_name: str) -> float:
+        """Deadline in seconds for one specialist, retries included, counted from its first model slot."""
+        timeouts = (self.config.get('resilience') or {}).get('agent_timeouts') or {}
+        return timeouts.get(agent_name, timeouts.get('default', 120))
+
+    async def _areusable_work(self, previous_project_id: str, brief: str, doc_index: Optional[BM25Index],
+                              fingerprints: List[Dict[str, str]], agents: Optional[List[str]] = None
+                              ) -> Optional[Dict]:
+        """
+        Work out what a stored run of an earlier version of the project still offers.
+
+        A specialist must run again if it has no usable report in that run,
+        if a changed line of the brief is relevant to its role, tools, task
+        or (failing those) previous report, or if its document excerpts
+        differ. A changed line that matches no specialist at all re-runs all
+        of them. Dependents of a re-run specialist must run again too.
+        Everything else is reused, together with its stored condensed
+        summary and its previous task; the specialists that run again get a
+        new task planned from the new brief.
+
+        :param previous_project_id: Id of the stored run
+        :param brief: New enriched brief
+        :param doc_index: Index of the new documents
+        :param fingerprints: Fingerprints of the new documents
+        :param agents: Specialists taking part, None for all enabled ones
+        :return: {'plan': previous tasks of the reused reports, 'insights': reusable reports,
+                 'summaries': their condensed summaries, where stored}, or None to run everything
+        """
+        selected = self.agents.select(agents)
+        previous = None
+        if self.project_store is not None:
+            previous = await asyncio.to_thread(self.project_store.load_project, previous_project_id)
+        if previous is None:
+            logging.warning(f"Project {previous_project_id} not found, running a full analysis")
+            return None
+        changed_lines, changed_ratio = self.change_analyzer.diff(previous['brief'], brief)
+        if not self.change_analyzer.worth_it(changed_ratio):
+            logging.info(f"{changed_ratio:.0%} of the brief changed, running a full analysis")
+            return None
+
+        plan, insights = previous['plan'], previous['insights']
+        affected = {
+            agent_name for agent_name in selected
+            if agent_name not in plan or str(insights.get(agent_name, MISSING_MARKER)).startswith(MISSING_MARKER)
+        }
+        # Full reports touch on everything, so agents are matched on what they were asked to cover first
+        profiles = {
+            agent_name: " ".join([self.agents[agent_name].role, *self.agents[agent_name].tools, plan.get(agent_name, '')])
+            for agent_name in selected
+        }
+        affected |= self.change_analyzer.relevant_agents(changed_lines, profiles, {
+            agent_name: f"{profile} {insights.get(agent_name, '')}" for agent_name, profile in profiles.items()
+        })
+        affected |= await self._aagents_with_new_excerpts(previous['documents'], fingerprints, doc_index,
+                                                          plan, selected)
+        pending = list(affected)
+        while pending:
+            for dependent in self.agents.dependents(pending.pop(), selected):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+
+        reused = {agent_name: insights[agent_name] for agent_name in selected if agent_name not in affected}
+        logging.info(f"Re-running {', '.join(sorted(affected)) or 'no specialists'}; "
+                     f"reusing {', '.join(reused) or 'nothing'} from project {previous_project_id}")
+        return {
+            # Affected specialists are re-planned from the new brief rather than given their old task
+            'plan': {agent_name: plan[agent_name] for agent_name in reused},
+            'insights': reused,
+            'summaries': {agent_name: summary for agent_name, summary in previous['summaries'].items()
+                          if agent_name in reused}
+        }
+
+    async def _aagents_with_new_excerpts(self, previous_documents: List[Dict[str, str]],
+                                         fingerprints: List[Dict[str, str]], doc_index: Optional[BM25Index],
+                                         plan: Dict[str, str], selected: List[str]) -> set:
+        """Specialists whose document excerpts differ between the previous and the new documents."""
+        if sorted(map(str, previous_documents)) == sorted(map(str, fingerprints)):
+            return set()
+        previous_context = {}
+        for document in previous_documents:
+            # The extraction cache still holds the previous documents' text, keyed by content hash
+            extracted = self.doc_processor.cached_document(document['sha256'])
+            if extracted is None:
+                logging.info(f"Previous text of {document['name']} is not cached, re-running every specialist")
+                return set(selected)
+            previous_context[document['name']] = extracted
+        previous_index = None
+        if previous_context:
+            previous_index = await asyncio.to_thread(self.retriever.build_index, previous_context)
+        budgets = (self.config.get('retrieval') or {}).get('agent_token_budgets') or {}
+        affected = set()
+        for agent_name in selected:
+            query = f"{self.agents[agent_name].role} {plan.get(agent_name, '')}"
+            budget = budgets.get(agent_name)
+            if self._excerpts(previous_index, query, budget) != self._excerpts(doc_index, query, budget):
+                affected.add(agent_name)
+        return affected
+
+    async def _adispatch_speculative(self, plan_brief: str, selected: List[str], launch, timeout: float) -> None:
+        """Start each specialist as soon as its plan section has streamed in, defaulting the rest."""
+        dispatched = set()
+
+        async def consume_plan():
+            async for agent_name, task in self.manager.astream_plan(plan_brief):
+                if agent_name in selected and agent_name not in dispatched:
+                    dispatched.add(agent_name)
+                    logging.info(f"Plan section for {agent_name} ready, dispatching")
+                    launch(agent_name, task)
+
+        try:
+            # Like the specialists' deadlines, the budget starts once the plan call has a model slot
+            await run_with_deadline(consume_plan(), timeout,
+                                    (self.config.get('resilience') or {}).get('slot_wait_timeout'))
+            logging.info("Project plan created successfully")
+        except TimeoutError as e:
+            logging.warning(f"Project planning timed out ({e}), using default tasks for the rest")
+        except Exception as e:
+            logging.error(f"Project planning failed: {e}")
+
+        default_tasks = self.manager._get_default_tasks()
+        for agent_name in selected:
+            if agent_name not in dispatched:
+                launch(agent_name, default_tasks.get(agent_name, ''))
+
+    async def _aremember(self, session: ProjectSession, brief: str, agent_insights: Dict[str, str],
+                         synthesis: str, plan: Optional[Dict[str, str]] = None,
+                         summaries: Optional[Dict[str, str]] = None) -> None:
+        """Store context for follow-up questions and index it for retrieval."""
+        # Follow-ups retrieve passages from this index instead of resending every report
+        insight_index = await asyncio.to_thread(
+            self.retriever.index_texts, {**agent_insights, 'synthesis': synthesis}
+        )
+        # Set again once this run has been stored
+        session.project_memory.pop('project_id', None)
+        session.project_memory.update({
+            'brief': brief,
+            'insights': agent_insights,
+            'synthesis': synthesis,
+            'plan': plan or {},
+            'summaries': summaries or {},
+            'insight_index': insight_index
+        })
+        session.memory_for('followup').clear()
+
+    async def _asave_project(self, session: ProjectSession, title: str, fingerprints: List[Dict[str, str]],
+                             trace: RunTrace) -> Optional[str]:
+        """Persist the session's completed analysis, keyed by the run id. Returns the project id."""
+        if self.project_store is None:
+            return None
+        memory = session.project_memory
+        try:
+            project_id = await asyncio.to_thread(
+                self.project_store.save_project,
+                trace.run_id, title.strip()[:200], memory['brief'], fingerprints, memory.get('plan', {}),
+                memory['insights'], memory['synthesis'], trace.to_dict(), memory.get('summaries', {})
+            )
+        except Exception as e:
+            # The analysis itself succeeded, so losing the stored copy is not fatal
+            logging.error(f"Saving project {trace.run_id} failed: {e}")
+            return None
+        memory['project_id'] = project_id
+        return project_id
+
+    def list_projects(self, limit: int = 50) -> List[Dict]:
+        """List stored projects, newest first."""
+        if self.project_store is None:
+            return []
+        return self.project_store.list_projects(limit)
+
+    def load_project(self, project_id: str, session: Optional[ProjectSession] = None) -> Optional[Dict]:
+        """
+        Reopen a stored project in a session so follow-ups and section expansion work without re-running it.
+
+        No LLM calls are made; only the in-memory insight index is rebuilt.
+
+        :param project_id: Id returned by process_project or list_projects
+        :param session: Session to load into (defaults to the crew's default session)
+        :return: The stored project, or None if it does not exist
+        """
+        if self.project_store is None:
+            return None
+        project = self.project_store.load_project(project_id)
+        if project is None:
+            return None
+        session = session or self.default_session
+        session.project_memory.clear()
+        session.project_memory.update({
+            'project_id': project['project_id'],
+            'brief': project['brief'],
+            'insights': project['insights'],
+            'synthesis': project['synthesis'],
+            'plan': project['plan'],
+            'summaries': project['summaries'],
+            'insight_index': self.retriever.index_texts({**project['insights'], 'synthesis': project['synthesis']})
+        })
+        session.memory_for('followup').clear()
+        return project
+
+    def expand_section(self, section: str, session: Optional[ProjectSession] = None) -> str:
+        """Expand one section of the last synthesis in full detail."""
+        return run_sync(self.aexpand_section(section, session))
+
+    async def aexpand_section(self, section: str, session: Optional[ProjectSession] = None) -> str:
+        """Asynchronously expand one section of the last synthesis in full detail."""
+        session = session or self.default_session
+        if not session.has_project():
+            return "Please analyze a project first before expanding sections."
+        return await self.manager.aexpand_section(
+            section, session.project_memory['brief'], session.project_memory['insights']
+        )
+
     def enrich_brief(self, brief: str, context: Dict) -> str:
+        documents = ", ".join(os.path.basename(path) for path in context) or "None"
         return f"""
         Original Brief: {brief}
-        Current Context: {context}
-        Additional Documentation: {bool(context)}
+        Attached Documents: {documents}
         """
 
-    def ask_followup(self, question: str) -> str:
+    def _with_excerpts(self, brief: str, doc_index: Optional[BM25Index], query: str,
+                       token_budget: Optional[int] = None) -> str:
+        """Append the document chunks most relevant to the query to the brief."""
+        excerpts = self._excerpts(doc_index, query, token_budget)
+        if not excerpts:
+            return brief
+        return f"""{brief}
+        Relevant Document Excerpts:
+{excerpts}
+        """
+
+    def _excerpts(self, doc_index: Optional[BM25Index], query: str, token_budget: Optional[int] = None) -> str:
+        """Format the document chunks most relevant to the query, or return '' if there are none."""
+        return self.retriever.format_context(self.retriever.retrieve(doc_index, query, token_budget))
+
+    async def _awarm_up(self, brief: str, selected: List[str]) -> None:
+        """
+        Evaluate the shared brief prefix on each specialist model the planning call does not already warm.
+
+        The plan prompt starts with the same brief prefix, so when specialists share the plan's
+        model there is nothing to do; otherwise one short call per distinct model runs alongside
+        planning and the model server reuses its cached prefix for the specialist prompts.
+        """
+        plan_llm = self.manager.llm_for("plan")
+        warmed = {id(plan_llm)}
+        for agent in (self.agents[agent_name] for agent_name in selected):
+            llm = agent.llm_for("task")
+            if id(llm) in warmed:
+                continue
+            warmed.add(id(llm))
+            try:
+                await agent.awarm_up(brief)
+            except Exception as e:
+                logging.warning(f"Warm-up for {agent.name} failed: {e}")
+
+    def ask_followup(self, question: str, session: Optional[ProjectSession] = None) -> str:
         """Handle follow-up questions about the project"""
-        if not self.project_memory:
+        return run_sync(self.aask_followup(question, session))
+
+    async def aask_followup(self, question: str, session: Optional[ProjectSession] = None) -> str:
+        """Asynchronously handle follow-up questions about the project"""
+        session = session or self.default_session
+        if not session.has_project():
             return "Please analyze a project first before asking follow-up questions."
             
+        retrieval_config = self.config.get('retrieval') or {}
+        brief = session.project_memory['brief']
+        max_brief_chars = (self.config.get('memory') or {}).get('followup_brief_tokens', 1000) * 4
+        if len(brief) > max_brief_chars:
+            brief = brief[:max_brief_chars] + " ..."
+
+        index = session.project_memory.get('insight_index')
+        if index is None:
+            # Projects remembered without an index (e.g. built by older code paths)
+            index = self.retriever.index_texts(session.project_memory['insights'])
+            session.project_memory['insight_index'] = index
+        conversation = session.memory_for('followup')
+        passages = self.retriever.retrieve(
+            index, f"{question} {conversation.summary}",
+            retrieval_config.get('followup_token_budget', 1500)
+        )
+
         context = {
             'question': question,
-            'brief': self.project_memory['brief'],
-            'insights': self.project_memory['insights']
+            'brief': brief,
+            'insights': self.retriever.format_context(passages) or "No matching passages.",
+            'history': conversation.render()
         }
-        return self.manager.answer_followup(context)
+        answer = await self.manager.aanswer_followup(context)
+        conversation.add_exchange(question, answer)
+        return answer + self._format_sources(passages)
+
+    def _format_sources(self, passages: List) -> str:
+        """List the agents (or synthesis) whose passages informed an answer."""
+        sources = []
+        for passage in passages:
+            source = passage.metadata.get('source')
+            label = self.agents[source].name if source in self.agents else str(source).title()
+            if label not in sources:
+                sources.append(label)
+        return f"\n\n*Sources: {', '.join(sources)}*" if sources else ""
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Analyse a file of briefs offline: python main.py briefs.jsonl --output results.jsonl"""
+    parser = argparse.ArgumentParser(
+        description="Analyse a JSONL or CSV file of project briefs (fields: id, brief, documents, agents). "
+                    "Re-running with the same output resumes an interrupted batch."
+    )
+    parser.add_argument('input', help="JSONL or CSV file of briefs; document paths are relative to it")
+    parser.add_argument('--output', help="JSONL results and checkpoint file (default: <input>.results.jsonl)")
+    parser.add_argument('--markdown-dir', help="Also write a Markdown report per brief to this directory")
+    parser.add_argument('--concurrency', type=int, help="Briefs analysed at once (default: batch.concurrency)")
+    parser.add_argument('--agents', help="Comma-separated specialists to run for briefs that don't name their own")
+    parser.add_argument('--no-cache', action='store_true', help="Bypass the LLM response cache")
+    parser.add_argument('--metrics', help="Write latency and token metrics of the analysed briefs to this "
+                                          "file in OpenMetrics text format")
+    args = parser.parse_args(argv)
+
+    entries = load_briefs(args.input)
+    if args.agents:
+        default_agents = [agent.strip() for agent in args.agents.split(',') if agent.strip()]
+        for entry in entries:
+            entry['agents'] = entry['agents'] or default_agents
+    crew = AICrew()
+    runner = BatchRunner.from_config(
+        crew, crew.config.get('batch'), args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl",
+        concurrency=args.concurrency, markdown_dir=args.markdown_dir, use_cache=False if args.no_cache else None
+    )
+    summary = runner.run(entries)
+    print(format_summary(summary))
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as file:
+            file.write(render_openmetrics(runner.traces))
+    return 1 if summary['failed'] else 0
+
 
 if __name__ == "__main__":
-    crew = AICrew()
\ No newline at end of file
+    sys.exit(main())
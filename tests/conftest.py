@@ -0,0 +1,51 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_llm import FakeOllamaLLM
+from main import AICrew
+
+
+def fast_llm(**overrides) -> FakeOllamaLLM:
+    """A FakeOllamaLLM quick enough to run whole pipelines in a test."""
+    settings = {
+        'completion_tokens': 40,
+        'tokens_per_second': 20000.0,
+        'prompt_tokens_per_second': 1e7,
+        'base_latency': 0.0
+    }
+    return FakeOllamaLLM(**{**settings, **overrides})
+
+
+@pytest.fixture
+def make_crew(tmp_path, monkeypatch):
+    """Build AICrews over a FakeOllamaLLM, with every cache and store under tmp_path.
+
+    Call it with config overrides per section, e.g. make_crew(planning={'mode': 'delimited'}),
+    and llm= for a custom fake model.
+    """
+    # config/config.yaml is read relative to the working directory
+    monkeypatch.chdir(ROOT)
+    load_config = AICrew.load_config
+
+    def build(llm=None, **sections) -> AICrew:
+        def load_test_config(crew):
+            load_config(crew)
+            crew.config['cache']['path'] = str(tmp_path / "llm_cache.sqlite")
+            crew.config['storage']['path'] = str(tmp_path / "projects.sqlite")
+            crew.config['jobs']['path'] = str(tmp_path / "jobs.sqlite")
+            crew.config['documents']['cache_dir'] = str(tmp_path / "documents")
+            crew.config['resilience'].update({'backoff_base': 0.01, 'backoff_max': 0.01})
+            for section, values in sections.items():
+                crew.config[section] = {**(crew.config.get(section) or {}), **values}
+
+        monkeypatch.setattr(AICrew, 'load_config', load_test_config)
+        try:
+            return AICrew(llm=llm or fast_llm())
+        finally:
+            monkeypatch.setattr(AICrew, 'load_config', load_config)
+
+    return build
@@ -0,0 +1,103 @@
+import time
+import asyncio
+import pytest
+from conftest import fast_llm
+from utils.agent_registry import AgentRegistry
+from utils.async_utils import run_sync
+from utils.model_router import ModelRouter, ollama_options
+
+SPECS = {
+    'strategic_lead': {'class': "agents.strategic_lead.StrategicLead"},
+    'tech_architect': {'class': "agents.tech_architect.TechnicalArchitect"},
+    'devops_specialist': {'class': "agents.devops_specialist.DevOpsSpecialist", 'depends_on': ['tech_architect']}
+}
+
+
+def test_registry_orders_by_dependency_chain():
+    registry = AgentRegistry(SPECS, factory=lambda name, agent_class: None)
+    assert registry.critical_path(list(SPECS)) == {'strategic_lead': 1, 'tech_architect': 2, 'devops_specialist': 1}
+    assert registry.dependents('tech_architect') == ['devops_specialist']
+    # Edges to agents left out of a run are ignored
+    assert registry.critical_path(['tech_architect']) == {'tech_architect': 1}
+
+    with pytest.raises(ValueError, match="cycle"):
+        AgentRegistry({**SPECS, 'tech_architect': {**SPECS['tech_architect'], 'depends_on': ['devops_specialist']}},
+                      factory=lambda name, agent_class: None)
+    with pytest.raises(ValueError, match="unknown"):
+        AgentRegistry({'ux_designer': {'class': "agents.ux_designer.UXDesigner", 'depends_on': ['nobody']}},
+                      factory=lambda name, agent_class: None)
+
+
+def test_dependent_agent_starts_after_upstream_with_its_findings(make_crew):
+    # devops_specialist depends on tech_architect in the default config
+    crew = make_crew()
+    calls = {}
+    for agent_name in ('tech_architect', 'devops_specialist'):
+        agent = crew.agents[agent_name]
+
+        async def timed(task, agent=agent, agent_name=agent_name, process=agent.aprocess_task):
+            started = time.perf_counter()
+            result = await process(task)
+            calls[agent_name] = {'started': started, 'finished': time.perf_counter(), 'context': task['context']}
+            return result
+
+        agent.aprocess_task = timed
+
+    crew.process_project("A booking app for dog groomers", agents=['tech_architect', 'devops_specialist'])
+    assert calls['devops_specialist']['started'] >= calls['tech_architect']['finished']
+    assert f"Findings from the {crew.agents['tech_architect'].name}" in calls['devops_specialist']['context']
+    assert "Findings from" not in calls['tech_architect']['context']
+
+
+def test_warm_up_runs_once_per_model_the_plan_does_not_share(make_crew):
+    crew = make_crew()
+    other_model = fast_llm(seed=1)
+    crew.agents['tech_architect'].llm = other_model
+    crew.agents['devops_specialist'].llm = other_model
+    crew.agents['ux_designer'].llm = fast_llm(seed=2)
+    warmed = []
+    for agent_name in crew.agents.select():
+        async def record(brief, agent_name=agent_name):
+            warmed.append(agent_name)
+
+        crew.agents[agent_name].awarm_up = record
+
+    run_sync(crew._awarm_up("A booking app for dog groomers", crew.agents.select()))
+    assert warmed == ['ux_designer', 'tech_architect']
+
+
+def test_warm_up_keeps_the_model_settings():
+    router = ModelRouter(["http://localhost:11434"], llm_settings={'temperature': 0.2, 'top_k': 50, 'num_ctx': 8192})
+    assert ollama_options(router.llm(), num_predict=1) == {
+        'temperature': 0.2, 'top_k': 50, 'num_ctx': 8192, 'num_predict': 1
+    }
+    assert ollama_options(fast_llm(), num_predict=1) == {'num_predict': 1}
+
+
+def test_stalled_condense_does_not_hold_up_dependents(make_crew):
+    crew = make_crew(
+        synthesis={'summary_words': 5},
+        resilience={'agent_timeouts': {'default': 0.5}, 'slot_wait_timeout': 0.5}
+    )
+
+    async def stalled_condense(agent_name, report, max_words):
+        # Holds a model slot and never answers
+        async with crew.manager._llm_call('condense'):
+            await asyncio.sleep(3600)
+
+    crew.manager.acondense_insight = stalled_condense
+    contexts = {}
+    devops = crew.agents['devops_specialist']
+
+    async def capture(task, process=devops.aprocess_task):
+        contexts['devops_specialist'] = task['context']
+        return await process(task)
+
+    devops.aprocess_task = capture
+    started = time.perf_counter()
+    result = crew.process_project("A booking app for dog groomers", agents=['tech_architect', 'devops_specialist'])
+    assert time.perf_counter() - started < 5
+    assert result['missing'] == [] and result['synthesis']
+    findings = contexts['devops_specialist'].split("Findings from the Technical Architect:\n")[1]
+    # The truncated report stands in for the summary
+    assert len(findings.split("\n\n")[0].split()) == 5
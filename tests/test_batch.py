@@ -0,0 +1,57 @@
+import json
+import pytest
+from utils.batch import BatchRunner, brief_digest, load_briefs
+
+
+def write_jsonl(path, rows):
+    path.write_text("\n".join(json.dumps(row) for row in rows))
+    return str(path)
+
+
+def test_load_briefs_normalises_documents_and_agents(tmp_path):
+    path = write_jsonl(tmp_path / "briefs.jsonl", [
+        {'id': 'a', 'brief': "A tool library", 'documents': "deck.pptx", 'agents': "ux_designer"},
+        {'brief': "A habit tracker", 'documents': ["one.pdf", "two.docx"]}
+    ])
+    first, second = load_briefs(path)
+    assert first['documents'] == [str(tmp_path / "deck.pptx")] and first['agents'] == ['ux_designer']
+    assert second['id'] == '2' and len(second['documents']) == 2 and second['agents'] is None
+
+    csv_path = tmp_path / "briefs.csv"
+    csv_path.write_text("id,brief,documents,agents\nx,A tool library,one.pdf;two.pdf,ux_designer;tech_architect\n")
+    assert load_briefs(str(csv_path))[0]['agents'] == ['ux_designer', 'tech_architect']
+
+
+@pytest.mark.parametrize("row, message", [
+    ({'brief': "A tool library", 'documents': {'deck': "deck.pptx"}}, "'documents' must be"),
+    ({'brief': "A tool library", 'agents': [1, 2]}, "'agents' must be"),
+    ({'brief': " "}, "has no brief")
+])
+def test_load_briefs_rejects_malformed_entries(tmp_path, row, message):
+    with pytest.raises(ValueError, match=message):
+        load_briefs(write_jsonl(tmp_path / "briefs.jsonl", [row]))
+
+
+def test_batch_resumes_from_its_checkpoint(make_crew, tmp_path):
+    crew = make_crew()
+    path = write_jsonl(tmp_path / "briefs.jsonl", [
+        {'id': 'a', 'brief': "A tool library for neighbours", 'agents': ["ux_designer"]},
+        {'id': 'b', 'brief': "A habit tracker for remote teams", 'agents': ["ux_designer"]}
+    ])
+    output = str(tmp_path / "results.jsonl")
+    runner = BatchRunner(crew, output, concurrency=2)
+    runner.run(load_briefs(path))
+    assert sorted(runner.completed()) == ['a', 'b']
+    runner = BatchRunner(crew, output, concurrency=2)
+    runner.run(load_briefs(path))
+    assert runner.traces == []
+
+
+def test_digest_changes_when_a_document_is_edited_in_place(tmp_path):
+    document = tmp_path / "notes.txt"
+    document.write_text("Launch in spring.")
+    entry = {'id': 'a', 'brief': "A tool library", 'documents': [str(document)], 'agents': None}
+    digest = brief_digest(entry)
+    assert brief_digest(entry) == digest
+    document.write_text("Launch in autumn.")
+    assert brief_digest(entry) != digest
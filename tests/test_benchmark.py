@@ -0,0 +1,15 @@
+import os
+import shutil
+from conftest import ROOT
+from benchmarks.run_benchmark import parse_args, run
+
+
+def test_benchmark_leaves_no_cache_behind(tmp_path, monkeypatch):
+    shutil.copytree(os.path.join(ROOT, "config"), tmp_path / "config")
+    monkeypatch.chdir(tmp_path)
+    report = run(parse_args([
+        '--concurrency', '2', '--doc-pages', '0,3', '--briefs', '2',
+        '--completion-tokens', '20', '--tokens-per-second', '20000', '--base-latency', '0'
+    ]))
+    assert [scenario['errors'] for scenario in report['scenarios']] == [0, 0]
+    assert sorted(os.listdir(tmp_path)) == ["config"]
@@ -0,0 +1,39 @@
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from utils.chain_registry import ChainRegistry
+from conftest import fast_llm
+
+
+def test_chains_are_reused_per_part_identity():
+    registry = ChainRegistry()
+    template, llm, parser = PromptTemplate.from_template("{task}"), fast_llm(), StrOutputParser()
+    chain = registry.get(template, llm, parser)
+    assert registry.get(template, llm, parser) is chain
+    assert registry.get(template, llm, parser, format="json") is not chain
+    assert registry.get(template, fast_llm(), parser) is not chain
+
+
+def test_reused_ids_never_serve_a_stale_chain():
+    registry = ChainRegistry()
+    template, parser = PromptTemplate.from_template("{task}"), StrOutputParser()
+    old_llm, new_llm = fast_llm(), fast_llm()
+    chain = registry.get(template, old_llm, parser)
+    # Simulate the new model being allocated at the freed model's address
+    key = next(iter(registry._chains))
+    registry._chains[(key[0], id(new_llm), *key[2:])] = registry._chains.pop(key)
+    rebuilt = registry.get(template, new_llm, parser)
+    assert rebuilt is not chain and rebuilt.steps[1] is new_llm
+
+
+def test_least_recently_used_chains_are_evicted():
+    registry = ChainRegistry(max_entries=2)
+    template, parser = PromptTemplate.from_template("{task}"), StrOutputParser()
+    llms = [fast_llm() for _ in range(3)]
+    first = registry.get(template, llms[0], parser)
+    second = registry.get(template, llms[1], parser)
+    assert registry.get(template, llms[0], parser) is first
+    registry.get(template, llms[2], parser)
+    assert len(registry) == 2
+    # llms[1] was the least recently used
+    assert registry.get(template, llms[0], parser) is first
+    assert registry.get(template, llms[1], parser) is not second
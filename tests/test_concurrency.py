@@ -0,0 +1,88 @@
+import asyncio
+from conftest import fast_llm
+from utils.async_utils import run_sync
+from utils.concurrency import AdaptiveLimiter, call_rank
+from utils.llm_cache import LLMResponseCache
+
+
+def test_limiter_caps_in_flight_calls():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot('task'):
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_waiting_calls_are_served_by_priority_then_rank():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    order = []
+
+    async def call(label: str, operation: str, rank: int = 0):
+        call_rank.set(rank)
+        async with limiter.slot(operation):
+            order.append(label)
+
+    async def run():
+        async with limiter.slot('task'):
+            # Queue up behind the held slot, lowest priority first
+            waiting = [
+                asyncio.ensure_future(call('task', 'task')),
+                asyncio.ensure_future(call('task ranked', 'task', rank=2)),
+                asyncio.ensure_future(call('plan', 'plan')),
+                asyncio.ensure_future(call('synthesis', 'synthesis'))
+            ]
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiting)
+
+    asyncio.run(run())
+    assert order == ['synthesis', 'plan', 'task ranked', 'task']
+
+
+def test_limit_shrinks_on_slow_first_tokens_and_grows_back():
+    limiter = AdaptiveLimiter(initial_limit=8, min_limit=1, max_limit=8, target_latency=1.0, backoff=0.5)
+    limiter.observe(5.0)
+    assert int(limiter.limit) == 4
+    limiter.observe(None, failed=True)
+    # Still inside the same congestion window
+    assert int(limiter.limit) == 4
+
+    # The limit only grows while calls are waiting for a slot
+    loop = asyncio.new_event_loop()
+    waiter = loop.create_future()
+    limiter._waiters.append((0, 0, 0, waiter))
+    for _ in range(20):
+        limiter.observe(0.1)
+    loop.close()
+    assert int(limiter.limit) > 4
+    # The raised limit let the waiting call in
+    assert waiter.done() and limiter.in_flight == 1
+
+
+def test_cache_hits_do_not_wait_for_a_slot(make_crew, tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "limiter_cache.sqlite"))
+    crew = make_crew(llm=fast_llm(cache=cache), concurrency={'initial_limit': 1, 'max_limit': 1})
+    agent = crew.agents['tech_architect']
+
+    def task():
+        # A fresh session each time, so no earlier exchange changes the prompt
+        return {'brief': "A booking app for dog groomers", 'task': "Design the API", 'context': "None",
+                'conversation': crew.new_session().memory_for('tech_architect')}
+
+    first = agent.process_task(task())
+
+    async def while_saturated():
+        async with crew.llm_limiter.slot('synthesis'):
+            return await asyncio.wait_for(agent.aprocess_task(task()), 5)
+
+    assert run_sync(while_saturated()) == first
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
@@ -0,0 +1,59 @@
+import pytest
+from utils.document_processor import DocumentProcessor, extract_document, iter_pages
+from benchmarks.run_benchmark import make_deck
+
+
+@pytest.fixture
+def deck(tmp_path):
+    return make_deck(str(tmp_path / "deck.pptx"), 5)
+
+
+def drain(pages):
+    numbers = []
+    while True:
+        try:
+            numbers.append(next(pages)[0])
+        except StopIteration as stop:
+            return numbers, stop.value
+
+
+def test_iter_pages_reports_truncation(deck):
+    assert drain(iter_pages(deck, max_pages=3)) == ([1, 2, 3], True)
+    assert drain(iter_pages(deck, max_pages=5)) == ([1, 2, 3, 4, 5], False)
+
+
+def test_extract_document_applies_page_and_token_limits(deck):
+    document = extract_document(deck, max_pages=2)
+    assert [page['number'] for page in document['pages']] == [1, 2]
+    assert document['truncated']
+    first = document['pages'][0]
+    assert document['text'][first['start']:first['end']].startswith("Section 1")
+
+    # Each slide is a few hundred tokens, so a small budget stops after the first
+    assert len(extract_document(deck, token_budget=50)['pages']) == 1
+    assert not extract_document(deck)['truncated']
+
+
+def test_docx_is_read_paragraph_by_paragraph(tmp_path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    for i in range(40):
+        document.add_paragraph(f"Paragraph {i} about onboarding and payments. " * 5)
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Region"
+    table.rows[0].cells[1].text = "EU"
+    path = str(tmp_path / "brief.docx")
+    document.save(path)
+
+    extracted = extract_document(path)
+    assert len(extracted['pages']) > 1
+    assert "Region | EU" in extracted['text']
+
+
+def test_process_files_parses_in_parallel_and_caches(tmp_path):
+    decks = [make_deck(str(tmp_path / f"deck_{i}.pptx"), 2 + i) for i in range(2)]
+    processor = DocumentProcessor(cache_dir=str(tmp_path / "cache"))
+    first = processor.process_files(decks)
+    assert [len(first[path]['pages']) for path in decks] == [2, 3]
+    assert processor.cached_document(first[decks[0]]['sha256'])['text'] == first[decks[0]]['text']
+    assert processor.process_files(decks) == first
@@ -0,0 +1,68 @@
+REPORTS = {
+    'strategic_lead': "Independent groomers in mid-sized towns are the beachhead segment.",
+    'growth_strategist': "Referral credits for salons that invite their regulars.",
+    'ux_designer': "The booking flow is three screens: pick a groomer, pick a slot, confirm.",
+    'tech_architect': "Store appointments in PostgreSQL with one read replica per region.",
+    'devops_specialist': "Ship containers to Kubernetes with nightly PostgreSQL backups."
+}
+
+
+def analysed_crew(make_crew):
+    """A crew that has analysed one project whose specialist reports are REPORTS."""
+    crew = make_crew()
+    for agent_name, agent in crew.agents.items():
+        async def report(task, agent_name=agent_name):
+            return REPORTS[agent_name]
+
+        agent.aprocess_task = report
+
+    builds = []
+    index_texts = crew.retriever.index_texts
+
+    def counted_index_texts(texts):
+        builds.append(sorted(texts))
+        return index_texts(texts)
+
+    crew.retriever.index_texts = counted_index_texts
+    crew.process_project("A booking app for dog groomers", use_cache=False)
+    return crew, builds
+
+
+def capture_followups(crew):
+    contexts = []
+    answer = crew.manager.aanswer_followup
+
+    async def capture(context):
+        contexts.append(context)
+        return await answer(context)
+
+    crew.manager.aanswer_followup = capture
+    return contexts
+
+
+def test_followup_retrieves_only_the_relevant_insights(make_crew):
+    crew, _ = analysed_crew(make_crew)
+    contexts = capture_followups(crew)
+
+    answer = crew.ask_followup("Which PostgreSQL setup do we need?")
+    insights = contexts[0]['insights']
+    assert REPORTS['tech_architect'] in insights and REPORTS['devops_specialist'] in insights
+    assert REPORTS['ux_designer'] not in insights and REPORTS['growth_strategist'] not in insights
+    assert crew.agents['tech_architect'].name in answer and crew.agents['ux_designer'].name not in answer
+
+    crew.ask_followup("How many screens does the booking flow have?")
+    assert REPORTS['ux_designer'] in contexts[1]['insights']
+    assert REPORTS['tech_architect'] not in contexts[1]['insights']
+
+
+def test_insight_index_is_built_once_and_reused(make_crew):
+    crew, builds = analysed_crew(make_crew)
+    assert builds == [sorted([*REPORTS, 'synthesis'])]
+    index = crew.default_session.project_memory['insight_index']
+    capture_followups(crew)
+
+    for question in ("Which PostgreSQL setup do we need?", "Who is the beachhead segment?",
+                     "How do referral credits work?"):
+        crew.ask_followup(question)
+    assert len(builds) == 1
+    assert crew.default_session.project_memory['insight_index'] is index
@@ -0,0 +1,75 @@
+from utils.incremental import ChangeAnalyzer
+
+BRIEF = "\n".join([
+    "A booking app for dog groomers.",
+    "Groomers publish open slots and owners book and pay online.",
+    "Launch in three cities with a referral programme.",
+    "Owners get reminders before each appointment.",
+    "Groomers see their weekly schedule and earnings."
+])
+
+
+def analyses(trace, operation):
+    return sorted(call.agent for call in trace.calls if call.operation == operation and not call.cached)
+
+
+def test_diff_pairs_edited_lines():
+    changed, ratio = ChangeAnalyzer.diff("Intro\nOld plan\nOutro", "Intro\nNew plan\nOutro\nExtra")
+    assert changed == ["Old plan New plan", "Extra"]
+    assert 0 < ratio < 1
+
+
+def test_unmatched_passages_affect_every_agent():
+    analyzer = ChangeAnalyzer()
+    profiles = {'tech_architect': "Technical Architecture api database", 'ux_designer': "UX Research wireframes"}
+    assert analyzer.relevant_agents(["Design the database api"], profiles) == {'tech_architect'}
+    assert analyzer.relevant_agents(["Zorblat quixotic flanges"], profiles) == set(profiles)
+    assert analyzer.relevant_agents(["Zorblat quixotic flanges"], profiles, {
+        'tech_architect': "flanges", 'ux_designer': "colours"
+    }) == {'tech_architect'}
+
+
+def test_unmatched_edit_reruns_every_specialist(make_crew):
+    crew = make_crew()
+    first = crew.process_project(BRIEF)
+    edited = BRIEF + "\nZorblat quixotic flanges."
+    second = crew.process_project(edited, previous_project_id=first['project_id'])
+    assert second['reused'] == []
+    assert len(analyses(second['trace'], 'task')) == len(crew.agents)
+
+
+def test_reused_reports_keep_their_condensed_summaries(make_crew):
+    crew = make_crew(synthesis={'mode': 'hierarchical', 'summary_words': 10})
+    first = crew.process_project(BRIEF)
+    assert len(analyses(first['trace'], 'condense')) == len(crew.agents)
+    stored = crew.project_store.load_project(first['project_id'])
+    assert set(stored['summaries']) == set(crew.agents)
+
+    edited = BRIEF.replace("with a referral programme", "with a referral programme and SEO landing pages")
+    second = crew.process_project(edited, previous_project_id=first['project_id'], use_cache=False)
+    assert second['reused'] and len(second['reused']) < len(crew.agents)
+    rerun = [agent_name for agent_name in crew.agents if agent_name not in second['reused']]
+    # Only the re-run specialists are condensed; reused ones come with their stored summary
+    assert len(analyses(second['trace'], 'condense')) == len(rerun)
+    assert crew.project_store.load_project(second['project_id'])['summaries'].keys() == stored['summaries'].keys()
+
+
+def test_affected_agents_are_replanned_from_the_new_brief(make_crew):
+    crew = make_crew()
+    first = crew.process_project(BRIEF)
+    old_plan = crew.project_store.load_project(first['project_id'])['plan']
+    tasks = {}
+    agent = crew.agents['growth_strategist']
+
+    async def record(task, process=agent.aprocess_task):
+        tasks['growth_strategist'] = task['task']
+        return await process(task)
+
+    agent.aprocess_task = record
+    edited = BRIEF.replace("with a referral programme", "with a referral programme and SEO landing pages")
+    second = crew.process_project(edited, previous_project_id=first['project_id'])
+    assert 'growth_strategist' not in second['reused']
+    new_plan = crew.project_store.load_project(second['project_id'])['plan']
+    assert tasks['growth_strategist'] == new_plan['growth_strategist'] != old_plan['growth_strategist']
+    assert all(new_plan[agent_name] == old_plan[agent_name] for agent_name in second['reused'])
+    assert analyses(second['trace'], 'plan')
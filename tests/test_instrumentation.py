@@ -0,0 +1,48 @@
+from utils.instrumentation import percentile, render_openmetrics
+
+
+def call(operation: str, cached: bool = False, **values):
+    record = {
+        'agent': 'manager', 'operation': operation, 'wall_time': 1.0, 'queue_wait': 0.5,
+        'time_to_first_token': 0.25, 'prompt_tokens': 10, 'completion_tokens': 40,
+        'tokens_per_second': 20.0, 'cached': cached, 'error': None
+    }
+    record.update(values)
+    return record
+
+
+def samples(text: str):
+    return [line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#")]
+
+
+def test_repeated_calls_are_aggregated_into_one_series():
+    trace = {'run_id': 'r1', 'wall_time': 3.0, 'calls': [call('plan'), call('plan'), call('plan', cached=True)]}
+    text = render_openmetrics([trace])
+    names = [name for name, _ in samples(text)]
+    assert len(names) == len(set(names))
+    values = dict(samples(text))
+    labels = 'run_id="r1",agent="manager",operation="plan",cached="false"'
+    assert values[f'ai_crew_llm_call_seconds_count{{{labels}}}'] == '2'
+    assert values[f'ai_crew_llm_completion_tokens_total{{{labels}}}'] == '80'
+    assert values[f'ai_crew_llm_tokens_per_second{{{labels}}}'] == '20.0'
+    assert text.endswith("# EOF\n")
+
+
+def test_label_values_are_escaped():
+    trace = {'run_id': 'r1', 'wall_time': 1.0, 'calls': [call('plan "repair"\n')]}
+    assert 'operation="plan \\"repair\\"\\n"' in render_openmetrics([trace])
+
+
+def test_pipeline_trace_renders(make_crew):
+    crew = make_crew()
+    result = crew.process_project("A tool library for neighbours")
+    text = result['trace'].to_openmetrics()
+    names = [name for name, _ in samples(text)]
+    assert len(names) == len(set(names))
+    assert 'operation="synthesis"' in text
+
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0], 100) == 3.0
@@ -0,0 +1,98 @@
+import os
+import time
+from conftest import fast_llm
+from utils.job_queue import CANCELLED, DONE, QUEUED, RUNNING, JobQueue
+from benchmarks.run_benchmark import make_deck
+
+
+def upload(tmp_path):
+    directory = tmp_path / "upload"
+    directory.mkdir(exist_ok=True)
+    return make_deck(str(directory / "deck.pptx"), 2)
+
+
+def wait_for(queue, job_id, states, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.status(job_id)
+        if job['status'] in states:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {queue.status(job_id)['status']}")
+
+
+def test_stopped_worker_keeps_documents_for_the_requeued_job(make_crew, tmp_path):
+    crew = make_crew(llm=fast_llm(tokens_per_second=200.0))
+    document = upload(tmp_path)
+    queue = JobQueue(crew, path=crew.config['jobs']['path'], workers=1).start()
+    job_id = queue.submit("user", "A tool library for neighbours", [document], owns_documents=True)
+    wait_for(queue, job_id, (RUNNING,))
+    queue.stop()
+    time.sleep(0.2)
+    assert os.path.exists(document)
+
+    restarted = JobQueue(crew, path=crew.config['jobs']['path'], workers=1)
+    assert restarted.status(job_id)['status'] == QUEUED
+    restarted.start()
+    try:
+        assert wait_for(restarted, job_id, (DONE,))['project_id']
+    finally:
+        restarted.stop()
+    assert not os.path.exists(document)
+
+
+def test_running_job_publishes_events_and_cancel_removes_documents(make_crew, tmp_path):
+    crew = make_crew(llm=fast_llm(tokens_per_second=200.0))
+    document = upload(tmp_path)
+    queue = JobQueue(crew, path=crew.config['jobs']['path'], workers=1).start()
+    try:
+        job_id = queue.submit("user", "A tool library for neighbours", [document], owns_documents=True)
+        deadline = time.monotonic() + 30.0
+        while not queue.events(job_id) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert queue.events(job_id)[0]['type'] == 'agent'
+        assert queue.cancel(job_id)
+        wait_for(queue, job_id, (CANCELLED,))
+        time.sleep(0.2)
+    finally:
+        queue.stop()
+    assert not os.path.exists(document)
+    assert queue.events(job_id) == []
+
+
+def test_cancelling_a_queued_job_removes_its_uploads(make_crew, tmp_path):
+    crew = make_crew()
+    document = upload(tmp_path)
+    # Not started, so the job stays queued
+    queue = JobQueue(crew, path=crew.config['jobs']['path'], workers=1)
+    job_id = queue.submit("user", "A tool library for neighbours", [document], owns_documents=True)
+    assert queue.status(job_id)['status'] == QUEUED
+    assert queue.cancel(job_id)
+    assert queue.status(job_id)['status'] == CANCELLED
+    assert not os.path.exists(document)
+    assert not os.path.exists(os.path.dirname(document))
+
+
+def test_cancel_between_claim_and_start_stops_the_job(make_crew):
+    crew = make_crew()
+    queue = JobQueue(crew, path=crew.config['jobs']['path'], workers=1)
+    claim_next = queue._claim_next
+    cancelled = []
+
+    def claim_then_cancel():
+        # The job is running in the store but its task does not exist yet
+        job = claim_next()
+        if job is not None:
+            cancelled.append(queue.cancel(job['job_id']))
+        return job
+
+    queue._claim_next = claim_then_cancel
+    job_id = queue.submit("user", "A tool library for neighbours")
+    queue.start()
+    try:
+        job = wait_for(queue, job_id, (CANCELLED, DONE))
+    finally:
+        queue.stop()
+    assert cancelled == [True]
+    assert job['status'] == CANCELLED and not job['project_id']
+    assert crew.list_projects() == []
@@ -0,0 +1,74 @@
+import json
+import time
+import sqlite3
+from langchain_core.outputs import Generation
+from conftest import fast_llm
+from utils import llm_cache
+from utils.llm_cache import LLMResponseCache, bypass_cache
+
+PROMPT = "Outline the booking flow for a dog grooming app."
+
+
+def cached_llm(cache, **overrides):
+    return fast_llm(cache=cache, **overrides)
+
+
+def test_identical_prompt_and_model_hit_the_cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.sqlite"))
+    first = cached_llm(cache).invoke(PROMPT)
+    # A new model instance with the same parameters shares the entry
+    assert cached_llm(cache).invoke(PROMPT) == first
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'entries': 1}
+
+    # Entries survive a restart
+    assert cached_llm(LLMResponseCache(cache.path)).invoke(PROMPT) == first
+
+
+def test_changed_model_params_miss_the_cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.sqlite"))
+    cached_llm(cache).invoke(PROMPT)
+    cached_llm(cache, seed=1).invoke(PROMPT)
+    cached_llm(cache, completion_tokens=20).invoke(PROMPT)
+    cached_llm(cache).bind(stop=["\n"]).invoke(PROMPT)
+    assert cache.stats()['hits'] == 0 and cache.stats()['entries'] == 4
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.sqlite"), ttl_seconds=60)
+    cache.update(PROMPT, "model", [Generation(text="Three screens.")])
+    assert cache.lookup(PROMPT, "model")[0].text == "Three screens."
+
+    now = time.time()
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now + 61)
+    assert cache.lookup(PROMPT, "model") is None
+    assert cache.stats()['entries'] == 0
+
+    # Expired entries are also dropped when anything else is written
+    cache.update(PROMPT, "model", [Generation(text="Three screens.")])
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now + 200)
+    cache.update("Another prompt", "model", [Generation(text="Two screens.")])
+    assert cache.stats()['entries'] == 1
+
+
+def test_bypass_skips_lookup_and_write(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.sqlite"))
+    llm = cached_llm(cache)
+    fresh = llm.invoke(PROMPT)
+    # Plant a stale answer so a lookup would be visible in the output
+    stale = json.dumps([{"text": "Stale answer", "generation_info": None}])
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE llm_cache SET value = ?", (stale,))
+
+    with bypass_cache():
+        assert llm.invoke(PROMPT) == fresh
+        llm.invoke("A prompt nobody has cached")
+    with cache.bypass():
+        assert cache.lookup(PROMPT, "model") is None
+        cache.update("Written while bypassed", "model", [Generation(text="Ignored")])
+    assert cache.stats() == {'hits': 0, 'misses': 1, 'hit_rate': 0.0, 'entries': 1}
+    assert cache.lookup("Written while bypassed", "model") is None
+
+    # Outside the block the cache is consulted again
+    assert llm.invoke(PROMPT) == "Stale answer"
+    llm.invoke("A prompt nobody has cached")
+    assert cache.stats()['hits'] == 1 and cache.stats()['entries'] == 2
@@ -0,0 +1,69 @@
+from utils.memory import ConversationMemory
+from utils.retrieval import estimate_tokens
+
+
+def test_buffer_is_bounded_by_messages_and_tokens():
+    memory = ConversationMemory(max_tokens=10000, max_messages=4)
+    for i in range(5):
+        memory.add_exchange(f"Question {i}.", f"Answer {i}.")
+    assert len(memory) == 4
+    assert [message.content for message in memory.messages][0] == "Question 3."
+
+    memory = ConversationMemory(max_tokens=50, max_messages=100)
+    for i in range(5):
+        memory.add_exchange("Describe the onboarding flow. " * 3, "Three screens and a checklist. " * 3)
+    assert sum(estimate_tokens(str(message.content)) for message in memory.messages) <= 50
+    # The newest message is kept even when it alone is over the budget
+    memory.add_exchange("Short question.", "A very long answer. " * 100)
+    assert len(memory) == 1 and memory.messages[0].content.startswith("A very long answer.")
+
+
+def test_evicted_turns_are_folded_into_the_summary():
+    memory = ConversationMemory(max_tokens=10000, max_messages=2)
+    memory.add_exchange("Which payment provider? Consider fees too.", "Stripe. It supports payouts.")
+    memory.add_exchange("Which database?", "Postgres.")
+    assert memory.summary == "User: Which payment provider?\nAssistant: Stripe."
+
+    rendered = memory.render()
+    assert "Earlier conversation (summary):\nUser: Which payment provider?" in rendered
+    assert "Recent conversation:\nUser: Which database?\nAssistant: Postgres." in rendered
+    assert memory.load_memory_variables() == {
+        'summary': memory.summary, 'history': "User: Which database?\nAssistant: Postgres."
+    }
+
+
+def test_summary_is_capped():
+    memory = ConversationMemory(max_tokens=10000, max_messages=1, summary_tokens=30)
+    for i in range(20):
+        memory.add_exchange(f"Question number {i} about the roadmap.", f"Answer number {i} about the roadmap.")
+    assert sum(estimate_tokens(line) for line in memory.summary_lines) <= 30
+    # The oldest lines go first
+    assert "number 19" in memory.summary and "number 0 " not in memory.summary
+
+    memory.clear()
+    assert len(memory) == 0 and memory.summary == "" and memory.render(empty='') == ''
+
+
+def test_specialists_see_their_earlier_work_in_the_session(make_crew):
+    crew = make_crew()
+    agent = crew.agents['tech_architect']
+    session = crew.new_session()
+    prompts = []
+    invoke = agent._ainvoke_chain
+
+    async def record(chain, inputs, **kwargs):
+        prompts.append(inputs['context'])
+        return await invoke(chain, inputs, **kwargs)
+
+    agent._ainvoke_chain = record
+    conversation = session.memory_for('tech_architect')
+    agent.process_task({'brief': "A booking app", 'task': "Design the API", 'context': "None",
+                        'conversation': conversation})
+    agent.process_task({'brief': "A booking app", 'task': "Pick a database", 'context': "None",
+                        'conversation': conversation})
+    assert prompts[0] == "None"
+    assert "Your earlier work on this project:" in prompts[1] and "User: Design the API" in prompts[1]
+    # Other sessions start without it
+    agent.process_task({'brief': "A booking app", 'task': "Design the API", 'context': "None",
+                        'conversation': crew.new_session().memory_for('tech_architect')})
+    assert prompts[2] == "None"
@@ -0,0 +1,112 @@
+import json
+import pytest
+from pydantic import ValidationError
+from conftest import fast_llm
+from agents.manager_agent import PlanStreamParser, ProjectManager, parse_project_plan
+
+WELL_FORMED = """STRATEGIC_LEAD
+---
+Size the market for dog groomers.
+---
+
+**GROWTH_STRATEGIST:**
+---
+Plan the referral programme.
+---
+"""
+
+
+def parse(chunks):
+    parser = PlanStreamParser()
+    sections = []
+    for chunk in chunks:
+        sections.extend(parser.feed(chunk))
+    return sections + parser.finish()
+
+
+def test_well_formed_stream():
+    assert parse([WELL_FORMED]) == [
+        ('strategic_lead', "Size the market for dog groomers."),
+        ('growth_strategist', "Plan the referral programme.")
+    ]
+
+
+def test_sections_close_as_soon_as_their_separator_arrives():
+    parser = PlanStreamParser()
+    assert parser.feed("STRATEGIC_LEAD\n---\nSize the market.\n") == []
+    assert parser.feed("---\nGROWTH") == [('strategic_lead', "Size the market.")]
+
+
+def test_missing_separator_before_the_next_header():
+    text = "STRATEGIC_LEAD\n---\nSize the market.\nValidate pricing.\n\nUX_DESIGNER\n---\nSketch the booking flow.\n---\n"
+    assert parse([text]) == [
+        ('strategic_lead', "Size the market.\nValidate pricing."),
+        ('ux_designer', "Sketch the booking flow.")
+    ]
+
+
+def test_header_and_separator_split_across_chunks():
+    chunks = [WELL_FORMED[i:i + 3] for i in range(0, len(WELL_FORMED), 3)]
+    assert parse(chunks) == parse([WELL_FORMED])
+    assert parse(["TECH_ARCH", "ITECT\n-", "--\nDesign the API.\n--", "-\n"]) == [('tech_architect', "Design the API.")]
+
+
+def test_truncated_final_section():
+    assert parse(["DEVOPS_SPECIALIST\n---\nSet up CI and monitor"]) == [('devops_specialist', "Set up CI and monitor")]
+    # A header whose body never arrived leaves that role to its default task
+    assert parse(["UX_DESIGNER\n---\nSketch flows.\n---\nTECH_ARCHITECT\n---\n"]) == [('ux_designer', "Sketch flows.")]
+
+
+PLAN = {
+    'strategic_lead': "Size the market for dog groomers.",
+    'growth_strategist': "Plan the referral programme.",
+    'ux_designer': "Sketch the booking flow.",
+    'tech_architect': "Design the scheduling API.",
+    'devops_specialist': "Set up CI and monitoring."
+}
+
+
+def scripted_manager(responses, **planning):
+    """A structured-mode ProjectManager whose model calls return responses in order."""
+    manager = ProjectManager(llm=fast_llm(), planning_config={'mode': 'structured', **planning})
+    calls = []
+
+    async def invoke(chain, inputs, operation="task", **kwargs):
+        calls.append(inputs)
+        return responses[len(calls) - 1]
+
+    manager._ainvoke_chain = invoke
+    return manager, calls
+
+
+def test_valid_json_plan_is_used_as_is():
+    manager, calls = scripted_manager([json.dumps(PLAN)])
+    assert manager.create_project_plan("A booking app for dog groomers") == PLAN
+    assert len(calls) == 1
+    # Fences and chatter around the object are tolerated
+    assert parse_project_plan(f"Here is the plan:\n```json\n{json.dumps(PLAN)}\n```") == PLAN
+
+
+def test_malformed_plan_is_repaired():
+    broken = json.dumps({**PLAN, 'ux_designer': ""})[:-1]
+    manager, calls = scripted_manager([broken, json.dumps(PLAN)])
+    assert manager.create_project_plan("A booking app for dog groomers") == PLAN
+    assert len(calls) == 2
+    assert calls[1]['output'] == broken
+    assert calls[1]['error']
+
+
+def test_plan_falls_back_to_default_tasks_after_max_repairs():
+    manager, calls = scripted_manager(["not json", '{"strategic_lead": ""}'], max_repairs=1)
+    assert manager.create_project_plan("A booking app for dog groomers") == manager._get_default_tasks()
+    assert len(calls) == 2
+    with pytest.raises(ValidationError):
+        parse_project_plan("not json")
+
+
+def test_crew_plans_with_each_mode(make_crew):
+    for mode in ('structured', 'delimited'):
+        crew = make_crew(planning={'mode': mode})
+        plan = crew.manager.create_project_plan("A booking app for dog groomers")
+        assert set(plan) == set(PLAN)
+        assert plan != crew.manager._get_default_tasks()
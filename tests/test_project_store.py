@@ -0,0 +1,79 @@
+import sqlite3
+import pytest
+from utils import project_store
+from utils.project_store import ProjectStore
+from utils.sqlite_utils import connect
+
+
+def save(store, project_id, title="A booking app for dog groomers", **fields):
+    return store.save_project(
+        project_id, title, fields.get('brief', title), [{'name': "deck.pptx", 'sha256': "ab12"}],
+        {'tech_architect': "Design the API"}, {'tech_architect': "Use PostgreSQL."}, "Build it.",
+        {'wall_time': 1.5}, fields.get('summaries')
+    )
+
+
+def test_saved_project_loads_back_after_a_restart(tmp_path):
+    store = ProjectStore(str(tmp_path / "projects.sqlite"))
+    assert save(store, "run1", summaries={'tech_architect': "PostgreSQL."}) == "run1"
+
+    project = ProjectStore(store.path).load_project("run1")
+    assert {key: value for key, value in project.items() if key != 'created_at'} == {
+        'project_id': "run1",
+        'title': "A booking app for dog groomers",
+        'brief': "A booking app for dog groomers",
+        'documents': [{'name': "deck.pptx", 'sha256': "ab12"}],
+        'plan': {'tech_architect': "Design the API"},
+        'insights': {'tech_architect': "Use PostgreSQL."},
+        'synthesis': "Build it.",
+        'timings': {'wall_time': 1.5},
+        'summaries': {'tech_architect': "PostgreSQL."}
+    }
+    assert store.load_project("unknown") is None
+    # Saving the same run again replaces it
+    save(store, "run1", title="Renamed")
+    assert store.load_project("run1")['title'] == "Renamed" and store.load_project("run1")['summaries'] == {}
+
+
+def test_projects_are_listed_newest_first(tmp_path, monkeypatch):
+    store = ProjectStore(str(tmp_path / "projects.sqlite"))
+    for i, project_id in enumerate(["run1", "run2", "run3"]):
+        monkeypatch.setattr(project_store.time, 'time', lambda i=i: 1000.0 + i)
+        save(store, project_id, title=f"Project {i}")
+    assert [project['project_id'] for project in store.list_projects()] == ["run3", "run2", "run1"]
+    assert store.list_projects(limit=1) == [{'project_id': "run3", 'title': "Project 2", 'created_at': 1002.0}]
+
+    assert store.delete_project("run2") and not store.delete_project("run2")
+    assert [project['project_id'] for project in store.list_projects()] == ["run3", "run1"]
+
+
+def test_store_connections_commit_and_close(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    with connect(path) as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+        conn.execute("INSERT INTO items VALUES ('deck')")
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    with pytest.raises(RuntimeError), connect(path) as conn:
+        conn.execute("INSERT INTO items VALUES ('draft')")
+        raise RuntimeError("rolled back")
+    with connect(path) as conn:
+        assert conn.execute("SELECT name FROM items").fetchall() == [('deck',)]
+
+
+def test_crew_reopens_a_stored_project_without_calling_the_model(make_crew):
+    crew = make_crew()
+    result = crew.process_project("A booking app for dog groomers", session=crew.new_session())
+    assert [project['project_id'] for project in crew.list_projects()] == [result['project_id']]
+
+    reopened = make_crew()
+
+    def no_model_calls(*args, **kwargs):
+        raise AssertionError("a stored project must load without model calls")
+
+    reopened.manager._ainvoke_chain = no_model_calls
+    session = reopened.new_session()
+    project = reopened.load_project(result['project_id'], session=session)
+    assert project['synthesis'] == result['synthesis']
+    assert session.project_memory['insights'] == project['insights'] and session.project_memory['insight_index']
+    assert reopened.load_project("unknown", session=session) is None
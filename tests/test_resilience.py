@@ -0,0 +1,186 @@
+import time
+import asyncio
+import httpx
+import ollama
+import pytest
+from utils.concurrency import AdaptiveLimiter, slot_acquired
+from utils.model_router import ModelRouter
+from utils.resilience import RetryPolicy, is_transient, run_with_deadline
+from conftest import fast_llm
+from utils.async_utils import run_sync
+
+
+def test_transient_errors():
+    request = httpx.Request('POST', 'http://localhost:11434/api/generate')
+    assert is_transient(ConnectionError())
+    assert is_transient(httpx.HTTPStatusError('busy', request=request, response=httpx.Response(503, request=request)))
+    assert not is_transient(httpx.HTTPStatusError('bad', request=request, response=httpx.Response(400, request=request)))
+    assert not is_transient(ValueError())
+
+
+def test_retries_transient_failures_only():
+    policy = RetryPolicy(max_retries=2, backoff_base=0.001)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("refused")
+        return "ok"
+
+    assert asyncio.run(policy.call(flaky)) == "ok"
+    assert len(attempts) == 3
+
+    async def broken():
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    attempts.clear()
+    with pytest.raises(ValueError):
+        asyncio.run(policy.call(broken))
+    assert len(attempts) == 1
+
+
+def test_hedged_call_keeps_the_first_answer():
+    policy = RetryPolicy(hedge_after=0.01)
+    delays = [0.5, 0.0]
+
+    async def attempt():
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return delay
+
+    assert asyncio.run(policy.call(attempt, 'task')) == 0.0
+
+
+def test_pipeline_survives_injected_failures(make_crew):
+    crew = make_crew(llm=fast_llm(failure_rate=0.2, seed=3))
+    result = crew.process_project("A marketplace for local bakeries")
+    assert 'error' not in result
+    assert result['synthesis']
+    assert result['project_id']
+
+
+class FailingEndpointLLM:
+    def __init__(self, error):
+        self.error = error
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        raise self.error
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        raise self.error
+        yield
+
+    async def _astream(self, prompt, stop=None, run_manager=None, **kwargs):
+        raise self.error
+        yield
+
+
+def routed_llm(first_error):
+    router = ModelRouter(["http://a:11434", "http://b:11434"], health_check_interval=1e9)
+    first, second = router.endpoints
+    first._llms["llama3.2"] = FailingEndpointLLM(first_error)
+    second._llms["llama3.2"] = fast_llm()
+    return router, router.llm("llama3.2")
+
+
+@pytest.mark.parametrize("error", [ollama.ResponseError("overloaded", 503), ollama.ResponseError("model not found", 404)])
+def test_router_fails_over_on_server_errors_and_missing_models(error):
+    router, llm = routed_llm(error)
+    assert llm.invoke("Say hello")
+    assert asyncio.run(llm.ainvoke("Say hello again"))
+    # The healthy endpoint is now tried first
+    assert router.candidates("llama3.2")[0] is router.endpoints[1]
+
+
+def test_router_fails_over_streams_before_the_first_chunk():
+    router, llm = routed_llm(httpx.ConnectError("connection refused"))
+    assert "".join(llm.stream("Say hello"))
+    assert not router.endpoints[0].healthy and router.endpoints[1].in_flight == 0
+
+
+def test_router_fails_over_streams_without_a_first_token():
+    class SilentEndpointLLM:
+        def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+            time.sleep(1)
+            yield from fast_llm()._stream(prompt, stop, run_manager, **kwargs)
+
+    router = ModelRouter(["http://a:11434", "http://b:11434"], health_check_interval=1e9, first_token_timeout=0.1)
+    router.endpoints[0]._llms["llama3.2"] = SilentEndpointLLM()
+    router.endpoints[1]._llms["llama3.2"] = fast_llm()
+    started = time.perf_counter()
+    assert "".join(router.llm("llama3.2").stream("Say hello"))
+    assert time.perf_counter() - started < 1
+    assert router.endpoints[0].slow
+
+
+def test_router_raises_client_errors():
+    router, llm = routed_llm(ollama.ResponseError("invalid option", 400))
+    with pytest.raises(ollama.ResponseError):
+        llm.invoke("Say hello")
+    with pytest.raises(ollama.ResponseError):
+        asyncio.run(llm.ainvoke("Say hello"))
+    with pytest.raises(ollama.ResponseError):
+        list(llm.stream("Say hello"))
+    assert router.endpoints[0].healthy
+
+
+def test_deadline_starts_once_a_slot_is_acquired():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+
+        async def call(seconds):
+            async with limiter.slot('task'):
+                slot_acquired.get()()
+                await asyncio.sleep(seconds)
+            return seconds
+
+        async with limiter.slot('task'):
+            # Queued behind a 0.3s call, then served in 0.1s: within a 0.2s deadline
+            queued = asyncio.ensure_future(run_with_deadline(call(0.1), 0.2))
+            await asyncio.sleep(0.3)
+        assert await queued == 0.1
+
+        with pytest.raises(TimeoutError, match=r"no answer within 0\.05s"):
+            await run_with_deadline(call(0.2), 0.05)
+        async with limiter.slot('task'):
+            with pytest.raises(TimeoutError, match=r"no model slot within 0\.1s"):
+                await run_with_deadline(call(0.1), 1.0, slot_timeout=0.1)
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_busy_limiter_does_not_time_out_specialists(make_crew):
+    # One slot shared by every call: the last specialist waits far longer than its deadline to start
+    crew = make_crew(
+        llm=fast_llm(tokens_per_second=150.0),
+        concurrency={'initial_limit': 1, 'min_limit': 1, 'max_limit': 1},
+        resilience={'agent_timeouts': {'default': 0.5}}
+    )
+    result = crew.process_project("A tool library for neighbours")
+    tasks = [call for call in result['trace'].calls if call.operation == 'task']
+    assert len(tasks) == len(crew.agents) and not any(call.error for call in tasks)
+    assert max(call.queue_wait for call in tasks) > 0.5
+
+
+def test_planning_deadline_starts_once_the_plan_has_a_slot(make_crew):
+    # The plan call queues behind a held slot for longer than the planning timeout
+    crew = make_crew(
+        concurrency={'initial_limit': 1, 'min_limit': 1, 'max_limit': 1},
+        connection={'warm_up': False},
+        planning={'speculative': True, 'timeout': 0.3}
+    )
+    session = crew.new_session()
+
+    async def scenario():
+        async with crew.llm_limiter.slot('task'):
+            run = asyncio.ensure_future(crew.aprocess_project("A tool library for neighbours", session=session))
+            await asyncio.sleep(0.6)
+        return await run
+
+    result = run_sync(scenario())
+    assert result['synthesis'] and result['missing'] == []
+    default_tasks = crew.manager._get_default_tasks()
+    assert all(task != default_tasks[agent_name] for agent_name, task in session.project_memory['plan'].items())
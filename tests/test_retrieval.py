@@ -0,0 +1,68 @@
+import re
+from langchain_core.documents import Document
+from benchmarks.run_benchmark import make_deck
+from utils.retrieval import BM25Index, DocumentRetriever, estimate_tokens
+
+CITATION = re.compile(r"\[deck\.pptx, page \d+\]\n")
+
+
+def index(*texts):
+    return BM25Index([Document(page_content=text) for text in texts])
+
+
+def test_bm25_ranks_by_relevance():
+    docs = index(
+        "Deployment pipeline with blue green deployment and deployment rollback.",
+        "Onboarding funnel for new groomers, with one deployment step.",
+        "Pricing tiers for salons and independent groomers.",
+    )
+    ranked = [doc.page_content for doc, _ in docs.search("deployment rollback", top_k=5)]
+    assert ranked == [docs.documents[0].page_content, docs.documents[1].page_content]
+    scores = [score for _, score in docs.search("groomers deployment", top_k=5)]
+    assert scores == sorted(scores, reverse=True) and len(scores) == 3
+    assert len(docs.search("groomers deployment", top_k=1)) == 1
+    # Stopwords and unknown terms match nothing
+    assert docs.search("the and of") == docs.search("kubernetes") == []
+
+
+def test_retrieval_respects_the_token_budget():
+    retriever = DocumentRetriever(chunk_size=200, chunk_overlap=0, top_k=8, token_budget=120)
+    docs = retriever.index_texts({f"notes{i}": f"API latency targets for region {i}. " * 5 for i in range(10)})
+    assert len(docs) == 10
+    for budget in (None, 60, 0):
+        chunks = retriever.retrieve(docs, "API latency targets", budget)
+        assert sum(estimate_tokens(doc.page_content) for doc in chunks) <= (120 if budget is None else budget)
+    assert len(retriever.retrieve(docs, "API latency targets")) == 2
+    assert retriever.retrieve(docs, "API latency targets", 0) == []
+
+
+def test_empty_corpus_retrieves_nothing():
+    retriever = DocumentRetriever()
+    empty = retriever.index_texts({'synthesis': "", 'ux_designer': "   "})
+    assert len(empty) == 0 and len(retriever.build_index({})) == 0
+    assert empty.search("booking flow") == []
+    assert retriever.retrieve(empty, "booking flow") == retriever.retrieve(None, "booking flow") == []
+    assert retriever.format_context([]) == ""
+
+
+def test_each_specialist_gets_excerpts_within_its_own_budget(make_crew, tmp_path):
+    budgets = {'tech_architect': 80, 'ux_designer': 400}
+    crew = make_crew(retrieval={'chunk_size': 300, 'chunk_overlap': 0, 'token_budget': 200,
+                                'agent_token_budgets': budgets})
+    contexts = {}
+    for agent_name, agent in crew.agents.items():
+        async def capture(task, agent_name=agent_name, process=agent.aprocess_task):
+            contexts[agent_name] = task['context']
+            return await process(task)
+
+        agent.aprocess_task = capture
+
+    deck = make_deck(str(tmp_path / "deck.pptx"), 20)
+    crew.process_project("A booking app for dog groomers", documents=[deck], use_cache=False)
+    chunk_counts = {}
+    for agent_name, context in contexts.items():
+        chunks = CITATION.split(context)[1:]
+        assert chunks
+        assert sum(estimate_tokens(chunk.strip()) for chunk in chunks) <= budgets.get(agent_name, 200)
+        chunk_counts[agent_name] = len(chunks)
+    assert chunk_counts['tech_architect'] < chunk_counts['strategic_lead'] < chunk_counts['ux_designer']
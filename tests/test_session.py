@@ -0,0 +1,30 @@
+from utils.model_router import ModelRouter
+
+
+def test_sessions_share_the_crew_but_not_their_projects(make_crew):
+    crew = make_crew()
+    first, second = crew.new_session(), crew.new_session()
+    crew.process_project("A booking app for dog groomers", session=first)
+    agents = {agent_name: crew.agents[agent_name] for agent_name in crew.agents.select()}
+    crew.process_project("A habit tracker for remote teams", session=second)
+
+    # Agents are built once and reused by every session
+    assert all(crew.agents[agent_name] is agent for agent_name, agent in agents.items())
+    assert "dog groomers" in first.project_memory['brief'] and "habit tracker" in second.project_memory['brief']
+    assert first.project_memory['project_id'] != second.project_memory['project_id']
+    assert not crew.default_session.has_project()
+
+    crew.ask_followup("Which payment provider?", session=first)
+    assert len(first.memory_for('followup')) == 2 and len(second.memory_for('followup')) == 0
+    assert first.memory_for('tech_architect') is not second.memory_for('tech_architect')
+
+
+def test_routed_models_keep_their_connections(make_crew):
+    crew = make_crew()
+    router = ModelRouter.from_config(crew.config['model'], connection_settings=crew.connection_settings())
+    assert router.llm() is router.llm_for('tech_architect')
+    endpoint = router.endpoints[0]
+    ollama_llm = endpoint.llm(router.default_model)
+    # One client per endpoint and model, keeping the model loaded between calls
+    assert endpoint.llm(router.default_model) is ollama_llm
+    assert ollama_llm.keep_alive == crew.config['connection']['model_keep_alive']
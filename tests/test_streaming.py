@@ -0,0 +1,36 @@
+from utils.llm_cache import LLMResponseCache
+from conftest import fast_llm
+
+
+def stream(crew, brief):
+    events = list(crew.stream_project(brief, session=crew.new_session()))
+    synthesis = "".join(event['content'] for event in events if event['type'] == 'synthesis')
+    trace = events[-1]['content']
+    return synthesis, {call.operation: call for call in trace.calls}
+
+
+def test_streamed_plan_and_synthesis_are_cached(make_crew, tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "stream_cache.sqlite"))
+    # Delimited planning streams the plan as well as the synthesis
+    crew = make_crew(llm=fast_llm(cache=cache), planning={'mode': 'delimited', 'speculative': True})
+    brief = "A booking app for dog groomers with Stripe payments"
+
+    first_synthesis, first_calls = stream(crew, brief)
+    assert not first_calls['synthesis'].cached
+    assert not first_calls['plan'].cached
+
+    second_synthesis, second_calls = stream(crew, brief)
+    assert second_synthesis == first_synthesis
+    assert second_calls['synthesis'].cached
+    assert second_calls['plan'].cached
+
+
+def test_streamed_calls_respect_the_bypass(make_crew, tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "stream_cache.sqlite"))
+    crew = make_crew(llm=fast_llm(cache=cache), planning={'mode': 'delimited'})
+    brief = "A habit tracker for remote teams"
+    stream(crew, brief)
+
+    events = list(crew.stream_project(brief, use_cache=False, session=crew.new_session()))
+    calls = events[-1]['content'].calls
+    assert calls and not any(call.cached for call in calls)
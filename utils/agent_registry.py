@@ -0,0 +1,140 @@
+import logging
+import importlib
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+
+def import_object(path: str) -> Any:
+    """Import 'package.module.Name' and return Name."""
+    module_name, _, attribute = path.rpartition('.')
+    if not module_name:
+        raise ValueError(f"Expected a dotted path like 'agents.module.ClassName', got '{path}'")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class AgentRegistry(Mapping):
+    """The specialists declared in the `agents` config section, built on first use.
+
+    Each entry names its class as a dotted path; the module is only imported
+    and the agent only constructed when the agent is first looked up, so a
+    crew that never runs an agent never pays for it. Iteration follows the
+    config order and skips entries with `enabled: false`. The role and
+    tools in the config replace the class defaults, and `depends_on` lists
+    the agents whose findings an agent builds on.
+    """
+
+    def __init__(self, specs: Dict[str, Dict[str, Any]], factory: Callable[[str, type], Any]):
+        """
+        Initialize the registry.
+
+        :param specs: Agent name -> {'class', 'role', 'tools', 'enabled', 'depends_on'}
+        :param factory: Called as factory(name, agent_class) to construct and wire up an agent
+        :raises ValueError: If an agent has no class, depends on an unknown agent or the dependencies form a cycle
+        """
+        for name, spec in specs.items():
+            if not spec.get('class'):
+                raise ValueError(f"Agent '{name}' has no class in the agents config")
+            unknown = [dependency for dependency in spec.get('depends_on') or [] if dependency not in specs]
+            if unknown:
+                raise ValueError(f"Agent '{name}' depends on unknown agents: {', '.join(unknown)}")
+        self.specs = specs
+        self.factory = factory
+        self._agents: Dict[str, Any] = {}
+        self.critical_path(list(specs))
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], factory: Callable[[str, type], Any]) -> "AgentRegistry":
+        return cls({name: spec or {} for name, spec in (config or {}).items()}, factory)
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._agents:
+            if name not in self.specs:
+                raise KeyError(name)
+            self._agents[name] = self._build(name)
+        return self._agents[name]
+
+    def __contains__(self, name: object) -> bool:
+        # Membership must not build the agent
+        return name in self.specs
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, spec in self.specs.items() if spec.get('enabled', True))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def _build(self, name: str) -> Any:
+        spec = self.specs[name]
+        agent = self.factory(name, import_object(spec['class']))
+        if spec.get('role'):
+            agent.role = spec['role']
+        if spec.get('tools') is not None:
+            agent.tools = list(spec['tools'])
+        logging.info(f"Loaded agent {name} ({spec['class']})")
+        return agent
+
+    def select(self, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Resolve the specialists to run.
+
+        :param names: Agent names to run, in any order; None for every enabled agent
+        :return: The names in config order
+        :raises ValueError: If a name is not declared in the config or nothing is selected
+        """
+        if names is None:
+            selected = list(self)
+        else:
+            unknown = [name for name in names if name not in self.specs]
+            if unknown:
+                raise ValueError(f"Unknown agents: {', '.join(unknown)} (available: {', '.join(self.specs)})")
+            # Explicitly named agents run even if disabled by default
+            selected = [name for name in self.specs if name in names]
+        if not selected:
+            raise ValueError("No agents selected to run")
+        return selected
+
+    def dependencies(self, name: str, selected: Optional[List[str]] = None) -> List[str]:
+        """
+        Agents whose output the agent needs.
+
+        :param name: Agent name
+        :param selected: Agents taking part in the run; dependencies outside it are dropped
+        :return: Upstream agent names
+        """
+        dependencies = self.specs[name].get('depends_on') or []
+        return [dependency for dependency in dependencies if selected is None or dependency in selected]
+
+    def dependents(self, name: str, selected: Optional[List[str]] = None) -> List[str]:
+        """Agents (among selected, if given) that depend on the agent."""
+        return [other for other in (selected or self.specs) if name in self.dependencies(other, selected)]
+
+    def critical_path(self, selected: List[str]) -> Dict[str, int]:
+        """
+        Length, in agents, of the longest dependency chain starting at each agent.
+
+        Agents heading longer chains should be served first so their dependents can start sooner.
+
+        :param selected: Agents taking part in the run
+        :return: Agent name -> chain length (1 for an agent nothing depends on)
+        :raises ValueError: If the dependencies form a cycle
+        """
+        lengths: Dict[str, int] = {}
+        visiting: List[str] = []
+
+        def visit(name: str) -> int:
+            if name in lengths:
+                return lengths[name]
+            if name in visiting:
+                cycle = visiting[visiting.index(name):] + [name]
+                raise ValueError(f"Agent dependencies form a cycle: {' -> '.join(cycle)}")
+            visiting.append(name)
+            lengths[name] = 1 + max((visit(other) for other in self.dependents(name, selected)), default=0)
+            visiting.pop()
+            return lengths[name]
+
+        for name in selected:
+            visit(name)
+        return lengths
+
+    def loaded(self) -> Dict[str, Any]:
+        """Agents constructed so far."""
+        return dict(self._agents)
@@ -0,0 +1,69 @@
+import queue
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide background event loop, starting it on first use.
+
+    All LLM traffic runs on this one loop so that async HTTP clients keep
+    their pooled connections instead of being bound to short-lived loops.
+    """
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="ai-crew-event-loop",
+                daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine on the background loop and block until it finishes."""
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("run_sync() cannot be called from the background event loop")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def iter_sync(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """Iterate an async generator from synchronous code.
+
+    The generator runs as a single task on the background loop (so context
+    variables set inside it persist across yields) and hands items over
+    through a thread-safe queue.
+    """
+    loop = get_event_loop()
+    items: queue.Queue = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except Exception as e:
+            items.put((None, e))
+        finally:
+            items.put((done, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # Stop the producer if the consumer walks away early
+        future.cancel()
@@ -0,0 +1,275 @@
+import os
+import re
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from utils.async_utils import run_sync
+from utils.document_processor import file_sha256
+from utils.instrumentation import percentile
+
+DONE = 'done'
+FAILED = 'failed'
+
+
+def load_briefs(path: str) -> List[Dict[str, Any]]:
+    """
+    Read briefs from a JSONL or CSV file.
+
+    Each entry has a 'brief' and optionally an 'id' (defaults to the line or
+    row number), 'documents' (paths, relative to the input file) and
+    'agents'. In CSV files, documents and agents are separated by ';'; in
+    JSONL they are lists of strings, and a single string is taken as a
+    one-item list.
+
+    :param path: Input file; CSV if it ends in .csv, JSONL otherwise
+    :return: Entries with 'id', 'brief', 'documents' and 'agents' ('agents' None for all)
+    :raises ValueError: If an entry has no brief, two entries share an id, or documents or agents
+                        is neither a string nor a list of strings
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if path.lower().endswith('.csv'):
+            rows = [
+                {key: (value.split(';') if key in ('documents', 'agents') and value else value)
+                 for key, value in row.items() if value}
+                for row in csv.DictReader(file)
+            ]
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+
+    entries = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        if not str(row.get('brief') or '').strip():
+            raise ValueError(f"Entry {number} of {path} has no brief")
+        entry_id = str(row.get('id') or number)
+        if entry_id in seen:
+            raise ValueError(f"Duplicate brief id '{entry_id}' in {path}")
+        seen.add(entry_id)
+        documents = _string_list(row, 'documents', number, path)
+        agents = _string_list(row, 'agents', number, path)
+        entries.append({
+            'id': entry_id,
+            'brief': row['brief'],
+            'documents': [os.path.join(base_dir, document.strip()) for document in documents],
+            'agents': [agent.strip() for agent in agents] or None
+        })
+    return entries
+
+
+def _string_list(row: Dict[str, Any], key: str, number: int, path: str) -> List[str]:
+    value = row.get(key) or []
+    if isinstance(value, str):
+        # Iterating a bare string would treat each character as a path or agent name
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"Entry {number} of {path}: '{key}' must be a string or a list of strings, "
+                         f"got {json.dumps(value)}")
+    return value
+
+
+def brief_digest(entry: Dict[str, Any]) -> str:
+    """Fingerprint of an entry's inputs, so a checkpoint is not reused for an edited brief or document."""
+    # Documents are hashed by content, as edits in place keep their paths
+    documents = [[path, file_sha256(path) if os.path.isfile(path) else None] for path in entry['documents']]
+    payload = json.dumps([entry['brief'], documents, entry['agents']], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BatchRunner:
+    """Analyses many briefs with one crew, checkpointing every result to a JSONL file.
+
+    All briefs share the crew's LLM response cache, document cache, limiter
+    and compiled chains; each gets its own session. At most `concurrency`
+    briefs are in flight. Every finished brief is appended to the output
+    file straight away. Re-running with the same output skips the briefs
+    already done with unchanged inputs, so an interrupted batch resumes
+    where it stopped. Failed briefs are tried again.
+    """
+
+    def __init__(self, crew, output_path: str, concurrency: int = 4, markdown_dir: Optional[str] = None,
+                 use_cache: bool = True):
+        """
+        Initialize the runner.
+
+        :param crew: AICrew that runs the analyses
+        :param output_path: JSONL file receiving one record per brief; doubles as the checkpoint
+        :param concurrency: Briefs analysed at once
+        :param markdown_dir: Directory receiving a Markdown report per brief, None for none
+        :param use_cache: Whether runs may reuse cached LLM responses
+        """
+        self.crew = crew
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.markdown_dir = markdown_dir
+        self.use_cache = use_cache
+        # Traces of the briefs analysed by this runner, e.g. for render_openmetrics
+        self.traces: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, crew, config: Optional[Dict], output_path: str, **overrides: Any) -> "BatchRunner":
+        """Build a runner from the `batch` config section; overrides that are not None win."""
+        config = config or {}
+        settings = {
+            'concurrency': config.get('concurrency', 4),
+            'markdown_dir': config.get('markdown_dir'),
+            'use_cache': config.get('use_cache', True),
+            **{key: value for key, value in overrides.items() if value is not None}
+        }
+        return cls(crew, output_path, **settings)
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Latest record per brief id that finished successfully, from the output file."""
+        records = {}
+        if not os.path.exists(self.output_path):
+            return records
+        with open(self.output_path, 'r', encoding='utf-8') as file:
+            for number, line in enumerate(file, start=1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line half written
+                    logging.warning(f"Ignoring unreadable line {number} of {self.output_path}")
+                    continue
+                records[record['id']] = record
+        return {entry_id: record for entry_id, record in records.items() if record.get('status') == DONE}
+
+    def run(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyse the entries (see load_briefs) and return the batch summary."""
+        return run_sync(self.arun(entries))
+
+    async def arun(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Asynchronously analyse the entries and return the batch summary.
+
+        :param entries: Briefs as returned by load_briefs
+        :return: Counts, wall time, throughput, latency percentiles and token totals of this invocation
+        """
+        completed = self.completed()
+        # Taken before the run, so a document edited meanwhile is analysed again on resume
+        digests = await asyncio.to_thread(lambda: {entry['id']: brief_digest(entry) for entry in entries})
+        pending = [
+            entry for entry in entries
+            if completed.get(entry['id'], {}).get('inputs_sha256') != digests[entry['id']]
+        ]
+        skipped = len(entries) - len(pending)
+        if skipped:
+            logging.info(f"Resuming: {skipped} of {len(entries)} briefs already done")
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._end_partial_line()
+        if self.markdown_dir:
+            os.makedirs(self.markdown_dir, exist_ok=True)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        records = []
+
+        async def one(entry: Dict[str, Any]) -> None:
+            async with semaphore:
+                record = await self._aprocess(entry, digests[entry['id']])
+            await asyncio.to_thread(self._write, record)
+            records.append(record)
+            logging.info(f"Brief {entry['id']} {record['status']} in {record['seconds']:.1f}s "
+                         f"({len(records)}/{len(pending)})")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(entry) for entry in pending))
+        return self._summary(records, skipped, time.perf_counter() - start)
+
+    async def _aprocess(self, entry: Dict[str, Any], digest: str) -> Dict[str, Any]:
+        session = self.crew.new_session()
+        start = time.perf_counter()
+        try:
+            result = await self.crew.aprocess_project(
+                entry['brief'], entry['documents'] or None, self.use_cache, session, entry['agents']
+            )
+        except Exception as e:
+            result = {'error': str(e) or type(e).__name__}
+        trace = result['trace'].to_dict() if result.get('trace') is not None else None
+        calls = trace['calls'] if trace is not None else []
+        if trace is not None:
+            self.traces.append(trace)
+        return {
+            'id': entry['id'],
+            'status': FAILED if 'error' in result else DONE,
+            'inputs_sha256': digest,
+            'project_id': result.get('project_id'),
+            'error': result.get('error'),
+            'missing': result.get('missing', []),
+            'synthesis': result.get('synthesis'),
+            'insights': session.project_memory.get('insights', {}) if 'error' not in result else {},
+            'seconds': time.perf_counter() - start,
+            'llm_calls': len(calls),
+            'cached_calls': sum(1 for call in calls if call['cached']),
+            'prompt_tokens': sum(call['prompt_tokens'] or 0 for call in calls),
+            'completion_tokens': sum(call['completion_tokens'] or 0 for call in calls),
+            'finished_at': time.time()
+        }
+
+    def _end_partial_line(self) -> None:
+        # Start appending on a fresh line if a crash cut the last record short
+        if not os.path.exists(self.output_path) or not os.path.getsize(self.output_path):
+            return
+        with open(self.output_path, 'rb+') as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                file.write(b"\n")
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            with open(self.output_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                # The output is the checkpoint; make sure a finished brief survives a crash
+                os.fsync(file.fileno())
+            if self.markdown_dir and record['status'] == DONE:
+                with open(os.path.join(self.markdown_dir, f"{_safe_name(record['id'])}.md"), 'w',
+                          encoding='utf-8') as file:
+                    file.write(self._markdown(record))
+
+    def _markdown(self, record: Dict[str, Any]) -> str:
+        sections = [f"# {record['id']}", "## Synthesis", record['synthesis'] or ""]
+        for agent_name, insight in record['insights'].items():
+            agent = self.crew.agents.get(agent_name)
+            sections.extend([f"## {agent.name if agent else agent_name}", insight])
+        return "\n\n".join(sections) + "\n"
+
+    def _summary(self, records: List[Dict[str, Any]], skipped: int, wall: float) -> Dict[str, Any]:
+        latencies = [record['seconds'] for record in records if record['status'] == DONE]
+        return {
+            'processed': len(records),
+            'done': len(latencies),
+            'failed': sum(1 for record in records if record['status'] == FAILED),
+            'skipped': skipped,
+            'wall_seconds': wall,
+            'throughput_per_hour': len(records) / wall * 3600 if wall else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'max': max(latencies, default=0.0),
+            'llm_calls': sum(record['llm_calls'] for record in records),
+            'cached_calls': sum(record['cached_calls'] for record in records),
+            'completion_tokens': sum(record['completion_tokens'] for record in records)
+        }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Render a batch summary for the terminal."""
+    return (
+        f"{summary['processed']} briefs processed ({summary['done']} done, {summary['failed']} failed), "
+        f"{summary['skipped']} already done\n"
+        f"Wall time {summary['wall_seconds']:.1f}s, {summary['throughput_per_hour']:.1f} briefs/hour\n"
+        f"Latency p50 {summary['p50']:.1f}s  p95 {summary['p95']:.1f}s  max {summary['max']:.1f}s\n"
+        f"{summary['llm_calls']} LLM calls ({summary['cached_calls']} cached), "
+        f"{summary['completion_tokens']} completion tokens"
+    )
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value)[:100] or "brief"
@@ -0,0 +1,146 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+# Lower values are served first when calls are waiting for a slot
+DEFAULT_PRIORITIES = {
+    'followup': 0,
+    'expand': 0,
+    'synthesis': 0,
+    'condense': 0,
+    'plan': 1,
+    'warmup': 1,
+    'task': 2
+}
+
+# Tie-breaker among waiting calls of the same priority, higher first. Set per asyncio
+# task, e.g. to a specialist's critical-path length so agents with dependents go first.
+call_rank: ContextVar[int] = ContextVar('call_rank', default=0)
+
+# Called whenever an LLM call of this asyncio task gets its slot (or starts, without a limiter);
+# run_with_deadline uses it to start a specialist's deadline once it is actually being served.
+slot_acquired: ContextVar[Optional[Callable[[], None]]] = ContextVar('slot_acquired', default=None)
+
+
+class AdaptiveLimiter:
+    """Process-wide cap on in-flight LLM calls with priorities and an AIMD limit.
+
+    Calls wait in a priority queue (then by call_rank, then FIFO) for one of
+    `limit` slots. The limit grows additively (about one slot per `limit`
+    successful calls) while calls are queued and the model server answers
+    quickly, and shrinks multiplicatively when time to first token exceeds
+    the target or a call fails, at most once per congestion window. Time to
+    first token is used rather than total latency because it rises with
+    server-side queueing but not with answer length.
+
+    All methods must be used from the shared background event loop.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 target_latency: float = 5.0, backoff: float = 0.7,
+                 priorities: Optional[Dict[str, int]] = None):
+        """
+        Initialize the limiter.
+
+        :param initial_limit: Concurrent calls allowed at start
+        :param min_limit: Lower bound of the adaptive limit
+        :param max_limit: Upper bound of the adaptive limit
+        :param target_latency: Time to first token in seconds above which the limit is reduced
+        :param backoff: Factor applied to the limit on congestion
+        :param priorities: Priority per operation (plan, task, synthesis, ...), lower runs first
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.priorities = {**DEFAULT_PRIORITIES, **(priorities or {})}
+        self.in_flight = 0
+        self._waiters: List = []
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["AdaptiveLimiter"]:
+        config = config or {}
+        if not config.get('enabled', True):
+            return None
+        return cls(
+            initial_limit=config.get('initial_limit', 4),
+            min_limit=config.get('min_limit', 1),
+            max_limit=config.get('max_limit', 16),
+            target_latency=config.get('target_first_token_seconds', 5.0),
+            backoff=config.get('backoff', 0.7),
+            priorities=config.get('priorities')
+        )
+
+    def priority_for(self, operation: str) -> int:
+        return self.priorities.get(operation, max(self.priorities.values()))
+
+    @asynccontextmanager
+    async def slot(self, operation: str):
+        """Hold one call slot for the duration of the block, waiting by the operation's priority."""
+        await self._acquire(self.priority_for(operation))
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, -call_rank.get(), next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as we were cancelled; hand it on
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            *_, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Waiter was cancelled while queued
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def observe(self, latency: Optional[float], failed: bool = False) -> None:
+        """
+        Adapt the limit to one finished call.
+
+        :param latency: Time to first token in seconds, None if unknown (e.g. a cache hit)
+        :param failed: Whether the call raised an error
+        """
+        now = time.monotonic()
+        if failed or (latency is not None and latency > self.target_latency):
+            # One decrease per congestion window, not one per call that was already in flight
+            if now - self._last_decrease > (latency or self.target_latency):
+                previous = self.limit
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                if int(previous) != int(self.limit):
+                    logging.info(f"LLM concurrency limit lowered to {int(self.limit)}")
+        elif latency is not None and self._waiters:
+            previous = self.limit
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            if int(previous) != int(self.limit):
+                logging.info(f"LLM concurrency limit raised to {int(self.limit)}")
+                self._wake()
+
+    def stats(self) -> Dict[str, float]:
+        queued = sum(1 for *_, future in self._waiters if not future.done())
+        return {'limit': int(self.limit), 'in_flight': self.in_flight, 'queued': queued}
@@ -1,7 +1,39 @@
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
-from pptx import Presentation
+import os
+import json
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+from utils.retrieval import estimate_tokens
+
+# Bump when extraction output changes so stale cache entries are ignored
+EXTRACTOR_VERSION = 3
+# DOCX has no real pages; its paragraphs are grouped into pseudo-pages of about this many characters
+DOCX_PAGE_CHARS = 3000
+# Parser processes must not be forked from the app: forking a process that runs the event loop,
+# Streamlit and HTTP client threads can copy a held lock into the child and deadlock it
+_POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
 
 class DocumentProcessor:
+    def __init__(self, cache_dir: Optional[str] = ".cache/documents", max_workers: Optional[int] = None,
+                 max_pages: Optional[int] = None, token_budget: Optional[int] = None):
+        """
+        Initialize the DocumentProcessor.
+
+        :param cache_dir: Directory for extracted-text cache files, None to disable caching
+        :param max_workers: Maximum parser processes for process_files (defaults to CPU count)
+        :param max_pages: Stop extracting a document after this many pages/slides
+        :param token_budget: Stop extracting a document once this many tokens were read
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.token_budget = token_budget
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
     def process_file(self, file_path):
         if file_path.endswith('.pdf'):
             return self._process_pdf(file_path)
@@ -9,20 +41,200 @@ class DocumentProcessor:
             return self._process_docx(file_path)
         elif file_path.endswith('.pptx'):
             return self._process_pptx(file_path)
-            
+
     def _process_pdf(self, file_path):
+        from langchain_community.document_loaders import PyPDFLoader
         loader = PyPDFLoader(file_path)
         return loader.load()
-        
+
     def _process_docx(self, file_path):
+        from langchain_community.document_loaders import Docx2txtLoader
         loader = Docx2txtLoader(file_path)
         return loader.load()
-        
+
     def _process_pptx(self, file_path):
+        from pptx import Presentation
         prs = Presentation(file_path)
         text = []
         for slide in prs.slides:
             for shape in slide.shapes:
                 if hasattr(shape, "text"):
                     text.append(shape.text)
-        return text
\ No newline at end of file
+        return text
+
+    def process_files(self, file_paths: List[str]) -> Dict[str, Dict]:
+        """
+        Extract plain text from several documents, parsing uncached files in parallel.
+
+        Each result is a dict with 'path', 'sha256', 'text', 'pages' and
+        'truncated', where 'pages' lists {'number', 'start', 'end'} character
+        offsets into 'text' (pages for PDFs, slides for decks, paragraph groups
+        for DOCX). Extraction stops early at the processor's page/token limits.
+
+        :param file_paths: Paths of the documents to process
+        :return: Mapping of file path to extracted document
+        """
+        results = {}
+        pending = {}
+        for path in file_paths:
+            digest = file_sha256(path)
+            cached = self._load_cached(digest)
+            if cached is not None:
+                cached['path'] = path
+                results[path] = cached
+            else:
+                pending[path] = digest
+
+        if len(pending) == 1:
+            # Not worth starting a process pool for a single document
+            path, digest = next(iter(pending.items()))
+            results[path] = extract_document(path, digest, self.max_pages, self.token_budget)
+        elif pending:
+            workers = min(len(pending), self.max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+                futures = {
+                    path: executor.submit(extract_document, path, digest, self.max_pages, self.token_budget)
+                    for path, digest in pending.items()
+                }
+                for path, future in futures.items():
+                    results[path] = future.result()
+
+        for path in pending:
+            self._store_cached(results[path])
+        return {path: results[path] for path in file_paths}
+
+    def cached_document(self, digest: str) -> Optional[Dict]:
+        """Return the extraction of a previously processed document by its SHA-256, or None if it is not cached."""
+        return self._load_cached(digest)
+
+    def _cache_path(self, digest: str) -> str:
+        # Limits change the extracted text, so they are part of the cache key
+        limits = f"p{self.max_pages or 'all'}-t{self.token_budget or 'all'}"
+        return os.path.join(self.cache_dir, f"{digest}.v{EXTRACTOR_VERSION}.{limits}.json")
+
+    def _load_cached(self, digest: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(digest), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable document cache entry {digest}: {e}")
+            return None
+
+    def _store_cached(self, document: Dict) -> None:
+        if not self.cache_dir:
+            return
+        path = self._cache_path(document['sha256'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(document, file)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not cache extracted text for {document['path']}: {e}")
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    context = multiprocessing.get_context(_POOL_START_METHOD)
+    if _POOL_START_METHOD == 'forkserver':
+        # Workers fork from a clean server process that has the parsers' module imported already
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_pages(file_path: str, max_pages: Optional[int] = None,
+               token_budget: Optional[int] = None) -> Generator[Tuple[int, str], None, bool]:
+    """
+    Lazily yield (page_number, text) so that only one page is held at a time.
+
+    :param file_path: Path of the document
+    :param max_pages: Stop after this many pages
+    :param token_budget: Stop once the yielded text reaches this many tokens
+    :return: Iterator over pages (PDF), slides (PPTX) or pseudo-pages (DOCX); its return value
+        (StopIteration.value) is True if the limits cut the document short
+    """
+    used = 0
+    for number, text in enumerate(_iter_raw_pages(file_path), start=1):
+        # A page beyond the limits proves the document was cut short
+        if (max_pages is not None and number > max_pages) or (token_budget is not None and used >= token_budget):
+            return True
+        yield number, text
+        used += estimate_tokens(text)
+    return False
+
+
+def _iter_raw_pages(file_path: str) -> Iterator[str]:
+    # Loaders are imported on first use: they are slow to import and most runs have no documents
+    if file_path.endswith('.pdf'):
+        from langchain_community.document_loaders import PyPDFLoader
+        for page in PyPDFLoader(file_path).lazy_load():
+            yield page.page_content
+    elif file_path.endswith('.docx'):
+        from docx import Document
+        yield from _group_paragraphs(_docx_paragraphs(Document(file_path)))
+    elif file_path.endswith('.pptx'):
+        from pptx import Presentation
+        for slide in Presentation(file_path).slides:
+            yield "\n".join(shape.text for shape in slide.shapes if hasattr(shape, "text"))
+    else:
+        raise ValueError(f"Unsupported document type: {file_path}")
+
+
+def _docx_paragraphs(document) -> Iterator[str]:
+    # Paragraphs and table rows in document order, without joining the whole text first
+    for block in document.iter_inner_content():
+        if hasattr(block, 'rows'):
+            for row in block.rows:
+                yield " | ".join(cell.text for cell in row.cells)
+        elif block.text:
+            yield block.text
+
+
+def _group_paragraphs(paragraphs: Iterable[str]) -> Iterator[str]:
+    page = []
+    size = 0
+    for paragraph in paragraphs:
+        page.append(paragraph)
+        size += len(paragraph)
+        if size >= DOCX_PAGE_CHARS:
+            yield "\n\n".join(page)
+            page, size = [], 0
+    if page:
+        yield "\n\n".join(page)
+
+
+def extract_document(file_path: str, digest: Optional[str] = None, max_pages: Optional[int] = None,
+                     token_budget: Optional[int] = None) -> Dict:
+    """Extract a document into plain text with page offsets. Runs in worker processes."""
+    pages = []
+    parts = []
+    offset = 0
+    page_iter = iter_pages(file_path, max_pages, token_budget)
+    while True:
+        try:
+            number, page_text = next(page_iter)
+        except StopIteration as stop:
+            truncated = stop.value
+            break
+        parts.append(page_text)
+        pages.append({'number': number, 'start': offset, 'end': offset + len(page_text)})
+        offset += len(page_text) + 2  # account for the separator below
+    return {
+        'path': file_path,
+        'sha256': digest or file_sha256(file_path),
+        'text': "\n\n".join(parts),
+        'pages': pages,
+        'truncated': truncated
+    }
@@ -0,0 +1,97 @@
+import difflib
+from typing import Dict, List, Optional, Set, Tuple
+from langchain_core.documents import Document
+from utils.retrieval import BM25Index
+
+
+class ChangeAnalyzer:
+    """Decides which specialists of a stored run are affected by an edit to its brief.
+
+    The old and new briefs are diffed line by line. Each changed passage is
+    then scored against a profile of every agent (e.g. its role, tools and
+    task) with BM25, falling back to a broader profile (e.g. including its
+    previous report) for passages that match no profile. Agents scoring close
+    to the best match count as affected; a passage that matches no agent at
+    all could matter to any of them, so it affects every agent. Edits that
+    change most of the brief are better served by a full run, which re-plans
+    the work.
+    """
+
+    def __init__(self, max_changed_ratio: float = 0.5, relevance_ratio: float = 0.5):
+        """
+        Initialize the analyzer.
+
+        :param max_changed_ratio: Share of changed brief text above which incremental re-analysis is not worth it
+        :param relevance_ratio: A changed line affects every agent scoring at least this fraction of the best score
+        """
+        self.max_changed_ratio = max_changed_ratio
+        self.relevance_ratio = relevance_ratio
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ChangeAnalyzer":
+        config = config or {}
+        return cls(
+            max_changed_ratio=config.get('max_changed_ratio', 0.5),
+            relevance_ratio=config.get('relevance_ratio', 0.5)
+        )
+
+    @staticmethod
+    def diff(old_text: str, new_text: str) -> Tuple[List[str], float]:
+        """
+        Compare two texts line by line.
+
+        :param old_text: Previous text
+        :param new_text: Current text
+        :return: Changed passages (an edited line together with its replacement, or an added or
+                 removed line), and the changed share of the text by characters
+        """
+        old_lines = [line.strip() for line in old_text.splitlines() if line.strip()]
+        new_lines = [line.strip() for line in new_text.splitlines() if line.strip()]
+        changed = []
+        changed_chars = 0
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False).get_opcodes():
+            if tag == 'equal':
+                continue
+            removed, added = old_lines[i1:i2], new_lines[j1:j2]
+            changed_chars += sum(len(line) for line in removed + added)
+            # An edited line is judged with what replaced it, not as an unrelated removal and addition
+            paired = min(len(removed), len(added))
+            changed.extend(f"{before} {after}" for before, after in zip(removed, added))
+            changed.extend(removed[paired:] + added[paired:])
+        total = sum(len(line) for line in old_lines + new_lines)
+        return changed, (changed_chars / total) if total else 0.0
+
+    def worth_it(self, changed_ratio: float) -> bool:
+        return changed_ratio <= self.max_changed_ratio
+
+    def relevant_agents(self, passages: List[str], profiles: Dict[str, str],
+                        fallback_profiles: Optional[Dict[str, str]] = None) -> Set[str]:
+        """
+        Agents whose profile matches any of the changed passages.
+
+        :param passages: Changed text, e.g. from diff
+        :param profiles: Agent name -> text describing the agent's work
+        :param fallback_profiles: Broader agent descriptions tried for passages no profile matches
+        :return: Names of the affected agents; all of them if a passage matches no profile
+        """
+        if not passages or not profiles:
+            return set()
+        indexes = [self._index(profiles)] + ([self._index(fallback_profiles)] if fallback_profiles else [])
+        affected = set()
+        for passage in passages:
+            for index in indexes:
+                matches = index.search(passage, top_k=len(index))
+                if matches:
+                    best = matches[0][1]
+                    affected.update(
+                        doc.metadata['agent'] for doc, score in matches if score >= best * self.relevance_ratio
+                    )
+                    break
+            else:
+                # Nothing says who the edit is for, so nobody's report can be trusted to be current
+                return set(profiles)
+        return affected
+
+    @staticmethod
+    def _index(profiles: Dict[str, str]) -> BM25Index:
+        return BM25Index([Document(page_content=text, metadata={'agent': name}) for name, text in profiles.items()])
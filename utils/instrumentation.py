@@ -0,0 +1,255 @@
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Trace of the run currently executing in this context (None outside a traced run)
+current_trace: ContextVar[Optional["RunTrace"]] = ContextVar("current_trace", default=None)
+
+
+class CallRecord:
+    """Timing and token usage of a single LLM chain call."""
+
+    def __init__(self, agent: str, operation: str, queued_at: float):
+        self.agent = agent
+        self.operation = operation
+        self.queued_at = queued_at
+        self.started_at: Optional[float] = None
+        self.llm_started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.eval_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def wall_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        start = self.llm_started_at or self.started_at
+        return None if start is None else max(0.0, start - self.queued_at)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None or self.started_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def cached(self) -> bool:
+        # The model was never contacted, so the LLM cache answered
+        return self.finished_at is not None and self.llm_started_at is None and self.error is None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if not self.completion_tokens:
+            return None
+        if self.eval_seconds:
+            return self.completion_tokens / self.eval_seconds
+        if self.first_token_at is not None and self.finished_at is not None and self.finished_at > self.first_token_at:
+            return self.completion_tokens / (self.finished_at - self.first_token_at)
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'agent': self.agent,
+            'operation': self.operation,
+            'wall_time': self.wall_time,
+            'queue_wait': self.queue_wait,
+            'time_to_first_token': self.time_to_first_token,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'tokens_per_second': self.tokens_per_second,
+            'cached': self.cached,
+            'error': self.error
+        }
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Callback handler that fills a CallRecord from LangChain LLM events."""
+
+    # Called directly on the event loop so timestamps are not skewed by an executor hop
+    run_inline = True
+
+    def __init__(self, record: CallRecord):
+        self.record = record
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        if self.record.llm_started_at is None:
+            self.record.llm_started_at = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.record.first_token_at is None and token:
+            self.record.first_token_at = time.perf_counter()
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        # Ollama reports exact token counts and durations on the final chunk
+        try:
+            info = response.generations[0][0].generation_info or {}
+        except (AttributeError, IndexError):
+            info = {}
+        if info.get('prompt_eval_count') is not None:
+            self.record.prompt_tokens = info['prompt_eval_count']
+        if info.get('eval_count') is not None:
+            self.record.completion_tokens = info['eval_count']
+        if info.get('eval_duration'):
+            self.record.eval_seconds = info['eval_duration'] / 1e9
+
+
+class RunTrace:
+    """Per-run collection of CallRecords, returned alongside the synthesis."""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.calls: List[CallRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: CallRecord) -> None:
+        with self._lock:
+            self.calls.append(record)
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    @property
+    def wall_time(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = [record.to_dict() for record in self.calls]
+        return {
+            'run_id': self.run_id,
+            'wall_time': self.wall_time,
+            'prompt_tokens': sum(call['prompt_tokens'] or 0 for call in calls),
+            'completion_tokens': sum(call['completion_tokens'] or 0 for call in calls),
+            'calls': calls
+        }
+
+    def to_openmetrics(self) -> str:
+        """Render the trace in Prometheus/OpenMetrics text exposition format."""
+        return render_openmetrics([self.to_dict()])
+
+
+# (record key, metric family, OpenMetrics type, help text); summaries get _count/_sum, counters _total
+_METRICS = [
+    ('wall_time', 'ai_crew_llm_call_seconds', 'summary', 'Wall time of LLM calls'),
+    ('queue_wait', 'ai_crew_llm_queue_wait_seconds', 'summary', 'Time LLM calls waited before reaching the model'),
+    ('time_to_first_token', 'ai_crew_llm_ttft_seconds', 'summary', 'Time to first generated token'),
+    ('prompt_tokens', 'ai_crew_llm_prompt_tokens', 'counter', 'Prompt tokens evaluated'),
+    ('completion_tokens', 'ai_crew_llm_completion_tokens', 'counter', 'Completion tokens generated')
+]
+
+
+def render_openmetrics(traces: List[Dict[str, Any]]) -> str:
+    """
+    Render run traces in Prometheus/OpenMetrics text exposition format.
+
+    Calls are aggregated per run, agent, operation and cache status, so
+    repeated calls (e.g. plan repairs) add up in one series.
+
+    :param traces: Traces as returned by RunTrace.to_dict() (also what the project store keeps)
+    :return: Exposition text ending in # EOF
+    """
+    series: Dict[Tuple[str, ...], Dict[str, List[float]]] = {}
+    for trace in traces:
+        for call in trace['calls']:
+            labels = (trace['run_id'], call['agent'], call['operation'], str(call['cached']).lower())
+            values = series.setdefault(labels, {'generated_tokens': [], 'generation_seconds': []})
+            for key, *_ in _METRICS:
+                if call[key] is not None:
+                    values.setdefault(key, []).append(call[key])
+            if call['completion_tokens'] and call['tokens_per_second']:
+                values['generated_tokens'].append(call['completion_tokens'])
+                values['generation_seconds'].append(call['completion_tokens'] / call['tokens_per_second'])
+
+    lines = []
+    for key, name, metric_type, description in _METRICS:
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"# HELP {name} {description}.")
+        for labels, values in series.items():
+            if key not in values:
+                continue
+            if metric_type == 'summary':
+                lines.append(f"{name}_count{{{_labels(labels)}}} {len(values[key])}")
+                lines.append(f"{name}_sum{{{_labels(labels)}}} {sum(values[key])}")
+            else:
+                lines.append(f"{name}_total{{{_labels(labels)}}} {sum(values[key])}")
+    lines.append("# TYPE ai_crew_llm_tokens_per_second gauge")
+    lines.append("# HELP ai_crew_llm_tokens_per_second Generation throughput.")
+    for labels, values in series.items():
+        if sum(values['generation_seconds']):
+            rate = sum(values['generated_tokens']) / sum(values['generation_seconds'])
+            lines.append(f"ai_crew_llm_tokens_per_second{{{_labels(labels)}}} {rate}")
+    lines.append("# TYPE ai_crew_run_seconds gauge")
+    lines.append("# HELP ai_crew_run_seconds Wall time of the whole run.")
+    for trace in traces:
+        lines.append(f"ai_crew_run_seconds{{{_labels((trace['run_id'],))}}} {trace['wall_time']}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(values: Tuple[str, ...]) -> str:
+    names = ('run_id', 'agent', 'operation', 'cached')
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile of values, taking the sample closest to rank pct% of the way from lowest to highest
+    without interpolating (0.0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@contextmanager
+def start_trace(run_id: Optional[str] = None):
+    """Make a new RunTrace current for every LLM call made inside this block."""
+    trace = RunTrace(run_id)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        current_trace.reset(token)
+
+
+@contextmanager
+def trace_call(agent: str, operation: str, queued_at: Optional[float] = None):
+    """
+    Record one LLM chain call on the current trace.
+
+    Yields the callbacks list to pass in the chain's RunnableConfig.
+    """
+    record = CallRecord(agent, operation, queued_at if queued_at is not None else time.perf_counter())
+    record.started_at = time.perf_counter()
+    try:
+        yield [TraceCallbackHandler(record)]
+    except BaseException as e:
+        record.error = str(e) or type(e).__name__
+        raise
+    finally:
+        record.finished_at = time.perf_counter()
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(record)
+        logging.info(
+            f"{agent} {operation} finished in {record.wall_time:.2f}s"
+            f" (queue {record.queue_wait or 0.0:.2f}s, completion tokens {record.completion_tokens})"
+        )
@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+from utils.async_utils import get_event_loop, run_sync
+from utils.sqlite_utils import connect
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(RuntimeError):
+    """Raised by JobQueue.submit when admission control rejects a job."""
+
+
+class JobQueue:
+    """Persistent queue of project analyses drained by a fixed pool of workers.
+
+    Jobs live in SQLite so queued work survives a restart (jobs that were
+    running when the process died are queued again). Workers are coroutines
+    on the shared background loop, so at most `workers` analyses hit the
+    model server at once however many users submit. The next job is taken
+    from the user with the fewest running jobs, then the user served least
+    recently, so one user's batch cannot starve everyone else. Results are
+    stored by the crew's project store; a finished job records its project id.
+    While a job runs, its specialist reports and synthesis chunks are kept in
+    memory as events, so the app can show them before the job finishes.
+    """
+
+    def __init__(self, crew, path: str = ".cache/jobs.sqlite", workers: int = 2,
+                 max_queued: int = 50, max_per_user: int = 3):
+        """
+        Initialize the queue and requeue jobs interrupted by a previous shutdown.
+
+        :param crew: AICrew that runs the analyses; it must have a project store
+        :param path: Location of the SQLite database file
+        :param workers: Analyses run concurrently
+        :param max_queued: Queued jobs allowed in total before submissions are rejected
+        :param max_per_user: Queued or running jobs allowed per user
+        """
+        if crew.project_store is None:
+            raise ValueError("JobQueue needs the crew's project store to keep job results")
+        self.crew = crew
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self._lock = threading.Lock()
+        # Claimed jobs; None until the worker has started the job's task
+        self._running: Dict[str, Optional[asyncio.Task]] = {}
+        # Claimed jobs cancelled before their task started, see cancel()
+        self._cancel_requested: Set[str] = set()
+        # Progress events of running jobs, see events()
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        self._running_by_user: Dict[str, int] = {}
+        self._last_served: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with connect(self.path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    brief TEXT NOT NULL,
+                    documents TEXT NOT NULL,
+                    use_cache INTEGER NOT NULL,
+                    owns_documents INTEGER NOT NULL,
+                    agents TEXT,
+                    previous_project_id TEXT,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT NOT NULL DEFAULT '',
+                    project_id TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            # Nothing is running yet in this process; pick interrupted jobs up again
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = 0, message = 'Requeued after restart' WHERE status = ?",
+                (QUEUED, RUNNING)
+            )
+
+    @classmethod
+    def from_config(cls, crew, config: Optional[Dict]) -> "JobQueue":
+        config = config or {}
+        return cls(
+            crew,
+            path=config.get('path', '.cache/jobs.sqlite'),
+            workers=config.get('workers', 2),
+            max_queued=config.get('max_queued', 50),
+            max_per_user=config.get('max_per_user', 3)
+        )
+
+    def start(self) -> "JobQueue":
+        """Start the worker pool on the background event loop."""
+        if not self._worker_tasks:
+            run_sync(self._astart())
+        return self
+
+    async def _astart(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._worker_tasks = [asyncio.ensure_future(self._worker(i)) for i in range(self.workers)]
+        logging.info(f"Started {self.workers} analysis workers")
+
+    def stop(self) -> None:
+        """Stop the workers; running jobs are queued again the next time the queue is created."""
+        loop = get_event_loop()
+        for task in self._worker_tasks:
+            loop.call_soon_threadsafe(task.cancel)
+        self._worker_tasks = []
+
+    def submit(self, user_id: str, project_brief: str, documents: Optional[List[str]] = None,
+               use_cache: bool = True, owns_documents: bool = False, agents: Optional[List[str]] = None,
+               previous_project_id: Optional[str] = None) -> str:
+        """
+        Queue a project analysis.
+
+        :param user_id: Submitting user or session, used for per-user limits and fair scheduling
+        :param project_brief: The project brief
+        :param documents: Paths of attached documents; they must stay readable until the job runs
+        :param use_cache: Whether the run may reuse cached LLM responses
+        :param owns_documents: Delete the documents (and their directory, if left empty) once the job ends
+        :param agents: Specialists to run, None for every enabled one
+        :param previous_project_id: Stored run to update incrementally instead of analysing from scratch
+        :return: The job id
+        :raises QueueFullError: If the queue or the user's share of it is full
+        :raises ValueError: If agents names an unknown specialist
+        """
+        if agents is not None:
+            # Reject a bad selection now rather than failing the job later
+            agents = self.crew.agents.select(agents)
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, connect(self.path) as conn:
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError("The analysis queue is full, please try again in a few minutes")
+            active = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)", (user_id, QUEUED, RUNNING)
+            ).fetchone()[0]
+            if active >= self.max_per_user:
+                raise QueueFullError(f"You already have {active} analyses in progress")
+            conn.execute(
+                "INSERT INTO jobs (job_id, user_id, brief, documents, use_cache, owns_documents, agents, "
+                "previous_project_id, status, message, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'Waiting for a worker', ?)",
+                (job_id, user_id, project_brief, json.dumps(documents or []), int(use_cache),
+                 int(owns_documents), json.dumps(agents) if agents is not None else None, previous_project_id,
+                 QUEUED, time.time())
+            )
+        if self._wakeup is not None:
+            get_event_loop().call_soon_threadsafe(self._wakeup.set)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a job's state, or None if it does not exist.
+
+        The dict has 'job_id', 'user_id', 'status', 'progress' (0 to 1),
+        'message', 'project_id', 'error', timestamps and, for queued jobs,
+        'position' (jobs ahead of it in the queue).
+        """
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT job_id, user_id, status, progress, message, project_id, error, created_at, "
+                "started_at, finished_at FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(zip(
+                ('job_id', 'user_id', 'status', 'progress', 'message', 'project_id', 'error',
+                 'created_at', 'started_at', 'finished_at'),
+                row
+            ))
+            if job['status'] == QUEUED:
+                job['position'] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, job['created_at'])
+                ).fetchone()[0]
+        return job
+
+    def events(self, job_id: str, start: int = 0) -> List[Dict[str, Any]]:
+        """
+        Return the events a running job has produced so far, from index start on.
+
+        Events are the 'agent' (one specialist report), 'error' and 'synthesis'
+        (one chunk of the final report) events of AICrew.stream_project. They are
+        only kept while the job runs; once it has finished, load its project.
+
+        :param job_id: Job id returned by submit
+        :param start: Number of events the caller has already seen
+        :return: New events, oldest first
+        """
+        with self._lock:
+            return list(self._events.get(job_id, [])[start:])
+
+    def list_jobs(self, user_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return recent jobs, optionally for one user, newest first."""
+        query = "SELECT job_id FROM jobs"
+        params: tuple = ()
+        if user_id is not None:
+            query += " WHERE user_id = ?"
+            params = (user_id,)
+        with connect(self.path) as conn:
+            rows = conn.execute(query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [job for job in (self.status(row[0]) for row in rows) if job]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it had already finished."""
+        with self._lock, connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT documents, owns_documents FROM jobs WHERE job_id = ? AND status = ?", (job_id, QUEUED)
+            ).fetchone()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, message = 'Cancelled', finished_at = ? WHERE job_id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            )
+            if cursor.rowcount:
+                # No worker will ever pick this job up, so its uploads are removed here
+                if row is not None and row[1]:
+                    _remove_documents(json.loads(row[0]))
+                return True
+            if job_id not in self._running:
+                return False
+            task = self._running[job_id]
+            if task is None:
+                # Claimed but not started yet; the worker cancels the task as soon as it creates it
+                self._cancel_requested.add(job_id)
+                return True
+        # The worker marks the job cancelled once the task has unwound
+        get_event_loop().call_soon_threadsafe(task.cancel)
+        return True
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the next job (fairly chosen across users) as running and return it."""
+        with self._lock, connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT job_id, user_id, brief, documents, use_cache, owns_documents, agents, previous_project_id FROM jobs "
+                "WHERE status = ? ORDER BY created_at",
+                (QUEUED,)
+            ).fetchall()
+            if not rows:
+                return None
+            # min() keeps the first (oldest) row among equally ranked users
+            row = min(rows, key=lambda r: (self._running_by_user.get(r[1], 0), self._last_served.get(r[1], 0.0)))
+            conn.execute(
+                "UPDATE jobs SET status = ?, message = 'Planning', started_at = ? WHERE job_id = ?",
+                (RUNNING, time.time(), row[0])
+            )
+            # Registered with the claim, so a cancel() from here on finds the job
+            self._running[row[0]] = None
+            self._running_by_user[row[1]] = self._running_by_user.get(row[1], 0) + 1
+            self._last_served[row[1]] = time.time()
+        return {
+            'job_id': row[0],
+            'user_id': row[1],
+            'brief': row[2],
+            'documents': json.loads(row[3]),
+            'use_cache': bool(row[4]),
+            'owns_documents': bool(row[5]),
+            'agents': json.loads(row[6]) if row[6] else None,
+            'previous_project_id': row[7]
+        }
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, connect(self.path) as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            # Clear before looking so a submit racing with the check still wakes us
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self._claim_next)
+            if job is None:
+                await self._wakeup.wait()
+                continue
+            logging.info(f"Worker {number} running job {job['job_id']} for {job['user_id']}")
+            task = asyncio.ensure_future(self._run_job(job))
+            with self._lock:
+                self._running[job['job_id']] = task
+                self._events[job['job_id']] = []
+                cancel_requested = job['job_id'] in self._cancel_requested
+                self._cancel_requested.discard(job['job_id'])
+            if cancel_requested:
+                task.cancel()
+            requeued = False
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # The worker itself is being stopped; leave the job, and its documents, for the next start
+                    task.cancel()
+                    requeued = True
+                    raise
+                await asyncio.to_thread(
+                    self._update, job['job_id'], status=CANCELLED, message='Cancelled', finished_at=time.time()
+                )
+            except Exception as e:
+                logging.error(f"Job {job['job_id']} failed: {e}")
+                await asyncio.to_thread(
+                    self._update, job['job_id'], status=FAILED, message='Failed', error=str(e),
+                    finished_at=time.time()
+                )
+            finally:
+                with self._lock:
+                    self._running.pop(job['job_id'], None)
+                    self._events.pop(job['job_id'], None)
+                    self._running_by_user[job['user_id']] -= 1
+                if job['owns_documents'] and not requeued:
+                    _remove_documents(job['documents'])
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        """Run one analysis, recording progress as each agent finishes."""
+        total_steps = len(job['agents'] or self.crew.agents) + 1
+        finished_agents = 0
+        project_id = None
+        error = None
+        events = self.crew.astream_project(
+            job['brief'], job['documents'] or None, job['use_cache'], self.crew.new_session(), job['agents'],
+            job['previous_project_id']
+        )
+        try:
+            async for event in events:
+                if event['type'] in ('agent', 'error', 'synthesis'):
+                    with self._lock:
+                        self._events[job['job_id']].append(event)
+                if event['type'] == 'agent':
+                    finished_agents += 1
+                    agent = self.crew.agents.get(event['agent'])
+                    await asyncio.to_thread(
+                        self._update, job['job_id'], progress=finished_agents / total_steps,
+                        message=f"{agent.name if agent else event['agent']} "
+                                f"{'missing' if event.get('error') else 'reused' if event.get('reused') else 'finished'}"
+                    )
+                elif event['type'] == 'synthesis' and finished_agents < total_steps:
+                    finished_agents = total_steps
+                    await asyncio.to_thread(self._update, job['job_id'], message='Writing synthesis')
+                elif event['type'] == 'error':
+                    error = event['content']
+                elif event['type'] == 'trace':
+                    project_id = event.get('project_id')
+        finally:
+            # Close the stream in this task, so a cancelled run unwinds its trace here rather than at loop GC
+            await events.aclose()
+
+        if project_id:
+            await asyncio.to_thread(
+                self._update, job['job_id'], status=DONE, progress=1.0, message='Done',
+                project_id=project_id, finished_at=time.time()
+            )
+        else:
+            await asyncio.to_thread(
+                self._update, job['job_id'], status=FAILED, message='Failed',
+                error=error or "The analysis could not be stored", finished_at=time.time()
+            )
+
+
+def _remove_documents(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    for directory in {os.path.dirname(path) for path in paths}:
+        if directory and os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence, Tuple
+from langchain_core.caches import BaseCache
+from langchain_core.globals import get_llm_cache
+from langchain_core.language_models.llms import BaseLLM
+from langchain_core.outputs import Generation
+from langchain_core.runnables import RunnableBinding
+from utils.sqlite_utils import connect
+
+# Set per run (or per task) to skip the cache without touching the shared instance
+_bypass_cache: ContextVar[bool] = ContextVar("bypass_llm_cache", default=False)
+
+
+@contextmanager
+def bypass_cache():
+    """Skip every LLM response cache for LLM calls made inside this block."""
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+class LLMResponseCache(BaseCache):
+    """Disk-backed, content-addressed cache for LLM generations.
+
+    Entries are keyed by a SHA-256 of the LLM parameter string (model,
+    temperature, options) and the fully rendered prompt, so any agent that
+    renders a byte-identical prompt against the same model reuses the answer.
+    """
+
+    def __init__(self, path: str = ".cache/llm_cache.sqlite", max_entries: int = 5000,
+                 ttl_seconds: Optional[int] = 7 * 24 * 3600, enabled: bool = True):
+        """
+        Initialize the cache and create its SQLite table if needed.
+
+        :param path: Location of the SQLite database file
+        :param max_entries: Maximum number of entries kept (least recently used are evicted)
+        :param ttl_seconds: Entry lifetime in seconds, None to keep entries until evicted
+        :param enabled: Global switch; when False every lookup is a miss and nothing is stored
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with connect(self.path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        """Hash the model parameters and rendered prompt into a cache key."""
+        digest = hashlib.sha256()
+        digest.update(llm_string.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def bypass(self):
+        """Skip the cache for every LLM call made inside this block."""
+        return bypass_cache()
+
+    def _active(self) -> bool:
+        return self.enabled and not _bypass_cache.get()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if not self._active():
+            return None
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        try:
+            with connect(self.path) as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    row = None
+                if row is None:
+                    self._count(hit=False)
+                    return None
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache lookup failed: {e}")
+            return None
+
+        self._count(hit=True)
+        return [
+            Generation(text=item["text"], generation_info=item.get("generation_info"))
+            for item in json.loads(row[0])
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if not self._active():
+            return
+        key = self.make_key(prompt, llm_string)
+        value = json.dumps([
+            {"text": gen.text, "generation_info": gen.generation_info}
+            for gen in return_val
+        ], default=str)
+        now = time.time()
+        try:
+            with connect(self.path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache update failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM llm_cache")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        # Check the bypass flag here, in the caller's context, before hopping threads
+        if not self._active():
+            return None
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if not self._active():
+            return
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of stored entries."""
+        try:
+            with connect(self.path) as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries
+            }
+
+
+def chain_cache_entry(chain: Any, inputs: Dict[str, Any]) -> Optional[Tuple[BaseCache, str, str]]:
+    """
+    Locate the cache entry the LLM of a `prompt | llm [| parser]` chain uses for the given inputs.
+
+    LangChain only consults the cache for invoke/generate calls, not for
+    astream, so streamed calls look their answer up (and store it) themselves
+    under the same key a non-streamed call with the same prompt would use.
+
+    :param chain: Runnable sequence starting with a prompt template and an LLM (optionally bound)
+    :param inputs: Chain inputs
+    :return: (cache, rendered prompt, llm string), or None if the chain's LLM has no cache
+    """
+    steps = getattr(chain, 'steps', None)
+    if not steps or len(steps) < 2:
+        return None
+    llm = steps[1]
+    stop = None
+    if isinstance(llm, RunnableBinding):
+        stop = llm.kwargs.get('stop')
+        llm = llm.bound
+    if not isinstance(llm, BaseLLM) or llm.cache is False:
+        return None
+    cache = llm.cache if isinstance(llm.cache, BaseCache) else get_llm_cache()
+    if cache is None:
+        return None
+    # Same prompt text and parameter string as BaseLLM.agenerate builds for its own lookup
+    prompt = steps[0].invoke(inputs).to_string()
+    params = llm.dict()
+    params['stop'] = stop
+    return cache, prompt, str(sorted(params.items()))
@@ -0,0 +1,102 @@
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from utils.retrieval import estimate_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+class ConversationMemory:
+    """Bounded message buffer with token-aware truncation and a rolling summary.
+
+    Recent messages are kept verbatim up to max_tokens / max_messages. Older
+    messages are evicted oldest-first and folded into a short extractive
+    summary (first sentence of each), itself capped at summary_tokens, so
+    the memory never grows with the length of the conversation and no extra
+    LLM call is needed to maintain it.
+    """
+
+    def __init__(self, max_tokens: int = 2000, max_messages: int = 20, summary_tokens: int = 400):
+        """
+        Initialize the memory.
+
+        :param max_tokens: Token budget for verbatim messages
+        :param max_messages: Maximum number of verbatim messages
+        :param summary_tokens: Token budget for the rolling summary of evicted messages
+        """
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.summary_tokens = summary_tokens
+        self.messages: deque = deque()
+        self.summary_lines: deque = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "ConversationMemory":
+        config = config or {}
+        return cls(
+            max_tokens=config.get('max_tokens', 2000),
+            max_messages=config.get('max_messages', 20),
+            summary_tokens=config.get('summary_tokens', 400)
+        )
+
+    def add_exchange(self, human: str, ai: str) -> None:
+        """Record one request/response pair."""
+        self.add_messages([HumanMessage(content=human), AIMessage(content=ai)])
+
+    def add_messages(self, messages: List[BaseMessage]) -> None:
+        with self._lock:
+            for message in messages:
+                self.messages.append(message)
+                self._tokens += estimate_tokens(str(message.content))
+            self._trim()
+
+    def _trim(self) -> None:
+        # Always keep the newest message, even if it alone exceeds the budget
+        while len(self.messages) > 1 and (self._tokens > self.max_tokens or len(self.messages) > self.max_messages):
+            evicted = self.messages.popleft()
+            self._tokens -= estimate_tokens(str(evicted.content))
+            self._fold_into_summary(evicted)
+
+    def _fold_into_summary(self, message: BaseMessage) -> None:
+        speaker = "User" if isinstance(message, HumanMessage) else "Assistant"
+        first_sentence = _SENTENCE_END.split(str(message.content).strip(), maxsplit=1)[0]
+        self.summary_lines.append(f"{speaker}: {first_sentence[:300]}")
+        while len(self.summary_lines) > 1 and \
+                sum(estimate_tokens(line) for line in self.summary_lines) > self.summary_tokens:
+            self.summary_lines.popleft()
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def load_memory_variables(self, inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return the summary and recent history, mirroring LangChain's memory interface."""
+        with self._lock:
+            history = "\n".join(
+                f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}"
+                for message in self.messages
+            )
+            return {'summary': self.summary, 'history': history}
+
+    def render(self, empty: str = "None") -> str:
+        """Render summary and recent history as prompt text, or `empty` if there is none."""
+        variables = self.load_memory_variables()
+        parts = []
+        if variables['summary']:
+            parts.append(f"Earlier conversation (summary):\n{variables['summary']}")
+        if variables['history']:
+            parts.append(f"Recent conversation:\n{variables['history']}")
+        return "\n\n".join(parts) or empty
+
+    def clear(self) -> None:
+        with self._lock:
+            self.messages.clear()
+            self.summary_lines.clear()
+            self._tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.messages)
@@ -0,0 +1,380 @@
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import httpx
+import ollama
+from langchain_core.language_models.base import BaseLanguageModel
+from langchain_core.language_models.llms import BaseLLM
+from langchain_core.outputs import GenerationChunk, LLMResult
+from langchain_ollama import OllamaLLM
+from pydantic import ConfigDict
+
+
+class OllamaEndpoint:
+    """One Ollama server with its health, load and latency as seen by this process."""
+
+    def __init__(self, url: str, llm_settings: Dict[str, Any]):
+        self.url = url.rstrip('/')
+        self.llm_settings = llm_settings
+        self.healthy = True
+        # Models the server reported in /api/tags; None until the first health check
+        self.models: Optional[set] = None
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.slow_until = 0.0
+        self._llms: Dict[str, OllamaLLM] = {}
+
+    def llm(self, model: str) -> OllamaLLM:
+        if model not in self._llms:
+            self._llms[model] = OllamaLLM(model=model, base_url=self.url, **self.llm_settings)
+        return self._llms[model]
+
+    def serves(self, model: str) -> bool:
+        # Ollama lists untagged models as "name:latest"
+        return self.models is None or model in self.models or f"{model}:latest" in self.models
+
+    @property
+    def slow(self) -> bool:
+        return time.monotonic() < self.slow_until
+
+    def observe(self, first_token_seconds: float, slow_threshold: float, cooldown: float) -> None:
+        # Exponentially weighted so one outlier does not reorder endpoints
+        self.latency = first_token_seconds if self.latency is None else 0.8 * self.latency + 0.2 * first_token_seconds
+        if first_token_seconds > slow_threshold:
+            self.slow_until = time.monotonic() + cooldown
+            logging.warning(f"Ollama endpoint {self.url} is slow ({first_token_seconds:.1f}s to first token)")
+
+
+class ModelRouter:
+    """Chooses the model for each agent and operation and spreads calls over Ollama endpoints.
+
+    Models resolve per call site: `operation_models` (plan, task, synthesis,
+    condense, expand, followup) first, then `agent_models`, then the default
+    `model_name`. Each model is served by a PooledOllamaLLM that picks the
+    healthy, least loaded, fastest endpoint for every call and fails over to
+    the next one on connection errors, server errors, a missing model (404)
+    or when the first token does not arrive in time. Other 4xx responses are
+    the request's own fault and are raised as they are. Endpoints are health-checked through /api/tags.
+    """
+
+    def __init__(self, endpoints: List[str], default_model: str = "llama3.2",
+                 agent_models: Optional[Dict[str, str]] = None, operation_models: Optional[Dict[str, str]] = None,
+                 llm_settings: Optional[Dict[str, Any]] = None, cache: Any = None,
+                 health_check_interval: float = 30.0, slow_first_token_seconds: float = 20.0,
+                 first_token_timeout: float = 60.0, slow_cooldown: float = 60.0):
+        """
+        Initialize the router.
+
+        :param endpoints: Base URLs of the Ollama servers
+        :param default_model: Model used when no agent or operation override applies
+        :param agent_models: Model per agent name (manager, strategic_lead, ...)
+        :param operation_models: Model per operation (plan, synthesis, ...), taking precedence over agent_models
+        :param llm_settings: Extra OllamaLLM settings (temperature, keep_alive, client_kwargs, ...)
+        :param cache: LangChain cache shared by every routed model
+        :param health_check_interval: Seconds between /api/tags checks of each endpoint
+        :param slow_first_token_seconds: Time to first token that marks an endpoint as slow
+        :param first_token_timeout: Seconds to wait for a first token before failing over to another endpoint
+        :param slow_cooldown: Seconds a slow endpoint stays deprioritised
+        """
+        self.endpoints = [OllamaEndpoint(url, llm_settings or {}) for url in endpoints or ["http://localhost:11434"]]
+        self.default_model = default_model
+        self.agent_models = agent_models or {}
+        self.operation_models = operation_models or {}
+        self.cache = cache
+        self.llm_settings = llm_settings or {}
+        self.health_check_interval = health_check_interval
+        self.slow_first_token_seconds = slow_first_token_seconds
+        self.first_token_timeout = first_token_timeout
+        self.slow_cooldown = slow_cooldown
+        self._last_health_check = 0.0
+        self._health_task: Optional[asyncio.Task] = None
+        self._llms: Dict[str, PooledOllamaLLM] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], cache: Any = None,
+                    connection_settings: Optional[Dict[str, Any]] = None) -> "ModelRouter":
+        """Build a router from the `model` config section plus the crew's connection settings."""
+        config = config or {}
+        llm_settings = {'temperature': config.get('temperature', 0.7), **(connection_settings or {})}
+        if config.get('top_k') is not None:
+            llm_settings['top_k'] = config['top_k']
+        return cls(
+            endpoints=config.get('endpoints') or ["http://localhost:11434"],
+            default_model=config.get('model_name', "llama3.2"),
+            agent_models=config.get('agent_models'),
+            operation_models=config.get('operation_models'),
+            llm_settings=llm_settings,
+            cache=cache,
+            health_check_interval=config.get('health_check_interval', 30),
+            slow_first_token_seconds=config.get('slow_first_token_seconds', 20),
+            first_token_timeout=config.get('first_token_timeout', 60),
+            slow_cooldown=config.get('slow_cooldown', 60)
+        )
+
+    def llm(self, model: Optional[str] = None) -> "PooledOllamaLLM":
+        """Return the (shared) pooled LLM for a model."""
+        model = model or self.default_model
+        if model not in self._llms:
+            self._llms[model] = PooledOllamaLLM(
+                model=model,
+                temperature=self.llm_settings.get('temperature'),
+                top_k=self.llm_settings.get('top_k'),
+                router=self,
+                cache=self.cache
+            )
+        return self._llms[model]
+
+    def llm_for(self, agent_name: str) -> "PooledOllamaLLM":
+        """LLM for an agent's own task calls."""
+        return self.llm(self.agent_models.get(agent_name, self.default_model))
+
+    def operation_llms(self) -> Dict[str, "PooledOllamaLLM"]:
+        """LLMs for the operations that have their own model, overriding any agent's model."""
+        return {operation: self.llm(model) for operation, model in self.operation_models.items()}
+
+    def candidates(self, model: str) -> List[OllamaEndpoint]:
+        """Endpoints to try for a model, best first; unhealthy endpoints only as a last resort."""
+        self._maybe_check_health()
+        usable = [endpoint for endpoint in self.endpoints if endpoint.serves(model)] or self.endpoints
+        return sorted(usable, key=lambda endpoint: (
+            not endpoint.healthy,
+            endpoint.slow,
+            endpoint.in_flight,
+            endpoint.latency if endpoint.latency is not None else 0.0
+        ))
+
+    def _maybe_check_health(self) -> None:
+        if time.monotonic() - self._last_health_check < self.health_check_interval:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Synchronous callers skip background checks
+            return
+        if self._health_task is None or self._health_task.done():
+            self._last_health_check = time.monotonic()
+            self._health_task = asyncio.ensure_future(self.acheck_health())
+
+    async def acheck_health(self) -> None:
+        """Query /api/tags on every endpoint and record which are up and which models they serve."""
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            await asyncio.gather(*(self._acheck_endpoint(client, endpoint) for endpoint in self.endpoints))
+
+    async def _acheck_endpoint(self, client: httpx.AsyncClient, endpoint: OllamaEndpoint) -> None:
+        try:
+            response = await client.get(f"{endpoint.url}/api/tags")
+            response.raise_for_status()
+            endpoint.models = {model['name'] for model in response.json().get('models', [])}
+            if not endpoint.healthy:
+                logging.info(f"Ollama endpoint {endpoint.url} is back")
+            endpoint.healthy = True
+        except Exception as e:
+            if endpoint.healthy:
+                logging.warning(f"Ollama endpoint {endpoint.url} failed its health check: {e}")
+            endpoint.healthy = False
+
+    def mark_slow(self, endpoint: OllamaEndpoint) -> None:
+        logging.warning(f"Ollama endpoint {endpoint.url} sent no token within {self.first_token_timeout}s, failing over")
+        endpoint.slow_until = time.monotonic() + self.slow_cooldown
+
+    def fail_over(self, endpoint: OllamaEndpoint, model: str, error: BaseException) -> bool:
+        """Record a failed call; returns False if the error would fail on every endpoint, so it should be raised."""
+        if isinstance(error, (httpx.HTTPError, ConnectionError)):
+            self.mark_failed(endpoint, error)
+            return True
+        if isinstance(error, ollama.ResponseError) and error.status_code == 404:
+            # The server is fine, it just doesn't have the model; the next health check refreshes its list
+            logging.warning(f"Ollama endpoint {endpoint.url} does not serve {model}, failing over")
+            endpoint.models = (endpoint.models or set()) - {model, f"{model}:latest"}
+            return True
+        if isinstance(error, ollama.ResponseError) and error.status_code >= 500:
+            self.mark_failed(endpoint, error)
+            return True
+        return False
+
+    def mark_failed(self, endpoint: OllamaEndpoint, error: BaseException) -> None:
+        logging.warning(f"Ollama endpoint {endpoint.url} failed, failing over: {error or type(error).__name__}")
+        endpoint.healthy = False
+        # Let the next health check bring it back
+        self._last_health_check = min(self._last_health_check, time.monotonic() - self.health_check_interval / 2)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {'url': endpoint.url, 'healthy': endpoint.healthy, 'slow': endpoint.slow,
+             'in_flight': endpoint.in_flight, 'latency': endpoint.latency}
+            for endpoint in self.endpoints
+        ]
+
+
+def _first_chunk(stream: Iterator[GenerationChunk], timeout: Optional[float]) -> Optional[GenerationChunk]:
+    """
+    Return the first chunk of a blocking stream, or None if it is empty, waiting at most timeout seconds.
+
+    :param stream: Chunk iterator of one call
+    :param timeout: Seconds to wait, None for no limit
+    :raises concurrent.futures.TimeoutError: If no chunk arrived in time; the stream is closed once one does
+    """
+    if timeout is None:
+        return next(stream, None)
+    result: concurrent.futures.Future = concurrent.futures.Future()
+
+    def fetch():
+        try:
+            result.set_result(next(stream, None))
+        except BaseException as e:
+            result.set_exception(e)
+
+    threading.Thread(target=fetch, name="ollama-first-chunk", daemon=True).start()
+    try:
+        return result.result(timeout)
+    except concurrent.futures.TimeoutError:
+        result.add_done_callback(lambda _: stream.close())
+        raise
+
+
+class PooledOllamaLLM(BaseLLM):
+    """OllamaLLM stand-in that sends each call to the best endpoint a ModelRouter offers.
+
+    The cache key depends only on the model and sampling settings, so a cached
+    answer is reused whichever endpoint produced it.
+    """
+
+    model: str
+    temperature: Optional[float] = None
+    top_k: Optional[int] = None
+    router: Any = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-llm"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "temperature": self.temperature, "top_k": self.top_k}
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> LLMResult:
+        last_error: Optional[BaseException] = None
+        for endpoint in self.router.candidates(self.model):
+            endpoint.in_flight += 1
+            try:
+                return endpoint.llm(self.model)._generate(prompts, stop, run_manager, **kwargs)
+            except (httpx.HTTPError, ConnectionError, ollama.ResponseError) as e:
+                if not self.router.fail_over(endpoint, self.model, e):
+                    raise
+                last_error = e
+            finally:
+                endpoint.in_flight -= 1
+        raise last_error
+
+    async def _agenerate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> LLMResult:
+        # Aggregate the stream like OllamaLLM does so generation_info carries token counts
+        generations = []
+        for prompt in prompts:
+            final_chunk = None
+            async for chunk in self._astream(prompt, stop, run_manager, **kwargs):
+                final_chunk = chunk if final_chunk is None else final_chunk + chunk
+            generations.append([final_chunk or GenerationChunk(text="")])
+        return LLMResult(generations=generations)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        candidates = self.router.candidates(self.model)
+        last_error: Optional[BaseException] = None
+        for position, endpoint in enumerate(candidates):
+            has_fallback = position < len(candidates) - 1
+            endpoint.in_flight += 1
+            stream = endpoint.llm(self.model)._stream(prompt, stop, run_manager, **kwargs)
+            abandoned = False
+            started = time.perf_counter()
+            try:
+                # Only the wait for the first chunk can fail over; after that the answer is committed
+                try:
+                    first = _first_chunk(stream, self.router.first_token_timeout if has_fallback else None)
+                except concurrent.futures.TimeoutError as e:
+                    # The blocked stream cannot be interrupted; it is closed once the server answers
+                    abandoned = True
+                    last_error = e
+                    self.router.mark_slow(endpoint)
+                    continue
+                except (httpx.HTTPError, ConnectionError, ollama.ResponseError) as e:
+                    if not self.router.fail_over(endpoint, self.model, e):
+                        raise
+                    last_error = e
+                    continue
+                if first is None:
+                    return
+                endpoint.observe(time.perf_counter() - started, self.router.slow_first_token_seconds,
+                                 self.router.slow_cooldown)
+                yield first
+                yield from stream
+                return
+            finally:
+                endpoint.in_flight -= 1
+                if not abandoned:
+                    stream.close()
+        raise last_error
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        candidates = self.router.candidates(self.model)
+        last_error: Optional[BaseException] = None
+        for position, endpoint in enumerate(candidates):
+            has_fallback = position < len(candidates) - 1
+            endpoint.in_flight += 1
+            stream = endpoint.llm(self.model)._astream(prompt, stop, run_manager, **kwargs)
+            started = time.perf_counter()
+            try:
+                # Only the wait for the first chunk can fail over; after that the answer is committed
+                try:
+                    first = await asyncio.wait_for(
+                        stream.__anext__(), self.router.first_token_timeout if has_fallback else None
+                    )
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError as e:
+                    last_error = e
+                    self.router.mark_slow(endpoint)
+                    continue
+                except (httpx.HTTPError, ConnectionError, ollama.ResponseError) as e:
+                    if not self.router.fail_over(endpoint, self.model, e):
+                        raise
+                    last_error = e
+                    continue
+                endpoint.observe(time.perf_counter() - started, self.router.slow_first_token_seconds,
+                                 self.router.slow_cooldown)
+                yield first
+                async for chunk in stream:
+                    yield chunk
+                return
+            finally:
+                endpoint.in_flight -= 1
+                await stream.aclose()
+        raise last_error
+
+
+def ollama_options(llm: BaseLanguageModel, **overrides: Any) -> Dict[str, Any]:
+    """
+    Return the Ollama options a model sends with every call, with overrides applied.
+
+    An `options` argument replaces OllamaLLM's whole options dict (temperature,
+    num_ctx, ...), so a per-call change has to start from the model's own
+    settings or the call runs, and may even load the model, differently.
+
+    :param llm: OllamaLLM, PooledOllamaLLM or any other model (which gets just the overrides)
+    :param overrides: Options to change, e.g. num_predict=1
+    :return: Options for the call
+    """
+    if isinstance(llm, PooledOllamaLLM):
+        # Every endpoint builds its OllamaLLM from the same settings
+        llm = llm.router.endpoints[0].llm(llm.model)
+    if not isinstance(llm, OllamaLLM):
+        return dict(overrides)
+    options = dict(llm._generate_params("")["options"])
+    return {**{key: value for key, value in options.items() if value is not None}, **overrides}
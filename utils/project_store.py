@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from utils.sqlite_utils import connect
+
+
+class ProjectStore:
+    """SQLite store of completed analyses.
+
+    Each row holds everything needed to reopen a project without calling the
+    LLM again: the brief, fingerprints of the attached documents, the plan,
+    every agent's insights, the synthesis and the run's timings, plus the
+    condensed summaries of the insights that were condensed during the run.
+    """
+
+    def __init__(self, path: str = ".cache/projects.sqlite"):
+        """
+        Initialize the store and create its SQLite table if needed.
+
+        :param path: Location of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with connect(self.path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS projects (
+                    project_id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    brief TEXT NOT NULL,
+                    documents TEXT NOT NULL,
+                    plan TEXT NOT NULL,
+                    insights TEXT NOT NULL,
+                    synthesis TEXT NOT NULL,
+                    timings TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    summaries TEXT NOT NULL DEFAULT '{}'
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at)")
+
+    def save_project(self, project_id: str, title: str, brief: str, documents: List[Dict],
+                     plan: Dict[str, str], insights: Dict[str, str], synthesis: str,
+                     timings: Optional[Dict[str, Any]] = None, summaries: Optional[Dict[str, str]] = None) -> str:
+        """
+        Insert or replace one analysed project.
+
+        :param project_id: Identifier of the run (the trace run_id)
+        :param title: Short label shown when listing projects, usually the user's brief
+        :param brief: Enriched brief the agents worked from
+        :param documents: Fingerprints of attached documents ({'name', 'sha256'})
+        :param plan: Task given to each agent
+        :param insights: Result of each agent
+        :param synthesis: Final synthesized report
+        :param timings: Timing and token summary of the run
+        :param summaries: Condensed insight of each agent whose insight was condensed
+        :return: The project id
+        """
+        row = (
+            project_id, title, brief, json.dumps(documents), json.dumps(plan),
+            json.dumps(insights), synthesis, json.dumps(timings or {}), time.time(), json.dumps(summaries or {})
+        )
+        with self._lock, connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO projects (project_id, title, brief, documents, plan, insights, synthesis, "
+                "timings, created_at, summaries) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+        return project_id
+
+    def list_projects(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent projects as {'project_id', 'title', 'created_at'} dicts, newest first."""
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT project_id, title, created_at FROM projects ORDER BY created_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [{'project_id': row[0], 'title': row[1], 'created_at': row[2]} for row in rows]
+
+    def load_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored project, or None if there is no project with that id."""
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT project_id, title, brief, documents, plan, insights, synthesis, timings, created_at, "
+                "summaries FROM projects WHERE project_id = ?",
+                (project_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'project_id': row[0],
+            'title': row[1],
+            'brief': row[2],
+            'documents': json.loads(row[3]),
+            'plan': json.loads(row[4]),
+            'insights': json.loads(row[5]),
+            'synthesis': row[6],
+            'timings': json.loads(row[7]),
+            'created_at': row[8],
+            'summaries': json.loads(row[9])
+        }
+
+    def delete_project(self, project_id: str) -> bool:
+        """Remove a project; returns True if it existed."""
+        with self._lock, connect(self.path) as conn:
+            cursor = conn.execute("DELETE FROM projects WHERE project_id = ?", (project_id,))
+            return cursor.rowcount > 0
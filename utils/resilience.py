@@ -0,0 +1,141 @@
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+import httpx
+from utils.concurrency import slot_acquired
+
+# HTTP statuses worth retrying: rate limiting, server errors and gateway problems
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an LLM call error is likely to succeed on retry (connection, timeout, overload)."""
+    if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    # ollama.ResponseError and httpx.HTTPStatusError both carry the status code
+    status = getattr(error, 'status_code', None)
+    if status is None and isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    return status in TRANSIENT_STATUS_CODES
+
+
+async def run_with_deadline(work: Awaitable[Any], timeout: float, slot_timeout: Optional[float] = None) -> Any:
+    """
+    Await work, giving it timeout seconds from the moment its first LLM call gets a slot.
+
+    Time spent queued behind other calls before then is not charged to the
+    deadline, so a busy limiter does not time out work that never got to run;
+    that wait has its own budget, slot_timeout.
+
+    :param work: Coroutine making LLM calls through BaseAgent
+    :param timeout: Seconds the work may take once it is being served, retries included
+    :param slot_timeout: Seconds to wait for the first slot, None to wait indefinitely
+    :return: Result of the work
+    :raises TimeoutError: With a message saying which budget ran out
+    """
+    started = asyncio.Event()
+    token = slot_acquired.set(started.set)
+    try:
+        task = asyncio.ensure_future(work)
+    finally:
+        slot_acquired.reset(token)
+    waiter = asyncio.ensure_future(started.wait())
+    try:
+        await asyncio.wait({task, waiter}, timeout=slot_timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done() and not started.is_set():
+            raise TimeoutError(f"no model slot within {slot_timeout:g}s")
+        try:
+            return await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            if not task.cancelled():
+                # Raised by the work itself
+                raise
+            raise TimeoutError(f"no answer within {timeout:g}s") from None
+    finally:
+        waiter.cancel()
+        task.cancel()
+
+
+class RetryPolicy:
+    """Retries transient LLM call failures with jittered exponential backoff, and hedges stragglers.
+
+    A hedged call starts a duplicate of an attempt that has not finished
+    after `hedge_after` seconds and keeps whichever finishes first, which
+    pays off when the router has several endpoints to send the duplicate to.
+    """
+
+    def __init__(self, max_retries: int = 2, backoff_base: float = 1.0, backoff_max: float = 10.0,
+                 hedge_after: Optional[float] = None, hedge_operations: Iterable[str] = ('task',)):
+        """
+        Initialize the policy.
+
+        :param max_retries: Retries after the first attempt
+        :param backoff_base: Upper bound in seconds of the first backoff; doubles on every retry
+        :param backoff_max: Cap on any single backoff
+        :param hedge_after: Seconds before a duplicate request is started, None to never hedge
+        :param hedge_operations: Operations that may be hedged (streamed calls never are)
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.hedge_operations = set(hedge_operations)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "RetryPolicy":
+        config = config or {}
+        return cls(
+            max_retries=config.get('max_retries', 2),
+            backoff_base=config.get('backoff_base', 1.0),
+            backoff_max=config.get('backoff_max', 10.0),
+            hedge_after=config.get('hedge_after_seconds'),
+            hedge_operations=config.get('hedge_operations', ['task'])
+        )
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many callers from arriving in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, attempt_fn: Callable[[], Awaitable[Any]], operation: str = "task",
+                   label: str = "LLM call") -> Any:
+        """
+        Run attempt_fn, retrying transient failures and hedging slow attempts.
+
+        :param attempt_fn: Coroutine factory making one attempt
+        :param operation: Operation label used to decide whether to hedge
+        :param label: Name used in log messages
+        :return: Result of the first successful attempt
+        """
+        hedge = self.hedge_after is not None and operation in self.hedge_operations
+        for attempt in range(self.max_retries + 1):
+            try:
+                if hedge:
+                    return await self._hedged(attempt_fn, label)
+                return await attempt_fn()
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                delay = self.backoff(attempt)
+                logging.warning(f"{label} failed ({e or type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, attempt_fn: Callable[[], Awaitable[Any]], label: str) -> Any:
+        primary = asyncio.ensure_future(attempt_fn())
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                logging.info(f"{label} still running after {self.hedge_after}s, sending a hedged request")
+                pending.add(asyncio.ensure_future(attempt_fn()))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,173 @@
+import os
+import re
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+your you our we they their them what which who how into about over such than then there these those
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting."""
+    return max(1, len(text) // 4)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """In-memory Okapi BM25 index over a list of documents."""
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(doc.page_content)) for doc in documents]
+        self.doc_lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = (sum(self.doc_lengths) / len(documents)) if documents else 0.0
+        doc_freqs = Counter()
+        for freqs in self.term_freqs:
+            doc_freqs.update(freqs.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[Document, float]]:
+        """Return up to top_k (document, score) pairs ranked by BM25 score."""
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        if not terms or not self.documents:
+            return []
+        scores = []
+        for i, freqs in enumerate(self.term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / (self.avg_length or 1))
+            score = 0.0
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((score, i))
+        scores.sort(reverse=True)
+        return [(self.documents[i], score) for score, i in scores[:top_k]]
+
+
+class DocumentRetriever:
+    """Split uploaded documents into chunks and retrieve the ones relevant to a task."""
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 150, top_k: int = 8,
+                 token_budget: int = 1500):
+        """
+        Initialize the retriever.
+
+        :param chunk_size: Target chunk size in characters
+        :param chunk_overlap: Overlap between consecutive chunks in characters
+        :param top_k: Maximum number of chunks returned per query
+        :param token_budget: Default token budget for the retrieved context
+        """
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "DocumentRetriever":
+        config = config or {}
+        return cls(
+            chunk_size=config.get('chunk_size', 1000),
+            chunk_overlap=config.get('chunk_overlap', 150),
+            top_k=config.get('top_k', 8),
+            token_budget=config.get('token_budget', 1500)
+        )
+
+    def build_index(self, doc_context: Dict[str, Any]) -> BM25Index:
+        """
+        Split processed documents into chunks and index them.
+
+        :param doc_context: Mapping of file path to extracted document or loader output
+        :return: BM25 index over all chunks
+        """
+        documents = []
+        for path, content in doc_context.items():
+            documents.extend(self._to_documents(path, content))
+        return BM25Index(self.splitter.split_documents(documents))
+
+    @staticmethod
+    def _to_documents(path: str, content: Any) -> List[Document]:
+        source = os.path.basename(path)
+        if content is None:
+            return []
+        if isinstance(content, dict):
+            # DocumentProcessor.process_files output: plain text with page offsets
+            text = content['text']
+            return [
+                Document(page_content=text[page['start']:page['end']], metadata={'source': source, 'page': page['number']})
+                for page in content['pages']
+                if text[page['start']:page['end']].strip()
+            ]
+        if isinstance(content, str):
+            content = [content]
+        documents = []
+        for position, item in enumerate(content):
+            if isinstance(item, Document):
+                page = item.metadata.get('page', position)
+                text = item.page_content
+            else:
+                page = position
+                text = str(item)
+            if text.strip():
+                documents.append(Document(page_content=text, metadata={'source': source, 'page': page + 1}))
+        return documents
+
+    def index_texts(self, texts: Dict[str, str]) -> BM25Index:
+        """
+        Split and index plain texts, using each key as the chunk source (e.g. agent insights).
+
+        :param texts: Mapping of source name to text
+        :return: BM25 index over all chunks
+        """
+        documents = [
+            Document(page_content=str(text), metadata={'source': source})
+            for source, text in texts.items()
+            if text and str(text).strip()
+        ]
+        return BM25Index(self.splitter.split_documents(documents))
+
+    def retrieve(self, index: Optional[BM25Index], query: str,
+                 token_budget: Optional[int] = None) -> List[Document]:
+        """Return the top-ranked chunks for the query that fit in the token budget."""
+        if not index:
+            return []
+        budget = token_budget if token_budget is not None else self.token_budget
+        selected = []
+        used = 0
+        for doc, _ in index.search(query, self.top_k):
+            cost = estimate_tokens(doc.page_content)
+            if used + cost > budget:
+                continue
+            selected.append(doc)
+            used += cost
+        return selected
+
+    def format_context(self, chunks: List[Document]) -> str:
+        """Render retrieved chunks as a citation-tagged excerpt block."""
+        return "\n\n".join(f"[{self._citation(doc)}]\n{doc.page_content}" for doc in chunks)
+
+    @staticmethod
+    def _citation(doc: Document) -> str:
+        source = doc.metadata.get('source', 'document')
+        page = doc.metadata.get('page')
+        return source if page is None else f"{source}, page {page}"
@@ -0,0 +1,32 @@
+from typing import Dict, Optional
+from utils.memory import ConversationMemory
+
+
+class ProjectSession:
+    """Per-user state for a shared AICrew.
+
+    The crew (LLM client, agents, prompt templates) is process-wide; anything
+    that belongs to one user's analysis lives here instead so sessions never
+    see each other's projects or conversation history.
+    """
+
+    def __init__(self, memory_config: Optional[Dict] = None):
+        """
+        Initialize an empty session.
+
+        :param memory_config: The `memory` config section used to size conversation buffers
+        """
+        self.memory_config = memory_config or {}
+        # Context of the last analysed project, used for follow-up questions
+        self.project_memory: Dict = {}
+        # Bounded conversation memory per agent name (plus 'followup' for follow-up Q&A)
+        self.memories: Dict[str, ConversationMemory] = {}
+
+    def memory_for(self, agent_name: str) -> ConversationMemory:
+        """Return the conversation memory for one agent, creating it on first use."""
+        if agent_name not in self.memories:
+            self.memories[agent_name] = ConversationMemory.from_config(self.memory_config)
+        return self.memories[agent_name]
+
+    def has_project(self) -> bool:
+        return bool(self.project_memory)
@@ -0,0 +1,24 @@
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def connect(path: str) -> Iterator[sqlite3.Connection]:
+    """
+    Open a short-lived connection to one of the SQLite stores (LLM cache, projects, jobs).
+
+    Every operation opens its own connection, so a store can be shared across
+    threads without any of them sharing a connection. The block runs in one
+    transaction (committed on success, rolled back on error) and the connection
+    is closed when it exits.
+
+    :param path: Location of the SQLite database file
+    :return: Connection that waits up to 30 seconds for a locked database
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()